@@ -0,0 +1,170 @@
+"""
+Directorio local de agentes (/AgentList) de NowCerts.
+
+El directorio guarda, por ID de agente, su nombre para mostrar ("Nombre
+Apellido") en un archivo JSON junto a los snapshots. Cada corrida lo
+actualiza de forma incremental: pide /AgentList ordenado por changeDate desc
+y corta en cuanto llega a agentes que no cambiaron desde la última vez.
+
+Las pólizas y las comisiones de agentes se unen al directorio por ID y
+reciben siempre el mismo string (internado con sys.intern) para cada
+agente: no se vuelve a armar el nombre en cada póliza, y agrupar por agente
+compara strings por identidad.
+
+Si un registro no trae ID de agente (o el ID no está en el directorio) se
+usa el nombre del propio registro, como antes.
+"""
+
+import json
+import os
+import sys
+
+from config.settings import DEFAULT_TOP, SNAPSHOT_DIR
+
+
+AGENT_LIST_ENDPOINT = "/AgentList"
+AGENT_DIRECTORY_FILE = "agent_directory.json"
+
+# Campos con el ID del agente: en /AgentList y en los agentes / CSRs de cada
+# póliza, y en las comisiones de agentes
+AGENT_ID_FIELDS = ("id", "databaseId")
+COMMISSION_AGENT_ID_FIELDS = ("agentDatabaseId", "agentId")
+
+
+class AgentDirectory:
+    """
+    Directorio de agentes {ID: nombre para mostrar}, persistido en disco.
+
+    Args:
+        path: Archivo JSON del directorio (None = solo en memoria)
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.names = {}
+        self.last_change = None
+
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.names = {agent_id: sys.intern(name) for agent_id, name in data.get("agents", {}).items()}
+            self.last_change = data.get("last_change")
+
+    def __len__(self):
+        return len(self.names)
+
+    def refresh(self, client, top=DEFAULT_TOP):
+        """
+        Trae de /AgentList solo los agentes nuevos o modificados desde la
+        última actualización (todos, la primera vez) y guarda el directorio.
+
+        Returns:
+            int: Cantidad de agentes actualizados
+        """
+        updated = 0
+        newest = self.last_change
+        skip = 0
+
+        while True:
+            data = client.get(
+                AGENT_LIST_ENDPOINT,
+                params={"$top": top, "$skip": skip, "$orderby": "changeDate desc"},
+                use_cache=False,
+            )
+            items = data["value"] if isinstance(data, dict) and "value" in data else data
+
+            for agent in items:
+                change_date = agent.get("changeDate")
+                # Orden por changeDate desc: de acá en adelante ya está todo
+                if self.last_change and change_date and change_date < self.last_change:
+                    items = []
+                    break
+
+                agent_id = agent_id_of(agent)
+                if agent_id is not None:
+                    self.names[agent_id] = sys.intern(display_name(agent))
+                    updated += 1
+                if change_date and (newest is None or change_date > newest):
+                    newest = change_date
+
+            if len(items) < top:
+                break
+            skip += top
+
+        self.last_change = newest
+        self.save()
+        print(f"👥 Directorio de agentes: {len(self.names):,} agentes ({updated:,} actualizados)")
+        return updated
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"last_change": self.last_change, "agents": self.names}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def name_of(self, person):
+        """Nombre de un agente / CSR de una póliza: por ID si está en el directorio."""
+        name = self.names.get(agent_id_of(person))
+        if name is None:
+            name = sys.intern(display_name(person))
+        return name
+
+    def commission_agent_name(self, agent_comm):
+        """Nombre del agente de una comisión: por ID si está en el directorio."""
+        for field in COMMISSION_AGENT_ID_FIELDS:
+            name = self.names.get(agent_comm.get(field))
+            if name is not None:
+                return name
+        return sys.intern((agent_comm.get("agentName") or "").strip())
+
+    def fingerprint(self):
+        """Huella del directorio (para el cache de etapas)."""
+        return f"{len(self.names)}|{self.last_change}"
+
+
+def get_agent_directory(client=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Carga el directorio de agentes de `snapshot_dir` y, si hay cliente, lo
+    actualiza contra /AgentList. Si la actualización falla se sigue con el
+    directorio guardado (las uniones caen al nombre de cada registro).
+
+    Returns:
+        AgentDirectory
+    """
+    directory = AgentDirectory(os.path.join(snapshot_dir, AGENT_DIRECTORY_FILE))
+    if client is not None:
+        try:
+            directory.refresh(client)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el directorio de agentes: {e}")
+    return directory
+
+
+def intern_agent_names(agent_comms, directory):
+    """
+    Reemplaza el agentName de cada comisión de agente por el nombre del
+    directorio (unido por ID) o, si no hay ID, por su propio nombre sin
+    espacios, siempre internado.
+
+    Returns:
+        La misma lista (modificada in-place)
+    """
+    for a in agent_comms:
+        a["agentName"] = directory.commission_agent_name(a)
+    return agent_comms
+
+
+def agent_id_of(record):
+    for field in AGENT_ID_FIELDS:
+        value = record.get(field)
+        if value is not None:
+            return value
+    return None
+
+
+def display_name(person):
+    """ "Nombre Apellido" de un agente / CSR (mismo formato que el mapa de pólizas)."""
+    return f"{(person.get('firstName') or '').strip()} {(person.get('lastName') or '').strip()}".strip()
@@ -0,0 +1,330 @@
+"""
+Cliente asyncio de NowCerts (contraparte de app.api.client.NowCertsClient).
+
+Misma interfaz (get, count, get_all_paginated) pero con corrutinas, para
+usarlo dentro de servicios async sin bloquear el event loop:
+
+    async with AsyncNowCertsClient() as client:
+        async for page in client.iter_pages("/PolicyList", orderby="changeDate desc"):
+            procesar(page)
+
+- Un pool acotado de conexiones keep-alive (aiohttp, ASYNC_MAX_CONNECTIONS)
+  compartido por todas las descargas del cliente: muchas descargas
+  concurrentes (asyncio.gather) no cuestan un thread cada una.
+- Rate limit cooperativo: las esperas por cuota, 429 y reintentos son
+  asyncio.sleep; la cuota es la misma que la del cliente sincrónico
+  (SharedRateLimiter por token, ver app.api.rate_limiter).
+- iter_pages() deja pedidas las próximas páginas (ASYNC_PREFETCH_PAGES)
+  mientras el que consume decodifica / procesa la actual.
+- El trabajo sincrónico en disco / CPU (cache HTTP, snapshot, historial)
+  corre en threads (asyncio.to_thread), fuera del event loop.
+- Setup, hora límite (deadline) y fetch_status son los de NowCertsClient
+  (ver app.api.client.BaseNowCertsClient).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from app.api.client import BaseNowCertsClient
+from app.api.rate_limiter import DeadlineExceeded, RateLimiter, acquire_async
+from app.api.response_cache import ResponseCache
+from config.settings import (
+    ASYNC_MAX_CONNECTIONS,
+    ASYNC_PREFETCH_PAGES,
+    DEFAULT_TOP,
+    REQUEST_TIMEOUT,
+    SNAPSHOT_DIR,
+)
+
+
+class AsyncNowCertsClient(BaseNowCertsClient):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        access_token: Optional[str] = None,
+        snapshot_dir: str = SNAPSHOT_DIR,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_connections: int = ASYNC_MAX_CONNECTIONS,
+    ):
+        """
+        Args:
+            cache: Cache HTTP (default: según HTTP_CACHE_TTL_SECONDS del .env)
+            access_token: Token de la agencia (default: NOWCERTS_ACCESS_TOKEN del .env)
+            snapshot_dir: Directorio donde se guardan los snapshots (.snap)
+            rate_limiter: Limiter de requests (default: SharedRateLimiter del token)
+            max_connections: Tamaño del pool de conexiones keep-alive
+        """
+        super().__init__(cache, access_token, snapshot_dir, rate_limiter)
+
+        self.max_connections = max_connections
+        # La sesión se crea dentro del event loop (en el primer request)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        print("🔐 Cliente async inicializado con Access Token manual")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Cierra el pool de conexiones y espera los snapshots pendientes."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        await self.flush_snapshots()
+
+    async def flush_snapshots(self):
+        """Espera (sin bloquear el event loop) a que se escriban los snapshots."""
+        await asyncio.get_running_loop().run_in_executor(None, self.snapshot_writer.flush)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=self.auth_headers,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+        return self._session
+
+    # ---------------------------------------------------------
+    # Request base con retry automático
+    # ---------------------------------------------------------
+    async def get(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        use_cache: bool = True,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Igual que NowCertsClient.get, sin bloquear el event loop (el cache
+        en disco se lee / escribe en un thread).
+        """
+
+        url = f"{self.BASE_URL}{endpoint}"
+
+        cached = None
+        if self.cache and use_cache:
+            cached = await asyncio.to_thread(self.cache.lookup, endpoint, params)
+        if cached and cached["fresh"]:
+            print(f"🗃️ GET {url} (cache)")
+            return cached["body"]
+
+        conditional_headers = self.cache.conditional_headers(cached) if cached else {}
+
+        print(f"🌐 GET {url}")
+        if params:
+            print(f"   Params: {params}")
+
+        if deadline is None:
+            deadline = self.deadline
+
+        session = self._get_session()
+        for attempt in range(max_retries):
+            try:
+                await acquire_async(self.rate_limiter, deadline=deadline)
+                async with session.get(url, params=params, headers=conditional_headers or None) as response:
+                    if response.status == 304 and cached:
+                        await asyncio.to_thread(self.cache.mark_revalidated, cached)
+                        print("   ↪ 304 Not Modified (cache revalidado)")
+                        return cached["body"]
+
+                    if response.status == 429:
+                        if attempt < max_retries - 1:
+                            retry_after = response.headers.get("Retry-After", "")
+                            wait_time = int(retry_after) if retry_after.isdigit() else 60
+                            print(f"⏳ Rate limit alcanzado. Esperando {wait_time}s antes de reintentar... (intento {attempt + 1}/{max_retries})")
+                            await asyncio.to_thread(self.rate_limiter.backoff, wait_time)
+                            continue
+                        raise RuntimeError(
+                            "🚨 Rate limit alcanzado después de múltiples intentos. "
+                            "Intenta de nuevo más tarde."
+                        )
+
+                    response.raise_for_status()
+                    # NowCerts no siempre manda Content-Type JSON
+                    data = await response.json(content_type=None)
+
+                    if self.cache and use_cache:
+                        await asyncio.to_thread(
+                            self.cache.store,
+                            endpoint,
+                            params,
+                            data,
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"),
+                        )
+
+                    return data
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 4xx (salvo 429): NowCerts rechazó el request, reintentar no cambia nada
+                if isinstance(e, aiohttp.ClientResponseError) and 400 <= e.status < 500:
+                    raise
+                if attempt < max_retries - 1:
+                    wait_time = 5
+                    if deadline is not None and time.time() + wait_time > deadline:
+                        raise DeadlineExceeded(f"sin tiempo para reintentar: {e}") from e
+                    print(f"⚠️ Error en request: {e}. Reintentando en {wait_time}s...")
+                    await asyncio.sleep(wait_time)
+                    self.slept_seconds += wait_time
+                else:
+                    raise
+
+        raise RuntimeError("No se pudo completar el request después de múltiples intentos")
+
+    async def count(self, endpoint: str) -> Optional[int]:
+        """Cantidad total de registros de un endpoint (OData $count), o None."""
+        data = await self.get(endpoint, params={"$count": "true", "$top": 1}, use_cache=False)
+
+        if isinstance(data, dict) and data.get("@odata.count") is not None:
+            return int(data["@odata.count"])
+        return None
+
+    # ---------------------------------------------------------
+    # Paginación
+    # ---------------------------------------------------------
+    async def iter_pages(
+        self,
+        endpoint: str,
+        *,
+        top: int = DEFAULT_TOP,
+        skip_start: int = 0,
+        orderby: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        total_count: Optional[int] = None,
+        prefetch: int = ASYNC_PREFETCH_PAGES,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Itera las páginas de un endpoint en orden, dejando hasta `prefetch`
+        requests en vuelo mientras se procesa la página actual.
+
+        Si se conoce la cantidad de registros (total_count o planned_counts)
+        no se piden páginas por adelantado más allá del plan; si la última
+        página del plan viene llena (llegaron registros después del $count)
+        se sigue paginando. Sin plan se corta en la primera página incompleta
+        y se cancelan las que estaban pedidas de más.
+
+        Con `deadline` (timestamp) no se piden páginas después de esa hora:
+        si todavía faltaban, lanza DeadlineExceeded después de entregar las
+        que ya estaban pedidas (siempre un prefijo sin huecos del endpoint).
+        """
+        if total_count is None:
+            total_count = self.planned_counts.get(endpoint)
+
+        # Fin del plan (al menos 1 página, por si hay registros nuevos)
+        planned_end = None
+        if total_count is not None:
+            planned_pages = max(1, math.ceil((total_count - skip_start) / top))
+            planned_end = skip_start + planned_pages * top
+        last_skip = skip_start + max_pages * top if max_pages else None
+        next_skip = skip_start
+
+        pending = deque()
+        out_of_time = False
+
+        def schedule():
+            nonlocal next_skip, out_of_time
+            if last_skip is not None and next_skip >= last_skip:
+                return
+            if planned_end is not None and next_skip >= planned_end:
+                return
+            if deadline is not None and time.time() >= deadline:
+                out_of_time = True
+                return
+            params: Dict[str, Any] = {"$top": top, "$skip": next_skip}
+            if orderby:
+                params["$orderby"] = orderby
+            pending.append(asyncio.ensure_future(self.get(endpoint, params=params, deadline=deadline)))
+            next_skip += top
+
+        try:
+            for _ in range(max(1, prefetch)):
+                schedule()
+
+            while pending:
+                data = await pending.popleft()
+                items = data["value"] if isinstance(data, dict) and "value" in data else data
+
+                if items:
+                    yield items
+                # Última página
+                if len(items) < top:
+                    break
+                if not pending and planned_end is not None and next_skip >= planned_end:
+                    print(f"📈 {endpoint}: hay más registros que en el plan, se sigue paginando")
+                    planned_end = None
+                schedule()
+            else:
+                # Sin más páginas pedidas y sin la última (incompleta): se cortó por la hora límite
+                if out_of_time:
+                    raise DeadlineExceeded("no hay tiempo para pedir la próxima página")
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def get_all_paginated(
+        self,
+        endpoint: str,
+        *,
+        top: int = DEFAULT_TOP,
+        skip_start: int = 0,
+        orderby: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        total_count: Optional[int] = None,
+        prefetch: int = ASYNC_PREFETCH_PAGES
+    ) -> List[Dict[str, Any]]:
+        """
+        Descarga todos los registros de un endpoint paginado (ver iter_pages)
+        y guarda el snapshot / historial igual que NowCertsClient.
+
+        Con hora límite (self.deadline) se reparte el tiempo entre los
+        endpoints del plan igual que NowCertsClient.get_all_paginated: al
+        cortarse, completa con el snapshot anterior y el endpoint queda
+        marcado como incompleto en fetch_status.
+        """
+        all_items: List[Dict[str, Any]] = []
+        pages = 0
+        last_page_full = False
+        deadline = self._endpoint_deadline(endpoint, top)
+        timed_out = False
+
+        try:
+            async for items in self.iter_pages(
+                endpoint,
+                top=top,
+                skip_start=skip_start,
+                orderby=orderby,
+                max_pages=max_pages,
+                total_count=total_count,
+                prefetch=prefetch,
+                deadline=deadline,
+            ):
+                pages += 1
+                last_page_full = len(items) == top
+                all_items.extend(items)
+                print(f"📦 Página {pages}: {len(items)} registros (total: {len(all_items)})")
+        except DeadlineExceeded as e:
+            print(f"⏰ {endpoint}: hora límite alcanzada ({e})")
+            timed_out = True
+
+        # Descarga completa: desde el principio y sin cortar por max_pages
+        cut = bool(max_pages) and pages >= max_pages and last_page_full
+        if cut:
+            print("🧪 Límite de páginas alcanzado (modo test)")
+        complete = skip_start == 0 and not cut
+
+        print(f"✅ Total descargado: {len(all_items)} registros")
+
+        # Snapshot anterior, pase a columnas y copia para el historial: en un thread
+        return await asyncio.to_thread(self._finish_download, endpoint, all_items, complete, timed_out)
@@ -1,29 +1,239 @@
+import hashlib
+import itertools
+import math
 import time
 import requests
 import os
-import json
+from collections import namedtuple
 from typing import Dict, Any, List, Optional
 
+from tqdm import tqdm
+
+from app.api.history_store import HistoryStore, history_path
+from app.api.rate_limiter import DeadlineExceeded, RateLimiter, SharedRateLimiter
+from app.api.response_cache import ResponseCache
+from app.api.snapshot_store import SnapshotWriter, load_snapshot, snapshot_path
 from config.settings import (
+    ENV_PATH,
+    HTTP_CACHE_DIR,
+    HTTP_CACHE_MAX_ENTRIES,
+    HTTP_CACHE_MAX_MB,
+    HTTP_CACHE_TTL_SECONDS,
+    HISTORY_STORE,
     NOWCERTS_API_BASE_URL,
     NOWCERTS_ACCESS_TOKEN,
+    RATE_LIMIT_SHARED,
+    RATE_LIMIT_STATE_DIR,
     REQUEST_TIMEOUT,
+    SNAPSHOT_DIR,
 )
 
 
-class NowCertsClient:
+# Estado de la descarga de un endpoint (modo con hora límite, ver NowCertsClient.deadline):
+# complete=False -> se cortó en la hora límite (`fetched` registros vienen de la API,
+# los más nuevos hasta `oldest_change`, y `from_snapshot` del snapshot anterior),
+# por max_pages o no arrancó desde el principio
+FetchStatus = namedtuple("FetchStatus", ["endpoint", "complete", "fetched", "from_snapshot", "oldest_change"])
+
+
+class BaseNowCertsClient:
+    """
+    Estado y lógica compartidos por NowCertsClient y AsyncNowCertsClient
+    (ver app.api.async_client): token, rate limiter, cache HTTP, snapshots,
+    historial, plan de requests y hora límite. Lo que cambia entre los dos
+    es solo cómo se hacen los requests.
+    """
+
     BASE_URL = NOWCERTS_API_BASE_URL
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        access_token: Optional[str] = None,
+        snapshot_dir: str = SNAPSHOT_DIR,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Args:
+            cache: Cache HTTP (default: según HTTP_CACHE_TTL_SECONDS del .env)
+            access_token: Token de la agencia (default: NOWCERTS_ACCESS_TOKEN del .env)
+            snapshot_dir: Directorio donde se guardan los snapshots (.snap)
+            rate_limiter: Limiter de requests (default: SharedRateLimiter del token)
+        """
+        access_token = access_token or NOWCERTS_ACCESS_TOKEN
+        if not access_token:
+            raise ValueError(f"❌ Falta NOWCERTS_ACCESS_TOKEN en el .env ({ENV_PATH})")
+
+        # Identificador corto del token (para nombres de archivos, nunca el token)
+        self.token_id = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:12]
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_writer = SnapshotWriter()
+        # Historial versionado de cada descarga completa (ver app.api.history_store);
+        # se abre en el primer sync completo (ver _record_history)
+        self.history: Optional[HistoryStore] = None
+
+        # Rate limit: por defecto compartido por todos los procesos del host con este token
+        if rate_limiter is None:
+            if RATE_LIMIT_SHARED:
+                rate_limiter = SharedRateLimiter(self.token_id, state_dir=RATE_LIMIT_STATE_DIR)
+            else:
+                rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        # Segundos dormidos entre páginas / reintentos (ver rate_limit_wait_seconds)
+        self.slept_seconds = 0.0
+
+        # Cache HTTP en disco (opcional): explícito o por HTTP_CACHE_TTL_SECONDS del .env.
+        # Un subdirectorio por token: cada agencia ve solo sus respuestas.
+        if cache is None and HTTP_CACHE_TTL_SECONDS > 0:
+            cache = ResponseCache(
+                os.path.join(HTTP_CACHE_DIR, self.token_id),
+                ttl_seconds=HTTP_CACHE_TTL_SECONDS,
+                max_entries=HTTP_CACHE_MAX_ENTRIES,
+                max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024,
+            )
+        self.cache = cache
+        # Cantidad de registros por endpoint (ver app.api.request_planner)
+        self.planned_counts: Dict[str, int] = {}
+        # Hora límite de la corrida (time.time(); None = sin límite) y estado por endpoint
+        self.deadline: Optional[float] = None
+        self.fetch_status: Dict[str, FetchStatus] = {}
+
+        self.auth_headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+
+    @property
+    def rate_limit_wait_seconds(self) -> float:
+        """Tiempo total esperando por rate limit (ventana, 429, sleeps entre páginas / reintentos)."""
+        return self.rate_limiter.waited_seconds + self.slept_seconds
+
+    def _finish_download(
+        self,
+        endpoint: str,
+        all_items: List[Dict[str, Any]],
+        complete: bool,
+        timed_out: bool,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cierra la descarga de un endpoint: si se cortó en la hora límite la
+        completa con el snapshot anterior, registra su fetch_status y manda
+        a escribir el snapshot y, si está completa, el historial.
+
+        Returns:
+            Los registros del endpoint (con los del snapshot, si se cortó)
+        """
+        fetched = len(all_items)
+        from_snapshot = 0
+        if timed_out:
+            complete = False
+            all_items, from_snapshot = self._fill_from_snapshot(endpoint, all_items)
+            print(
+                f"⚠️ {endpoint} INCOMPLETO: {fetched:,} registros nuevos de la API "
+                f"+ {from_snapshot:,} del snapshot anterior"
+            )
+        self.fetch_status[endpoint] = FetchStatus(
+            endpoint,
+            complete,
+            fetched,
+            from_snapshot,
+            all_items[fetched - 1].get("changeDate") if timed_out and fetched else None,
+        )
+
+        # -----------------------------
+        # Guardar snapshot en data_raw (en segundo plano, ver flush_snapshots)
+        # -----------------------------
+        try:
+            self.snapshot_writer.submit(snapshot_path(self.snapshot_dir, endpoint), all_items)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar snapshot de {endpoint}: {e}")
 
-        if not NOWCERTS_ACCESS_TOKEN:
-            raise ValueError("❌ Falta la variable de entorno NOWCERTS_ACCESS_TOKEN")
+        # Versiones nuevas al historial
+        if complete:
+            self._record_history(endpoint, all_items)
+
+        return all_items
+
+    def _record_history(self, endpoint: str, records: List[Dict[str, Any]]):
+        """
+        Registra una descarga completa en el historial, en segundo plano
+        (copia: la ingesta modifica los registros). El .sqlite se abre recién
+        acá, así un cliente que nunca completa una descarga no crea archivos.
+        """
+        if not HISTORY_STORE:
+            return
+        if self.history is None:
+            self.history = HistoryStore(history_path(self.snapshot_dir))
+        self.snapshot_writer.submit_call(
+            self.history.path, self.history.record_sync, endpoint, [dict(r) for r in records]
+        )
+
+    def _endpoint_deadline(self, endpoint: str, top: int) -> Optional[float]:
+        """
+        Hora límite de un endpoint: el tiempo que queda hasta self.deadline,
+        repartido entre los endpoints del plan que faltan descargar en
+        proporción a sus páginas (el último se lleva todo lo que quede).
+        """
+        if self.deadline is None:
+            return None
+
+        pending = [e for e in self.planned_counts if e not in self.fetch_status or e == endpoint]
+        if endpoint not in pending or len(pending) == 1:
+            return self.deadline
+
+        def pages(e):
+            return max(1, math.ceil((self.planned_counts[e] or 0) / top))
+
+        remaining = max(0.0, self.deadline - time.time())
+        share = pages(endpoint) / sum(pages(e) for e in pending)
+        return time.time() + remaining * share
+
+    def _fill_from_snapshot(self, endpoint: str, items: List[Dict[str, Any]]):
+        """
+        Completa una descarga cortada con el snapshot anterior del endpoint:
+        los registros ya descargados ganan; del snapshot se agregan los que
+        no aparecieron (los más viejos, que quedaron afuera del corte).
+
+        Returns:
+            tuple: (registros, cantidad tomada del snapshot)
+        """
+        path = snapshot_path(self.snapshot_dir, endpoint)
+        if not os.path.exists(path):
+            print(f"⚠️ No hay snapshot anterior de {endpoint} para completar la descarga")
+            return items, 0
+
+        try:
+            previous = load_snapshot(path)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el snapshot anterior de {endpoint}: {e}")
+            return items, 0
+
+        seen = {r.get("databaseId") for r in items}
+        older = [r for r in previous if r.get("databaseId") is None or r.get("databaseId") not in seen]
+        return items + older, len(older)
+
+
+class NowCertsClient(BaseNowCertsClient):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        access_token: Optional[str] = None,
+        snapshot_dir: str = SNAPSHOT_DIR,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Args:
+            cache: Cache HTTP (default: según HTTP_CACHE_TTL_SECONDS del .env)
+            access_token: Token de la agencia (default: NOWCERTS_ACCESS_TOKEN del .env)
+            snapshot_dir: Directorio donde se guardan los snapshots (.snap)
+            rate_limiter: Limiter de requests (default: SharedRateLimiter del token)
+        """
+        self.session = requests.Session()
+        super().__init__(cache, access_token, snapshot_dir, rate_limiter)
 
-        self.session.headers.update({
-            "Authorization": f"Bearer {NOWCERTS_ACCESS_TOKEN}",
-            "Content-Type": "application/json"
-        })
+        # True si el último get() se resolvió desde el cache sin tocar la red
+        self.last_from_cache = False
+        self.session.headers.update(self.auth_headers)
 
         print("🔐 Cliente inicializado con Access Token manual")
 
@@ -34,29 +244,60 @@ class NowCertsClient:
         self,
         endpoint: str,
         params: Optional[Dict[str, Any]] = None,
-        max_retries: int = 3
+        max_retries: int = 3,
+        use_cache: bool = True,
+        deadline: Optional[float] = None
     ) -> Dict[str, Any]:
+        """
+        GET con retry automático, cache y rate limit.
+
+        Con hora límite (`deadline` o self.deadline), si el próximo intento
+        no llega a enviarse a tiempo lanza DeadlineExceeded en vez de esperar.
+        """
 
         url = f"{self.BASE_URL}{endpoint}"
+        self.last_from_cache = False
+
+        # Cache: entrada fresca -> sin request; vencida -> request condicional
+        cached = self.cache.lookup(endpoint, params) if self.cache and use_cache else None
+        if cached and cached["fresh"]:
+            self.last_from_cache = True
+            print(f"🗃️ GET {url} (cache)")
+            return cached["body"]
+
+        conditional_headers = self.cache.conditional_headers(cached) if cached else {}
 
         print(f"🌐 GET {url}")
         if params:
             print(f"   Params: {params}")
 
+        if deadline is None:
+            deadline = self.deadline
+
         for attempt in range(max_retries):
             try:
-                response = self.session.get(
-                    url,
-                    params=params,
-                    timeout=REQUEST_TIMEOUT
-                )
+                request_kwargs = {"params": params, "timeout": REQUEST_TIMEOUT}
+                if conditional_headers:
+                    request_kwargs["headers"] = conditional_headers
+
+                # Control de rate limit: cada request real a la red consume cuota
+                self.rate_limiter.acquire(deadline=deadline)
+                response = self.session.get(url, **request_kwargs)
+
+                # 304: el contenido no cambió, se reutiliza el cuerpo del cache
+                if response.status_code == 304 and cached:
+                    self.cache.mark_revalidated(cached)
+                    print("   ↪ 304 Not Modified (cache revalidado)")
+                    return cached["body"]
 
                 # Manejo de rate limit con retry automático
                 if response.status_code == 429:
                     if attempt < max_retries - 1:
-                        wait_time = 60  # Esperar 1 minuto
+                        retry_after = response.headers.get("Retry-After", "")
+                        wait_time = int(retry_after) if retry_after.isdigit() else 60  # Default: 1 minuto
                         print(f"⏳ Rate limit alcanzado. Esperando {wait_time}s antes de reintentar... (intento {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
+                        # El limiter frena a todos los que comparten el token, no solo a este request
+                        self.rate_limiter.backoff(wait_time)
                         continue
                     else:
                         raise RuntimeError(
@@ -65,18 +306,56 @@ class NowCertsClient:
                         )
 
                 response.raise_for_status()
-                return response.json()
+                data = response.json()
+
+                if self.cache and use_cache:
+                    self.cache.store(
+                        endpoint,
+                        params,
+                        data,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+
+                return data
 
             except requests.exceptions.RequestException as e:
+                # 4xx (salvo 429): NowCerts rechazó el request, reintentar no cambia nada
+                status = getattr(e.response, "status_code", None)
+                if status is not None and 400 <= status < 500:
+                    raise
                 if attempt < max_retries - 1:
                     wait_time = 5
+                    if deadline is not None and time.time() + wait_time > deadline:
+                        raise DeadlineExceeded(f"sin tiempo para reintentar: {e}") from e
                     print(f"⚠️ Error en request: {e}. Reintentando en {wait_time}s...")
                     time.sleep(wait_time)
+                    self.slept_seconds += wait_time
                 else:
                     raise
 
         raise RuntimeError("No se pudo completar el request después de múltiples intentos")
 
+    def flush_snapshots(self):
+        """Espera a que terminen de escribirse los snapshots en segundo plano."""
+        self.snapshot_writer.flush()
+
+    # ---------------------------------------------------------
+    # Conteo de registros ($count)
+    # ---------------------------------------------------------
+    def count(self, endpoint: str) -> Optional[int]:
+        """
+        Cantidad total de registros de un endpoint (OData $count).
+
+        Returns:
+            int, o None si el endpoint no devuelve @odata.count
+        """
+        data = self.get(endpoint, params={"$count": "true", "$top": 1}, use_cache=False)
+
+        if isinstance(data, dict) and data.get("@odata.count") is not None:
+            return int(data["@odata.count"])
+        return None
+
     # ---------------------------------------------------------
     # Paginación NowCerts con rate limit control mejorado
     # ---------------------------------------------------------
@@ -88,7 +367,8 @@ class NowCertsClient:
         skip_start: int = 0,
         orderby: Optional[str] = None,
         max_pages: Optional[int] = None,
-        sleep_seconds: float = 0.7  # ⬆️ Aumentado de 0.1 a 0.7 segundos
+        sleep_seconds: float = 0.7,  # ⬆️ Aumentado de 0.1 a 0.7 segundos
+        total_count: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Descarga todos los registros de un endpoint paginado de NowCerts.
@@ -100,15 +380,51 @@ class NowCertsClient:
             
         Rate limit: 100 requests/min = ~0.6s por request
         Usamos 0.7s para estar seguros
+
+        Las páginas se piden hasta recibir una página incompleta. Si se conoce
+        la cantidad de registros (total_count o el plan cargado en
+        planned_counts) se usa solo para la barra de progreso con ETA: si
+        entre el $count y la descarga aparecieron registros nuevos (por
+        changeDate desc empujan a los más viejos hacia el final), se sigue
+        paginando más allá del plan mientras las páginas vengan llenas.
+
+        Modo con hora límite (self.deadline): el tiempo que queda se reparte
+        entre los endpoints del plan que faltan, según sus páginas. Al
+        llegar al límite de este endpoint la descarga se corta (las páginas
+        van por changeDate desc: lo que quedó afuera es lo más viejo), se
+        completa con los registros del snapshot anterior y el endpoint queda
+        marcado como incompleto en fetch_status.
         """
 
         all_items: List[Dict[str, Any]] = []
-        skip = skip_start
-        page = 0
-        request_count = 0
-        start_time = time.time()
+        # Descarga completa (desde el principio y sin cortar por max_pages)
+        complete = skip_start == 0
+        deadline = self._endpoint_deadline(endpoint, top)
+        timed_out = False
+
+        if total_count is None:
+            total_count = self.planned_counts.get(endpoint)
+
+        planned_pages = None
+        if total_count is not None:
+            planned_pages = max(0, math.ceil((total_count - skip_start) / top))
+            if max_pages:
+                planned_pages = min(planned_pages, max_pages)
+            print(f"🗺️ Plan {endpoint}: {total_count:,} registros en {planned_pages} páginas de {top}")
+        offsets = itertools.count(skip_start, top)
+
+        progress = tqdm(
+            total=planned_pages,
+            unit="pág",
+            desc=endpoint.strip("/"),
+            disable=planned_pages is None,
+        )
+
+        for page, skip in enumerate(offsets):
+            if deadline is not None and time.time() >= deadline:
+                timed_out = True
+                break
 
-        while True:
             params: Dict[str, Any] = {
                 "$top": top,
                 "$skip": skip,
@@ -117,19 +433,13 @@ class NowCertsClient:
             if orderby:
                 params["$orderby"] = orderby
 
-            # Control de rate limit: asegurar que no hacemos más de 100 req/min
-            request_count += 1
-            if request_count >= 95:  # Margen de seguridad (95 en vez de 100)
-                elapsed = time.time() - start_time
-                if elapsed < 60:
-                    wait_time = 60 - elapsed + 1  # +1 segundo de margen
-                    print(f"⏳ Llegando al límite de rate (95 requests). Esperando {wait_time:.1f}s...")
-                    time.sleep(wait_time)
-                # Reset contador
-                request_count = 0
-                start_time = time.time()
-
-            data = self.get(endpoint, params=params)
+            # El rate limit (100 req/min) lo controla self.rate_limiter en get()
+            try:
+                data = self.get(endpoint, params=params, deadline=deadline)
+            except DeadlineExceeded as e:
+                print(f"⏰ {endpoint}: hora límite alcanzada ({e})")
+                timed_out = True
+                break
 
             # NowCerts devuelve directamente lista o { value: [...] }
             if isinstance(data, dict) and "value" in data:
@@ -137,46 +447,37 @@ class NowCertsClient:
             else:
                 items = data
 
-            print(f"📦 Página {page + 1}: {len(items)} registros (total: {len(all_items) + len(items)})")
+            if progress.disable:
+                print(f"📦 Página {page + 1}: {len(items)} registros (total: {len(all_items) + len(items)})")
+            else:
+                progress.update(1)
+                progress.set_postfix(registros=len(all_items) + len(items))
 
             if not items:
                 break
 
             all_items.extend(items)
+            # Registros nuevos desde el $count: la descarga sigue más allá del plan
+            if planned_pages is not None and page == planned_pages:
+                print(f"📈 {endpoint}: hay más registros que en el plan, se sigue paginando")
 
             # Última página
             if len(items) < top:
                 break
 
-            skip += top
-            page += 1
-
             # Límite artificial (modo test)
-            if max_pages and page >= max_pages:
+            if max_pages and page + 1 >= max_pages:
                 print("🧪 Límite de páginas alcanzado (modo test)")
+                complete = False
                 break
 
             # Sleep entre páginas
-            if sleep_seconds > 0:
+            if sleep_seconds > 0 and not self.last_from_cache:
                 time.sleep(sleep_seconds)
+                self.slept_seconds += sleep_seconds
 
-        print(f"✅ Total descargado: {len(all_items)} registros")
-
-        # -----------------------------
-        # Guardar snapshot en data_raw
-        # -----------------------------
-        try:
-            os.makedirs("data_raw", exist_ok=True)
-
-            safe_name = endpoint.strip("/").replace("/", "_")
-            path = os.path.join("data_raw", f"{safe_name}.json")
+        progress.close()
 
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(all_items, f, indent=2, ensure_ascii=False)
-
-            print(f"💾 Snapshot guardado en: {path}")
-
-        except Exception as e:
-            print(f"⚠️ No se pudo guardar snapshot de {endpoint}: {e}")
+        print(f"✅ Total descargado: {len(all_items)} registros")
 
-        return all_items
\ No newline at end of file
+        return self._finish_download(endpoint, all_items, complete, timed_out)
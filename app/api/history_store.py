@@ -0,0 +1,251 @@
+"""
+Historial versionado de los endpoints de NowCerts (SQLite local).
+
+Cada descarga completa de un endpoint es un "sync". El historial guarda una
+fila por versión de cada registro (databaseId + changeDate), con el sync en
+que apareció y el sync en que dejó de estar (reemplazada por una versión
+más nueva o borrada en NowCerts). Solo se escriben las versiones nuevas: un
+registro que no cambió entre syncs no ocupa lugar de nuevo.
+
+Con eso se puede reconstruir cualquier endpoint tal como estaba en un sync
+anterior, sin pedir nada a la API:
+
+    client = HistoryClient("data_raw/history.sqlite", as_of="2026-01-05")
+    run_reports(client, [commission_report_spec("2025-12-01")])
+
+HistoryClient expone la misma interfaz que usa el pipeline de NowCertsClient
+(get_all_paginated, get, count), así todo el reporte corre "as of" sin
+cambios.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from datetime import date, datetime
+
+
+HISTORY_FILE = "history.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS syncs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS syncs_endpoint ON syncs (endpoint, synced_at);
+
+CREATE TABLE IF NOT EXISTS versions (
+    endpoint TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    change_date TEXT NOT NULL,
+    first_sync INTEGER NOT NULL,
+    gone_sync INTEGER,
+    position INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (endpoint, record_id, change_date, first_sync)
+);
+CREATE INDEX IF NOT EXISTS versions_live ON versions (endpoint, gone_sync);
+"""
+
+
+def history_path(snapshot_dir):
+    """Ruta del historial dentro del directorio de snapshots."""
+    return os.path.join(snapshot_dir, HISTORY_FILE)
+
+
+class HistoryStore:
+    """
+    Historial versionado en un archivo SQLite.
+
+    Args:
+        path: Archivo .sqlite (se crea si no existe)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def record_sync(self, endpoint, records, synced_at=None):
+        """
+        Registra una descarga COMPLETA de `endpoint`: agrega las versiones
+        nuevas y cierra las que cambiaron o ya no están.
+
+        Returns:
+            str: Resumen del sync (para imprimir)
+        """
+        synced_at = _as_timestamp(synced_at or datetime.now())
+
+        with self._connect() as conn:
+            sync_id = conn.execute(
+                "INSERT INTO syncs (endpoint, synced_at, records) VALUES (?, ?, ?)",
+                (endpoint, synced_at, len(records)),
+            ).lastrowid
+
+            live = dict(conn.execute(
+                "SELECT record_id, change_date FROM versions WHERE endpoint = ? AND gone_sync IS NULL",
+                (endpoint,),
+            ))
+
+            seen = set()
+            new_versions = []
+            for position, r in enumerate(records):
+                record_id = _record_id(r)
+                # Un registro repetido entre páginas: vale el primero (el más nuevo)
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+
+                change_date = str(r.get("changeDate") or "")
+                if live.get(record_id) == change_date:
+                    continue
+                new_versions.append((
+                    endpoint, record_id, change_date, sync_id, position,
+                    zlib.compress(json.dumps(r, separators=(",", ":"), default=str).encode("utf-8")),
+                ))
+
+            closed = [record_id for record_id in live if record_id not in seen]
+            closed += [v[1] for v in new_versions if v[1] in live]
+
+            conn.executemany(
+                "UPDATE versions SET gone_sync = ? WHERE endpoint = ? AND record_id = ? AND gone_sync IS NULL",
+                [(sync_id, endpoint, record_id) for record_id in closed],
+            )
+            conn.executemany(
+                "INSERT INTO versions (endpoint, record_id, change_date, first_sync, position, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                new_versions,
+            )
+
+        return (
+            f"🗄️ Historial {endpoint}: {len(new_versions):,} versiones nuevas, "
+            f"{len(closed):,} reemplazadas / borradas (sync {sync_id})"
+        )
+
+    def syncs(self, endpoint=None):
+        """Syncs registrados: lista de (id, endpoint, synced_at, records)."""
+        with self._connect() as conn:
+            if endpoint:
+                return conn.execute(
+                    "SELECT id, endpoint, synced_at, records FROM syncs WHERE endpoint = ? ORDER BY id",
+                    (endpoint,),
+                ).fetchall()
+            return conn.execute("SELECT id, endpoint, synced_at, records FROM syncs ORDER BY id").fetchall()
+
+    def sync_as_of(self, endpoint, as_of):
+        """
+        Último sync de `endpoint` hasta `as_of` (fecha = hasta el final de ese día).
+
+        Returns:
+            tuple: (id, synced_at, records) o None si no hay ninguno
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT id, synced_at, records FROM syncs WHERE endpoint = ? AND synced_at <= ? "
+                "ORDER BY synced_at DESC, id DESC LIMIT 1",
+                (endpoint, _as_of_bound(as_of)),
+            ).fetchone()
+
+    def load(self, endpoint, sync_id):
+        """
+        Registros de `endpoint` tal como estaban en el sync `sync_id`, en el
+        orden de la API (changeDate desc; empates en el orden en que llegaron).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT payload FROM versions WHERE endpoint = ? AND first_sync <= ? "
+                "AND (gone_sync IS NULL OR gone_sync > ?) ORDER BY change_date DESC, first_sync, position",
+                (endpoint, sync_id, sync_id),
+            )
+            return [json.loads(zlib.decompress(payload)) for (payload,) in rows]
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+
+class HistoryClient:
+    """
+    Cliente de solo lectura que responde desde el historial, "as of" una
+    fecha: cada endpoint se lee del último sync hasta esa fecha. No hace
+    requests a la API.
+
+    Args:
+        history: HistoryStore o ruta del .sqlite
+        as_of: date, datetime o "YYYY-MM-DD[THH:MM[:SS]]"
+        snapshot_dir: Directorio de snapshots (directorio de agentes, etc.)
+    """
+
+    cache = None
+    rate_limit_wait_seconds = 0.0
+
+    def __init__(self, history, as_of, snapshot_dir=None):
+        self.history = history if isinstance(history, HistoryStore) else HistoryStore(history)
+        self.as_of = as_of
+        self.snapshot_dir = snapshot_dir or os.path.dirname(self.history.path)
+        self.planned_counts = {}
+        self._loaded = {}
+
+    def get_all_paginated(self, endpoint, **kwargs):
+        records = self._records(endpoint)
+        if records is None:
+            raise ValueError(f"❌ No hay syncs de {endpoint} en el historial hasta {self.as_of}")
+        return [dict(r) for r in records]
+
+    def get(self, endpoint, params=None, **kwargs):
+        """Página OData ($top / $skip) desde el historial (vacía si el endpoint no tiene syncs)."""
+        records = self._records(endpoint) or []
+        params = params or {}
+        skip = params.get("$skip", 0)
+        top = params.get("$top", len(records))
+        return {"value": [dict(r) for r in records[skip:skip + top]]}
+
+    def count(self, endpoint):
+        records = self._records(endpoint)
+        return None if records is None else len(records)
+
+    def flush_snapshots(self):
+        pass
+
+    def _records(self, endpoint):
+        if endpoint not in self._loaded:
+            sync = self.history.sync_as_of(endpoint, self.as_of)
+            if sync is None:
+                self._loaded[endpoint] = None
+            else:
+                sync_id, synced_at, _ = sync
+                self._loaded[endpoint] = self.history.load(endpoint, sync_id)
+                print(f"🕰️ {endpoint}: {len(self._loaded[endpoint]):,} registros del sync {sync_id} ({synced_at})")
+        return self._loaded[endpoint]
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _record_id(record):
+    record_id = record.get("databaseId")
+    if record_id is not None:
+        return str(record_id)
+    return hashlib.blake2b(
+        json.dumps(record, sort_keys=True, default=str).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def _as_timestamp(value):
+    return value.isoformat(timespec="seconds") if isinstance(value, datetime) else str(value)
+
+
+def _as_of_bound(as_of):
+    """Límite superior de synced_at para `as_of` (una fecha sola cubre todo ese día)."""
+    if isinstance(as_of, datetime):
+        return as_of.isoformat(timespec="seconds")
+    if isinstance(as_of, date):
+        return f"{as_of.isoformat()}T23:59:59"
+    as_of = str(as_of)
+    if len(as_of) == 10:
+        return f"{as_of}T23:59:59"
+    return as_of
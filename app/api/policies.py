@@ -1,8 +1,19 @@
-from typing import Dict
+from typing import Container, Dict, List, Optional
 
-def get_policies_map(client) -> Dict[str, dict]:
+from app.api.agents import AgentDirectory
+from app.api.policy_list import get_policy_list
+from app.services.validators import ValidationReport, ingest_policies
+
+
+def get_policies_map(
+    client,
+    validation_report: Optional[ValidationReport] = None,
+    policy_ids: Optional[Container] = None,
+    agent_directory: Optional[AgentDirectory] = None,
+) -> Dict[str, dict]:
     """
-    Obtiene todas las pólizas desde /PolicyList y construye un mapa:
+    Obtiene todas las pólizas desde /PolicyList y construye un mapa
+    (solo con `policy_ids`, si se indica; ver build_policies_map):
 
     {
         policyId: {
@@ -10,42 +21,56 @@ def get_policies_map(client) -> Dict[str, dict]:
             mga,
             insured,
             agents,
+            agent_list,
             csrs
         }
     }
     """
 
-    print("🔹 Descargando pólizas desde /PolicyList ...")
+    policies = get_policy_list(client)
+
+    # Fechas de la póliza parseadas una sola vez
+    ingest_policies(policies, validation_report if validation_report is not None else ValidationReport())
+
+    return build_policies_map(policies, policy_ids=policy_ids, agent_directory=agent_directory)
+
 
-    policies = client.get_all_paginated(
-        endpoint="/PolicyList",
-        orderby="changeDate desc"
-    )
+def build_policies_map(
+    policies: List[dict],
+    policy_ids: Optional[Container] = None,
+    agent_directory: Optional[AgentDirectory] = None,
+) -> Dict[str, dict]:
+    """
+    Construye el mapa de pólizas a partir de registros de /PolicyList ya
+    ingeridos (ver app.services.validators.ingest_policies).
+
+    Con `policy_ids` (set o filtro de Bloom, ver app.services.semi_join) solo
+    se incluyen esas pólizas: el reporte de comisiones solo necesita las de
+    los endorsements de la ventana.
 
-    print(f"✅ Se descargaron {len(policies)} pólizas.")
+    Los nombres de agentes y CSRs salen del directorio de agentes (unidos por
+    ID, ver app.api.agents); `agent_list` es la tupla de agentes ya separada.
+    """
 
+    directory = agent_directory if agent_directory is not None else AgentDirectory()
     policies_map = {}
 
     for p in policies:
-        # Construir Agents
-        agents_list = p.get("agents", [])
-        agents = ", ".join(
-            f"{a.get('firstName', '').strip()} {a.get('lastName', '').strip()}".strip()
-            for a in agents_list
-        )
-
-        # Construir CSRs
-        csrs_list = p.get("csRs", [])
-        csrs = ", ".join(
-            f"{c.get('firstName', '').strip()} {c.get('lastName', '').strip()}".strip()
-            for c in csrs_list
-        )
+        if policy_ids is not None and p["databaseId"] not in policy_ids:
+            continue
+
+        # Agents / CSRs (nombres del directorio, por ID)
+        agent_list = tuple(directory.name_of(a) for a in p.get("agents") or ())
+        agents = ", ".join(agent_list)
+
+        csrs = ", ".join(directory.name_of(c) for c in p.get("csRs") or ())
 
         policies_map[p["databaseId"]] = {
             "policy_number": p.get("number"),
             "mga": p.get("mgaName"),
             "insured": p.get("insuredCommercialName"),
             "agents": agents,
+            "agent_list": tuple(name for name in agent_list if name),
             "csrs": csrs,
             "effective_date": p.get("effectiveDate"),
             "expiration_date": p.get("expirationDate"),
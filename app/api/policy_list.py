@@ -0,0 +1,20 @@
+"""
+API para trabajar con pólizas (/PolicyList) de NowCerts.
+"""
+
+def get_policy_list(client):
+    """
+    Trae todas las pólizas (registros crudos) desde /PolicyList.
+
+    Lo usan tanto el mapa de pólizas del reporte de comisiones como el
+    reporte de receivables.
+    """
+    print("🔹 Descargando pólizas desde /PolicyList ...")
+
+    policies = client.get_all_paginated(
+        endpoint="/PolicyList",
+        orderby="changeDate desc"
+    )
+
+    print(f"✅ Se descargaron {len(policies)} pólizas.")
+    return policies
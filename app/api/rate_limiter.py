@@ -0,0 +1,297 @@
+"""
+Rate limiter de requests a NowCerts.
+
+NowCerts permite 100 requests/min por token. Cada cliente (un token) tiene
+su propio limiter: cuenta los requests reales a la red en una ventana de 1
+minuto y, al llegar al margen de seguridad (95), espera a que la ventana
+termine antes de seguir.
+
+SharedRateLimiter coordina la cuota entre TODOS los procesos del host que
+usan el mismo token (cron + corrida manual + scripts de tests) a través de
+un archivo de estado protegido con un lock de archivo.
+
+Con `deadline` (timestamp), acquire() no espera más allá de esa hora: si el
+próximo cupo llega tarde, lanza DeadlineExceeded (modo con hora límite).
+
+Para asyncio, acquire_async() usa reserve() de cualquiera de los dos
+limiters y espera con asyncio.sleep: no bloquea el event loop y comparte la
+cuota con los clientes sincrónicos del mismo limiter / token. Ningún limiter
+duerme con su lock tomado, así reserve() nunca queda esperando un sleep.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Margen de seguridad bajo el límite real de NowCerts (100 req/min por token)
+MAX_REQUESTS = 95
+WINDOW_SECONDS = 60
+# RateLimiter espera este margen extra al cerrar cada ventana
+WINDOW_MARGIN_SECONDS = 1
+
+
+class DeadlineExceeded(Exception):
+    """El próximo request no llega a enviarse antes de la hora límite."""
+
+
+class RateLimiter:
+    """
+    Ventana fija de `max_requests` requests cada `window_seconds`.
+
+    Es thread-safe: varios threads que usan el mismo cliente comparten la cuota.
+
+    Args:
+        max_requests: Requests permitidos por ventana (margen bajo el límite real)
+        window_seconds: Duración de la ventana en segundos
+    """
+
+    def __init__(self, max_requests=MAX_REQUESTS, window_seconds=WINDOW_SECONDS):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
+        self._lock = threading.Lock()
+        self._count = 0
+        self._window_start = time.time()
+        self._blocked_until = 0.0
+        self.waited_seconds = 0.0
+
+    def acquire(self, deadline=None):
+        """
+        Reserva 1 request; bloquea si la ventana actual ya está llena.
+
+        El cupo se reserva con el lock tomado, pero la espera es afuera: los
+        demás threads (y reserve(), del cliente asyncio) no quedan trabados
+        detrás de un sleep.
+        """
+        with self._lock:
+            now = time.time()
+            start, window_full = self._next_slot(now)
+            wait_time = start - now
+            if wait_time > 0:
+                _check_deadline(wait_time, deadline)
+            self._take(start)
+
+        if wait_time > 0:
+            if window_full:
+                print(f"⏳ Llegando al límite de rate ({self.max_requests} requests). Esperando {wait_time:.1f}s...")
+            time.sleep(wait_time)
+            with self._lock:
+                self.waited_seconds += wait_time
+
+    def reserve(self):
+        """
+        Reserva 1 request si hay cupo, sin bloquear.
+
+        Returns:
+            float: 0 si lo reservó; si no, segundos a esperar antes de reintentar
+        """
+        with self._lock:
+            now = time.time()
+            start, _ = self._next_slot(now)
+            if start > now:
+                return start - now
+            self._take(start)
+            return 0.0
+
+    def backoff(self, seconds):
+        """NowCerts respondió 429: no enviar nada durante `seconds`."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    # -----------------------
+    # Helpers (con el lock tomado)
+    # -----------------------
+
+    def _next_slot(self, now):
+        """
+        Momento del próximo cupo libre.
+
+        Returns:
+            (timestamp, True si hay que esperar a que termine la ventana llena)
+        """
+        start = max(now, self._blocked_until)
+        # Ventana ya reservada a futuro por otro thread que está esperando
+        if self._count and self._window_start > start:
+            start = self._window_start
+
+        if self._count >= self.max_requests and start - self._window_start < self.window_seconds:
+            return self._window_start + self.window_seconds + WINDOW_MARGIN_SECONDS, True
+        return start, False
+
+    def _take(self, start):
+        """Toma el cupo que arranca en `start` (ver _next_slot)."""
+        # La ventana arranca con su primer request
+        if self._count == 0 or self._count >= self.max_requests:
+            self._window_start = start
+            self._count = 0
+        self._count += 1
+
+
+class SharedRateLimiter:
+    """
+    Ventana deslizante de `max_requests` requests cada `window_seconds`,
+    compartida por todos los procesos del host con el mismo token.
+
+    El estado (timestamps de los últimos requests y un eventual bloqueo por
+    429) vive en un archivo JSON por token; cada acquire() lo lee y actualiza
+    con el archivo bloqueado, así dos procesos nunca toman el mismo cupo.
+
+    Args:
+        token_id: Identificador del token (hash corto, nunca el token)
+        state_dir: Directorio de los archivos de estado (default: temp del sistema)
+        max_requests: Requests permitidos por ventana (margen bajo el límite real)
+        window_seconds: Duración de la ventana en segundos
+    """
+
+    def __init__(self, token_id, state_dir=None, max_requests=MAX_REQUESTS, window_seconds=WINDOW_SECONDS):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
+        state_dir = state_dir or os.path.join(tempfile.gettempdir(), "nowcerts_rate_limit")
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"{token_id}.json")
+
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, deadline=None):
+        """Reserva 1 request; bloquea hasta que haya cupo en la ventana compartida."""
+        announced = False
+        while True:
+            wait_time = self.reserve()
+            if wait_time <= 0:
+                return
+
+            _check_deadline(wait_time, deadline)
+            if not announced:
+                print(f"⏳ Cuota compartida del token agotada ({self.max_requests} req/min). Esperando {wait_time:.1f}s...")
+                announced = True
+            time.sleep(wait_time)
+            self.waited_seconds += wait_time
+
+    def reserve(self):
+        """
+        Reserva 1 request en la ventana compartida si hay cupo, sin bloquear
+        (solo el lock del archivo de estado).
+
+        Returns:
+            float: 0 si lo reservó; si no, segundos a esperar antes de reintentar
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            recent = [t for t in state["requests"] if now - t < self.window_seconds]
+            wait_time = state["blocked_until"] - now
+
+            if wait_time <= 0 and len(recent) < self.max_requests:
+                recent.append(now)
+                state["requests"] = recent
+                return 0.0
+
+            if wait_time <= 0:
+                # Se libera cupo cuando sale de la ventana el request más viejo
+                wait_time = recent[0] + self.window_seconds - now + 0.05
+            state["requests"] = recent
+            return wait_time
+
+    def backoff(self, seconds):
+        """NowCerts respondió 429: ningún proceso con este token envía nada durante `seconds`."""
+        with self._locked_state() as state:
+            state["blocked_until"] = max(state["blocked_until"], time.time() + seconds)
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+
+    def _locked_state(self):
+        return _LockedState(self.path, self._lock)
+
+
+class _LockedState:
+    """Context manager: abre el archivo de estado con lock exclusivo y lo reescribe al salir."""
+
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        self.f = open(self.path, "a+", encoding="utf-8")
+        _lock_file(self.f)
+
+        self.f.seek(0)
+        try:
+            self.state = json.loads(self.f.read() or "{}")
+        except ValueError:
+            self.state = {}
+        self.state.setdefault("requests", [])
+        self.state.setdefault("blocked_until", 0.0)
+        return self.state
+
+    def __exit__(self, *exc):
+        try:
+            self.f.seek(0)
+            self.f.truncate()
+            self.f.write(json.dumps(self.state))
+            self.f.flush()
+        finally:
+            _unlock_file(self.f)
+            self.f.close()
+            self.thread_lock.release()
+
+
+async def acquire_async(limiter, deadline=None):
+    """
+    Reserva 1 request de `limiter` (RateLimiter o SharedRateLimiter) sin
+    bloquear el event loop: mientras no hay cupo espera con asyncio.sleep.
+
+    SharedRateLimiter.reserve() lee y escribe el archivo de estado con un lock
+    de archivo (que otro proceso puede tener tomado), así que corre en el
+    executor del loop.
+    """
+    announced = False
+    loop = asyncio.get_running_loop()
+    while True:
+        if isinstance(limiter, SharedRateLimiter):
+            wait_time = await loop.run_in_executor(None, limiter.reserve)
+        else:
+            wait_time = limiter.reserve()
+        if wait_time <= 0:
+            return
+
+        _check_deadline(wait_time, deadline)
+        if not announced:
+            print(f"⏳ Límite de rate ({limiter.max_requests} req/min). Esperando {wait_time:.1f}s...")
+            announced = True
+        await asyncio.sleep(wait_time)
+        limiter.waited_seconds += wait_time
+
+
+def _check_deadline(wait_time, deadline):
+    if deadline is not None and time.time() + wait_time > deadline:
+        raise DeadlineExceeded(f"el próximo cupo llega en {wait_time:.1f}s, después de la hora límite")
+
+
+def _lock_file(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
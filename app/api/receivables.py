@@ -0,0 +1,21 @@
+"""
+API para trabajar con receivables (cuentas por cobrar) de NowCerts.
+"""
+
+from config.settings import NOWCERTS_RECEIVABLES_ENDPOINT
+
+
+def get_receivables(client):
+    """
+    Trae todos los receivables (facturas pendientes de cobro) de las pólizas.
+    """
+    try:
+        receivables = client.get_all_paginated(
+            endpoint=NOWCERTS_RECEIVABLES_ENDPOINT,
+            orderby="changeDate desc"  # Campo principal para ordenar
+        )
+        print(f"✅ Receivables obtenidos: {len(receivables)}")
+        return receivables
+    except Exception as e:
+        print(f"❌ Error al obtener receivables: {e}")
+        return []
@@ -0,0 +1,111 @@
+"""
+Planificador de requests a NowCerts.
+
+Antes de una descarga grande pide a cada endpoint la cantidad de registros
+(OData $count) y calcula el plan exacto de páginas, el total de requests y
+el tiempo estimado bajo el rate limit. El plan queda cargado en el cliente
+(client.planned_counts), que lo usa solo para el total / ETA de la barra de
+progreso y para repartir la hora límite entre endpoints: la paginación sigue
+pidiendo páginas mientras vengan llenas, diga lo que diga el plan.
+"""
+
+import math
+from collections import namedtuple
+
+from app.api.rate_limiter import MAX_REQUESTS, WINDOW_MARGIN_SECONDS, WINDOW_SECONDS
+from config.settings import DEFAULT_TOP
+
+
+# records / pages / requests son None si el endpoint no informó $count
+EndpointPlan = namedtuple("EndpointPlan", ["endpoint", "records", "pages", "requests"])
+
+# Ventana efectiva del RateLimiter por defecto (incluye su margen)
+RATE_LIMIT_REQUESTS = MAX_REQUESTS
+RATE_LIMIT_WINDOW_SECONDS = WINDOW_SECONDS + WINDOW_MARGIN_SECONDS
+# Pausa por defecto de get_all_paginated entre páginas
+PAGE_SLEEP_SECONDS = 0.7
+
+# Latencia promedio estimada de una página de NowCerts (segundos)
+AVG_REQUEST_SECONDS = 1.5
+
+
+def plan_requests(client, endpoints, top=DEFAULT_TOP):
+    """
+    Cuenta los registros de cada endpoint y arma el plan de descarga.
+
+    Args:
+        client: Cliente de NowCerts API
+        endpoints: Lista de endpoints (ej. "/PolicyList")
+        top: Registros por página
+
+    Returns:
+        list[EndpointPlan]
+    """
+    plans = []
+    for endpoint in endpoints:
+        try:
+            records = client.count(endpoint)
+        except Exception as e:
+            print(f"⚠️ No se pudo contar {endpoint}: {e}")
+            records = None
+
+        if records is None:
+            plans.append(EndpointPlan(endpoint, None, None, None))
+            continue
+
+        client.planned_counts[endpoint] = records
+        # Un endpoint vacío igual hace 1 request para confirmarlo
+        pages = math.ceil(records / top)
+        plans.append(EndpointPlan(endpoint, records, pages, max(pages, 1)))
+
+    return plans
+
+
+def estimate_seconds(requests, avg_request_seconds=AVG_REQUEST_SECONDS, sleep_seconds=PAGE_SLEEP_SECONDS):
+    """
+    Tiempo estimado de descarga de un endpoint bajo el rate limit.
+
+    get_all_paginated duerme `sleep_seconds` entre páginas y, cada
+    RATE_LIMIT_REQUESTS requests, el limiter espera a que cierre la ventana.
+    """
+    if not requests:
+        return 0.0
+
+    per_request = avg_request_seconds + sleep_seconds
+    windows, remainder = divmod(requests, RATE_LIMIT_REQUESTS)
+    full_window = max(RATE_LIMIT_WINDOW_SECONDS, RATE_LIMIT_REQUESTS * per_request)
+    return windows * full_window + remainder * per_request
+
+
+def print_plan(plans, avg_request_seconds=AVG_REQUEST_SECONDS):
+    """Imprime el plan de descarga por endpoint y el total estimado."""
+    print("🗺️ Plan de descarga:")
+
+    total_requests = 0
+    total_seconds = 0.0
+    unknown = []
+
+    for plan in plans:
+        if plan.records is None:
+            unknown.append(plan.endpoint)
+            print(f"   {plan.endpoint:<48} ?  ($count no disponible)")
+            continue
+
+        seconds = estimate_seconds(plan.requests, avg_request_seconds)
+        total_requests += plan.requests
+        total_seconds += seconds
+        print(
+            f"   {plan.endpoint:<48} {plan.records:>9,} registros  "
+            f"{plan.pages:>5} páginas  ~{_format_duration(seconds)}"
+        )
+
+    print(f"   Total: {total_requests:,} requests, ~{_format_duration(total_seconds)}")
+    if unknown:
+        print(f"   ⚠️ Sin conteo ({len(unknown)} endpoints): se descubren página a página, el total es mayor")
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,206 @@
+"""
+Cache en disco de respuestas HTTP de NowCerts.
+
+Cada respuesta se guarda por (endpoint, params) con su ETag / Last-Modified.
+Mientras la entrada está dentro del TTL se devuelve sin tocar la red; cuando
+vence, el cliente revalida con If-None-Match / If-Modified-Since y un 304
+reutiliza el cuerpo guardado. El tamaño total está acotado por cantidad de
+entradas y por bytes, con desalojo LRU.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Cache LRU en disco de respuestas JSON.
+
+    Args:
+        cache_dir: Directorio donde se guardan las entradas (1 archivo por entrada)
+        ttl_seconds: Tiempo durante el cual una entrada se usa sin revalidar
+        max_entries: Cantidad máxima de entradas
+        max_bytes: Tamaño máximo total en disco
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=3600, max_entries=5000, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> tamaño en bytes (orden = LRU)
+        self._total_bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0, "stores": 0, "evictions": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    # -----------------------
+    # API pública
+    # -----------------------
+
+    def lookup(self, endpoint, params):
+        """
+        Busca una entrada para (endpoint, params).
+
+        Returns:
+            dict con {key, fresh, body, etag, last_modified} o None si no hay entrada
+        """
+        key = cache_key(endpoint, params)
+        with self._lock:
+            if key not in self._index:
+                self._stats["misses"] += 1
+                return None
+            self._index.move_to_end(key)
+
+        entry = self._read(key)
+        if entry is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        # mtime = último uso, así el orden LRU sobrevive entre corridas
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+        fresh = time.time() - entry["stored_at"] < self.ttl_seconds
+        with self._lock:
+            self._stats["hits" if fresh else "stale"] += 1
+
+        return {
+            "key": key,
+            "fresh": fresh,
+            "body": entry["body"],
+            "etag": entry.get("etag"),
+            "last_modified": entry.get("last_modified"),
+        }
+
+    def conditional_headers(self, entry):
+        """Headers de revalidación para una entrada vencida."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, endpoint, params, body, etag=None, last_modified=None):
+        """Guarda (o reemplaza) la respuesta de (endpoint, params)."""
+        key = cache_key(endpoint, params)
+        self._write(key, {
+            "endpoint": endpoint,
+            "params": params,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        })
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def mark_revalidated(self, entry):
+        """El servidor respondió 304: la entrada vuelve a estar fresca."""
+        cached = self._read(entry["key"])
+        if cached is not None:
+            cached["stored_at"] = time.time()
+            self._write(entry["key"], cached)
+        with self._lock:
+            self._stats["revalidated"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._index), bytes=self._total_bytes)
+
+    def print_stats(self):
+        s = self.stats()
+        print(
+            f"🗃️ Cache HTTP: {s['hits']} hits, {s['revalidated']} revalidados (304), "
+            f"{s['misses'] + s['stale'] - s['revalidated']} descargas, "
+            f"{s['entries']} entradas ({s['bytes'] / 1024 / 1024:.1f} MB), {s['evictions']} desalojadas"
+        )
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _write(self, key, entry):
+        """Escribe una entrada (archivo temporal + os.replace) y actualiza su tamaño en el índice."""
+        payload = json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+        # Temporal único: otro proceso con el mismo token puede estar
+        # escribiendo la misma clave en este directorio
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(payload)
+            self._total_bytes += len(payload)
+            self._evict()
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._total_bytes -= self._index.pop(key, 0)
+            return None
+
+    def _load_index(self):
+        """Reconstruye el índice LRU desde disco (orden por última modificación)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """Desaloja las entradas menos usadas hasta respetar los topes (con lock tomado)."""
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+def cache_key(endpoint, params):
+    """Clave estable para (endpoint, params)."""
+    raw = json.dumps([endpoint, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,178 @@
+"""
+Snapshots compactos de endpoints de NowCerts (formato columnar comprimido).
+
+Cada snapshot guarda una lista de registros (dicts) por columnas: todos los
+valores de un campo juntos en un array JSON, comprimido con zlib. Las
+columnas repiten mucho (MGA, tipo, estado, fechas) y comprimen muy bien.
+
+Estructura del archivo (.snap):
+
+    MAGIC (8 bytes) | largo del header (4 bytes, big endian) | header JSON | bloques
+
+El header tiene la cantidad de filas, el orden de las columnas y el offset /
+largo de cada bloque comprimido. El loader abre el archivo con mmap y solo
+descomprime las columnas pedidas.
+
+La escritura (serializar + comprimir + disco) corre en un thread de fondo
+con SnapshotWriter, fuera del camino crítico de la corrida. El mismo thread
+registra cada descarga en el historial versionado (ver app.api.history_store).
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+MAGIC = b"NCSNAP01"
+SNAPSHOT_EXTENSION = ".snap"
+COMPRESSION_LEVEL = 6
+
+
+def snapshot_path(snapshot_dir, endpoint):
+    """Ruta del snapshot de un endpoint (ej. data_raw/PolicyList.snap)."""
+    safe_name = endpoint.strip("/").replace("/", "_")
+    return os.path.join(snapshot_dir, f"{safe_name}{SNAPSHOT_EXTENSION}")
+
+
+def to_columns(records):
+    """
+    Pasa registros a columnas: {campo: [valores]}.
+
+    Los campos ausentes en un registro se anotan aparte (`missing`) para que
+    load_snapshot devuelva exactamente los mismos dicts.
+
+    Returns:
+        tuple: (columns, missing) con missing = {campo: [índices de fila]}
+    """
+    names = {}
+    for r in records:
+        for k in r:
+            names.setdefault(k, None)
+
+    columns = {}
+    missing = {}
+    for name in names:
+        try:
+            # Caso normal: el campo está en todos los registros
+            columns[name] = [r[name] for r in records]
+            continue
+        except KeyError:
+            pass
+
+        columns[name] = [r.get(name) for r in records]
+        missing[name] = [i for i, r in enumerate(records) if name not in r]
+
+    return columns, missing
+
+
+def write_snapshot(path, rows, columns, missing=None):
+    """Serializa y comprime las columnas a `path` (escritura atómica)."""
+    blocks = []
+    index = []
+    offset = 0
+    for name, values in columns.items():
+        block = zlib.compress(
+            json.dumps(values, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"),
+            COMPRESSION_LEVEL,
+        )
+        index.append([name, offset, len(block)])
+        blocks.append(block)
+        offset += len(block)
+
+    header = json.dumps({"rows": rows, "columns": index, "missing": missing or {}}).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(">I", len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, columns=None):
+    """
+    Carga un snapshot como lista de dicts.
+
+    Args:
+        path: Ruta del .snap
+        columns: Campos a cargar (default: todos). Las demás columnas ni se
+            descomprimen.
+
+    Returns:
+        list[dict]
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"❌ {path} no es un snapshot válido")
+
+            (header_len,) = struct.unpack(">I", mm[len(MAGIC):len(MAGIC) + 4])
+            data_start = len(MAGIC) + 4 + header_len
+            header = json.loads(mm[len(MAGIC) + 4:data_start])
+
+            wanted = None if columns is None else set(columns)
+            names = []
+            values = []
+            for name, offset, length in header["columns"]:
+                if wanted is not None and name not in wanted:
+                    continue
+                start = data_start + offset
+                names.append(name)
+                values.append(json.loads(zlib.decompress(mm[start:start + length])))
+
+    records = [dict(zip(names, row)) for row in zip(*values)] if names else [{} for _ in range(header["rows"])]
+
+    for name, rows in header["missing"].items():
+        if name in names:
+            for i in rows:
+                del records[i][name]
+
+    return records
+
+
+class SnapshotWriter:
+    """
+    Escribe snapshots en un thread de fondo.
+
+    El pase a columnas se hace en el momento (es barato y deja una copia
+    independiente de los registros, que después la ingesta modifica en el
+    lugar); la serialización, compresión y escritura corren en el fondo.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+        self._pending = []
+
+    def submit(self, path, records):
+        columns, missing = to_columns(records)
+        future = self._executor.submit(write_snapshot, path, len(records), columns, missing)
+        self._pending.append((path, future))
+        return future
+
+    def submit_call(self, path, fn, *args):
+        """
+        Corre fn(*args) en el thread de fondo, en orden con los snapshots.
+        Si fn devuelve un texto, flush() lo imprime.
+        """
+        future = self._executor.submit(fn, *args)
+        self._pending.append((path, future))
+        return future
+
+    def flush(self):
+        """Espera a que terminen las escrituras pendientes (informa errores sin cortar la corrida)."""
+        pending, self._pending = self._pending, []
+        for path, future in pending:
+            try:
+                result = future.result()
+                if isinstance(result, str):
+                    print(result)
+                else:
+                    print(f"💾 Snapshot guardado en: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar snapshot {path}: {e}")
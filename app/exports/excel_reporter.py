@@ -1,5 +1,12 @@
+from datetime import date
+
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+
+from app.services.commision_calculator import apply_cancel_sign, safe_money
+from app.services.summary_report_service import SUMMARY_TOTAL
 
 
 # Colores profesionales
@@ -19,18 +26,30 @@ THIN_BORDER = Border(
 )
 
 
-def export_endorsements_to_excel(endorsements, filename):
+def export_endorsements_to_excel(endorsements, filename, summaries=None, anomalies=None, write_only=False,
+                                 data_status=None):
     """
     Exporta endorsements a Excel con formato simplificado.
     - Sin columnas extra de Agent Name / Agent Commission ID
     - 1 agente y 1 CSR por fila
     - Solo endorsements con comisiones
+    - Hojas de resumen precalculadas (si se pasan `summaries`)
+    - Hoja de anomalías de la ingesta (si se pasan `anomalies`)
+    - Hoja con el estado de cada endpoint (si se pasa `data_status`, modo
+      con hora límite); si hay alguno incompleto va primera
+
+    Con write_only=True usa el modo streaming de openpyxl: las filas se
+    escriben a disco a medida que llegan (sirve con el ExternalSorter del
+    modo memoria acotada). En ese modo Excel ignora el alto de las filas.
     """
     print(f"🔹 Exportando a Excel en '{filename}' ...")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Endorsements Report"
+    wb = Workbook(write_only=write_only)
+    if write_only:
+        ws = wb.create_sheet(title="Endorsements Report")
+    else:
+        ws = wb.active
+        ws.title = "Endorsements Report"
 
     # Headers simplificados
     headers = [
@@ -48,85 +67,8 @@ def export_endorsements_to_excel(endorsements, filename):
         "Agent Commission",
     ]
 
-    ws.append(headers)
-
-    # ---- Estilo headers ----
-    for col in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col)
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(
-            horizontal="center",
-            vertical="center",
-            wrap_text=True
-        )
-        cell.border = THIN_BORDER
-
-    ws.row_dimensions[1].height = 35
-
-    current_row = 2
-
-    # ---- Contenido ----
-    for e in endorsements:
-        endorsement_type_raw = e.get("endorsement_type") or ""
-        endorsement_type = endorsement_type_raw.lower()
-        is_cancel = "cancel" in endorsement_type
-
-        amount = safe_money(e.get("endorsement_amount"))
-        if is_cancel and amount > 0:
-            amount = -amount
-        
-        agency_comm = safe_money(e.get("agency_commission"))
-        agent_comm = safe_money(e.get("agent_commission"))
-        
-        # Si es cancel, las comisiones también en negativo
-        if is_cancel:
-            if agency_comm > 0:
-                agency_comm = -agency_comm
-            if agent_comm > 0:
-                agent_comm = -agent_comm
-        
-        total_comm = agency_comm + agent_comm
-
-        row_idx = current_row
-
-        # Escribir datos
-        ws.cell(row=row_idx, column=1, value=e.get("endorsement_id"))
-        ws.cell(row=row_idx, column=2, value=_format_date(e.get("endorsement_effective")))
-        ws.cell(row=row_idx, column=3, value=amount)
-        ws.cell(row=row_idx, column=4, value=endorsement_type_raw)
-        ws.cell(row=row_idx, column=5, value=e.get("mga"))
-        ws.cell(row=row_idx, column=6, value=e.get("policy_number"))
-        ws.cell(row=row_idx, column=7, value=_format_date(e.get("policy_effective_date")))
-        ws.cell(row=row_idx, column=8, value=_format_date(e.get("policy_expiration_date")))
-        ws.cell(row=row_idx, column=9, value=e.get("insured"))
-        ws.cell(row=row_idx, column=10, value=e.get("agent"))  # Agente individual
-        ws.cell(row=row_idx, column=11, value=agency_comm)
-        ws.cell(row=row_idx, column=12, value=agent_comm)
-        
-        # Formato dinero
-        ws.cell(row=row_idx, column=3).number_format = MONEY_FORMAT
-        ws.cell(row=row_idx, column=11).number_format = MONEY_FORMAT
-        ws.cell(row=row_idx, column=12).number_format = MONEY_FORMAT
-        
-        # Si es cancel: valores en rojo
-        if is_cancel:
-            ws.cell(row=row_idx, column=3).font = Font(name="Arial", size=10, color="FF0000")
-            ws.cell(row=row_idx, column=11).font = Font(name="Arial", size=10, color="FF0000")
-            ws.cell(row=row_idx, column=12).font = Font(name="Arial", size=10, color="FF0000")
-
-        # Font y bordes
-        for col in range(1, len(headers) + 1):
-            cell = ws.cell(row=row_idx, column=col)
-            cell.font = NORMAL_FONT
-            cell.border = THIN_BORDER
-            cell.alignment = Alignment(vertical="center", wrap_text=False)
-
-        ws.row_dimensions[row_idx].height = 20
-
-        current_row += 1
-
     # ---- Ancho de columnas ----
+    # (antes de escribir filas: en modo write_only no se pueden cambiar después)
     widths = {
         "A": 36,  # Endorsement ID
         "B": 16,  # Date
@@ -147,42 +89,379 @@ def export_endorsements_to_excel(endorsements, filename):
 
     # Congelar header y primera columna
     ws.freeze_panes = "B2"
-    
+
+    # ---- Headers ----
+    _append_header(ws, headers)
+
+    current_row = 2
+    money_columns = (2, 10, 11)  # Amount, Agency Comm, Agent Comm (base 0)
+    row_alignment = Alignment(vertical="center", wrap_text=False)
+
+    # ---- Contenido ----
+    for e in endorsements:
+        endorsement_type_raw = e.get("endorsement_type") or ""
+
+        # Si es cancel, monto y comisiones en negativo
+        amount, agency_comm, agent_comm = apply_cancel_sign(
+            endorsement_type_raw,
+            safe_money(e.get("endorsement_amount")),
+            safe_money(e.get("agency_commission")),
+            safe_money(e.get("agent_commission")),
+        )
+
+        values = [
+            e.get("endorsement_id"),
+            _format_date(e.get("endorsement_effective")),
+            amount,
+            endorsement_type_raw,
+            e.get("mga"),
+            e.get("policy_number"),
+            _format_date(e.get("policy_effective_date")),
+            _format_date(e.get("policy_expiration_date")),
+            e.get("insured"),
+            e.get("agent"),  # Agente individual
+            agency_comm,
+            agent_comm,
+        ]
+
+        _append_styled_row(ws, values, money_columns=money_columns, alignment=row_alignment)
+        if not write_only:
+            ws.row_dimensions[current_row].height = 20
+
+        current_row += 1
+
     # Agregar autofiltros
-    ws.auto_filter.ref = ws.dimensions
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{current_row - 1}"
     print("✅ Autofiltros agregados a todas las columnas")
 
+    # ---- Hojas de resumen ----
+    if summaries:
+        grand_total = summaries.get(SUMMARY_TOTAL)
+        names = [name for name in summaries if name != SUMMARY_TOTAL]
+        for name in names:
+            _write_summary_sheet(wb, name, summaries[name], grand_total)
+        print(f"✅ Hojas de resumen agregadas: {', '.join(names)}")
+
+    # ---- Anomalías de datos ----
+    if anomalies:
+        _write_anomalies_sheet(wb, anomalies)
+        print(f"⚠️ Hoja 'Data Anomalies' agregada ({len(anomalies):,} anomalías)")
+
+    # ---- Estado de los datos (modo con hora límite) ----
+    if data_status:
+        stale = _write_data_status_sheet(wb, data_status)
+        print(f"{'⚠️' if stale else '✅'} Hoja 'Data Status' agregada ({stale} endpoints incompletos)")
+
     wb.save(filename)
     print(f"✅ Excel generado: {filename}")
     print(f"   Total de filas: {current_row - 1:,}")
 
 
+def _write_anomalies_sheet(wb, anomalies):
+    """Escribe la hoja con las anomalías detectadas durante la ingesta."""
+    ws = wb.create_sheet(title="Data Anomalies")
+
+    for col, width in {"A": 44, "B": 36, "C": 36, "D": 30, "E": 50}.items():
+        ws.column_dimensions[col].width = width
+    ws.freeze_panes = "A2"
+
+    headers = ["Source", "Record ID", "Field", "Raw Value", "Reason"]
+    _append_header(ws, headers)
+
+    for a in anomalies:
+        _append_styled_row(ws, [a["source"], a["record_id"], a["field"], str(a["value"]), a["reason"]])
+
+    ws.auto_filter.ref = f"A1:E{len(anomalies) + 1}"
+
+
+STALE_FILL = PatternFill(start_color="F8CBAD", end_color="F8CBAD", fill_type="solid")
+
+
+def _write_data_status_sheet(wb, data_status):
+    """
+    Escribe la hoja con el estado de cada endpoint (FetchStatus del cliente).
+
+    Returns:
+        int: Cantidad de endpoints incompletos
+    """
+    stale = sum(1 for s in data_status if not s.complete)
+    ws = wb.create_sheet(title="Data Status", index=0 if stale else None)
+
+    for col, width in {"A": 48, "B": 14, "C": 16, "D": 22, "E": 28}.items():
+        ws.column_dimensions[col].width = width
+    ws.freeze_panes = "A2"
+
+    headers = ["Endpoint", "Status", "From API", "From Local Snapshot", "Oldest changeDate Fetched"]
+    _append_header(ws, headers)
+
+    for s in data_status:
+        _append_styled_row(
+            ws,
+            [s.endpoint, "Complete" if s.complete else "STALE", s.fetched, s.from_snapshot, s.oldest_change or ""],
+            fill=None if s.complete else STALE_FILL,
+        )
+
+    return stale
+
+
+def export_delta_to_excel(delta_rows, filename):
+    """
+    Exporta el reporte delta (filas nuevas, modificadas y desaparecidas
+    desde la corrida anterior) con los valores de comisión previos.
+    """
+    print(f"🔹 Exportando delta a Excel en '{filename}' ...")
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Changes"
+
+    headers = [
+        "Status",
+        "Endorsement ID",
+        "Endorsement Date",
+        "Endorsement Type",
+        "Policy Number",
+        "Agent/CSR",
+        "Agency Commission",
+        "Agent Commission",
+        "Previous Agency Commission",
+        "Previous Agent Commission",
+    ]
+    _append_header(ws, headers)
+
+    status_order = {"new": 0, "changed": 1, "removed": 2}
+    for d in sorted(delta_rows, key=lambda d: status_order.get(d["status"], 3)):
+        _append_styled_row(ws, [
+            d["status"].upper(),
+            d.get("endorsement_id"),
+            _format_date(d.get("endorsement_effective")),
+            d.get("endorsement_type"),
+            d.get("policy_number"),
+            d.get("agent"),
+            d.get("agency_commission"),
+            d.get("agent_commission"),
+            d.get("previous_agency_commission"),
+            d.get("previous_agent_commission"),
+        ], money_columns=(6, 7, 8, 9))
+
+    widths = {"A": 12, "B": 36, "C": 16, "D": 26, "E": 20, "F": 30, "G": 18, "H": 18, "I": 20, "J": 20}
+    for col, width in widths.items():
+        ws.column_dimensions[col].width = width
+
+    ws.freeze_panes = "C2"
+    ws.auto_filter.ref = ws.dimensions
+
+    wb.save(filename)
+    print(f"✅ Delta generado: {filename}")
+    print(f"   Filas con cambios: {len(delta_rows):,}")
+
+
+def export_receivables_to_excel(receivables, filename):
+    """
+    Exporta el reporte de receivables (saldo pendiente por póliza) con una
+    hoja de totales por tramo de antigüedad.
+    """
+    print(f"🔹 Exportando receivables a Excel en '{filename}' ...")
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Receivables"
+
+    headers = [
+        "Receivable ID",
+        "Policy Number",
+        "MGA",
+        "Insured",
+        "Agents",
+        "Due Date",
+        "Amount",
+        "Paid",
+        "Balance",
+        "Days Past Due",
+        "Aging",
+        "Status",
+    ]
+    _append_header(ws, headers)
+
+    aging_totals = {}
+    for r in receivables:
+        _append_styled_row(ws, [
+            r.get("receivable_id"),
+            r.get("policy_number"),
+            r.get("mga"),
+            r.get("insured"),
+            r.get("agents"),
+            _format_date(r.get("due_date")),
+            r.get("amount"),
+            r.get("paid"),
+            r.get("balance"),
+            r.get("days_past_due"),
+            r.get("aging"),
+            r.get("status"),
+        ], money_columns=(6, 7, 8))
+
+        totals = aging_totals.setdefault(r.get("aging"), [0, 0.0])
+        totals[0] += 1
+        totals[1] += r.get("balance") or 0.0
+
+    widths = {"A": 36, "B": 20, "C": 32, "D": 30, "E": 30, "F": 15, "G": 16, "H": 16, "I": 16, "J": 14, "K": 12, "L": 16}
+    for col, width in widths.items():
+        ws.column_dimensions[col].width = width
+
+    ws.freeze_panes = "B2"
+    ws.auto_filter.ref = ws.dimensions
+
+    # ---- Totales por antigüedad ----
+    ws_aging = wb.create_sheet(title="By Aging")
+    _append_header(ws_aging, ["Aging", "Receivables", "Balance"])
+    for label, (count, balance) in aging_totals.items():
+        _append_styled_row(ws_aging, [label, count, balance], money_columns=(2,))
+    ws_aging.column_dimensions["A"].width = 16
+    ws_aging.column_dimensions["B"].width = 14
+    ws_aging.column_dimensions["C"].width = 18
+
+    wb.save(filename)
+    print(f"✅ Excel de receivables generado: {filename}")
+    print(f"   Total de filas: {len(receivables):,}")
+
+
+def export_scenarios_to_excel(comparison, by_agent, filename):
+    """
+    Exporta la comparación de escenarios what-if: totales por escenario
+    (con diferencia vs baseline) y comisión por agente en cada escenario.
+    """
+    print(f"🔹 Exportando escenarios a Excel en '{filename}' ...")
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Scenarios"
+
+    ws.column_dimensions["A"].width = 40
+    for col in "BCDEFGHI":
+        ws.column_dimensions[col].width = 20
+    ws.freeze_panes = "B2"
+
+    headers = [
+        "Scenario",
+        "Endorsements",
+        "Agency Commission",
+        "Agent Commission",
+        "Total Commission",
+        "Agency Δ vs Baseline",
+        "Agent Δ vs Baseline",
+        "Total Δ vs Baseline",
+    ]
+    _append_header(ws, headers)
+    keys = ["scenario", "endorsements", "agency_commission", "agent_commission", "total_commission",
+            "agency_delta", "agent_delta", "total_delta"]
+    for row in comparison:
+        _append_styled_row(ws, [row[k] for k in keys], money_columns=(2, 3, 4, 5, 6, 7))
+
+    # ---- Comisión por agente en cada escenario ----
+    ws_agents = wb.create_sheet(title="By Agent")
+    scenario_names = [row["scenario"] for row in comparison]
+    ws_agents.column_dimensions["A"].width = 36
+    for idx in range(len(scenario_names)):
+        ws_agents.column_dimensions[get_column_letter(idx + 2)].width = 22
+    ws_agents.freeze_panes = "B2"
+
+    _append_header(ws_agents, ["Agent"] + scenario_names)
+    money_columns = tuple(range(1, len(scenario_names) + 1))
+    for row in by_agent:
+        _append_styled_row(ws_agents, [row["agent"]] + [row[name] for name in scenario_names], money_columns=money_columns)
+
+    wb.save(filename)
+    print(f"✅ Excel de escenarios generado: {filename}")
+
+
 # -----------------------
 # Helpers
 # -----------------------
 
+def _append_header(ws, headers):
+    """Agrega la fila de headers con estilo (funciona también en modo write_only)."""
+    alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    _append_styled_row(ws, headers, font=HEADER_FONT, fill=HEADER_FILL, alignment=alignment)
+    ws.row_dimensions[1].height = 35
+
+
+def _append_styled_row(ws, values, money_columns=(), font=NORMAL_FONT, fill=None, alignment=None):
+    """
+    Agrega una fila con font, bordes y formato de dinero en `money_columns`
+    (índices base 0). Usa celdas sueltas, así sirve en modo normal y write_only.
+    """
+    cells = []
+    for idx, value in enumerate(values):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = font
+        cell.border = THIN_BORDER
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        if idx in money_columns:
+            cell.number_format = MONEY_FORMAT
+        cells.append(cell)
+    ws.append(cells)
+
+
+SUMMARY_HEADERS = [
+    ("group", None),
+    ("endorsements", None),
+    ("premium", "Premium"),
+    ("agency_commission", "Agency Commission"),
+    ("agent_commission", "Agent Commission"),
+    ("total_commission", "Total Commission"),
+]
+
+
+def _write_summary_sheet(wb, name, summary_rows, grand_total=None):
+    """
+    Escribe una hoja de totales agrupados (ya calculados) con fila de total.
+
+    La fila TOTAL usa `grand_total` (calculado por endorsement) si se pasa:
+    sumar los grupos contaría 2 veces el premium y la agency commission de un
+    endorsement con varios agentes en la hoja By Agent.
+    """
+    ws = wb.create_sheet(title=f"By {name}"[:31])
+
+    ws.column_dimensions["A"].width = 36
+    for col in "BCDEF":
+        ws.column_dimensions[col].width = 18
+    ws.freeze_panes = "B2"
+
+    headers = [name, "Endorsements", "Premium", "Agency Commission", "Agent Commission", "Total Commission"]
+    _append_header(ws, headers)
+
+    money_columns = [i for i, (_, money) in enumerate(SUMMARY_HEADERS) if money]
+
+    for totals in summary_rows:
+        _append_styled_row(ws, [totals[key] for key, _ in SUMMARY_HEADERS], money_columns=money_columns)
+
+    if grand_total is None:
+        grand_total = {key: sum(totals[key] for totals in summary_rows) for key, _ in SUMMARY_HEADERS[1:]}
+
+    _append_styled_row(
+        ws,
+        ["TOTAL"] + [grand_total[key] for key, _ in SUMMARY_HEADERS[1:]],
+        money_columns=money_columns,
+        font=HEADER_FONT,
+        fill=HEADER_FILL,
+    )
+
+
 def _format_date(value):
-    """Formatea fechas ISO a formato MM/DD/YYYY."""
+    """Formatea fechas (date o ISO) a formato MM/DD/YYYY."""
     if not value:
         return None
-    try:
-        # Si viene como "2025-12-13T00:00:00" o "2025-12-13"
-        date_str = value.split("T")[0]
-        # Separar año-mes-día
-        parts = date_str.split("-")
-        if len(parts) == 3:
-            year, month, day = parts
-            return f"{month}/{day}/{year}"
-        return value
-    except:
-        return value
-
-
-def safe_money(value):
-    """Convierte valores a float de forma segura."""
-    try:
-        if value is None:
-            return 0.0
-        return float(value)
-    except:
-        return 0.0
\ No newline at end of file
+    if isinstance(value, date):
+        return value.strftime("%m/%d/%Y")
+    # Si viene como "2025-12-13T00:00:00" o "2025-12-13"
+    date_str = str(value).split("T")[0]
+    # Separar año-mes-día
+    parts = date_str.split("-")
+    if len(parts) == 3:
+        year, month, day = parts
+        return f"{month}/{day}/{year}"
+    return value
+
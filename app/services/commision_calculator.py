@@ -2,8 +2,14 @@
 Calculador de comisiones para endorsements.
 Las comisiones en NowCerts se almacenan como PORCENTAJES, no montos absolutos.
 Este módulo calcula los montos reales aplicando los porcentajes al endorsement amount.
+
+Trabaja sobre registros ya ingeridos por app.services.validators
+(porcentajes y montos como float, tipo de pago como PaymentType).
 """
 
+from app.services.validators import PaymentType
+
+
 def calculate_agency_commission(agency_commissions_list, endorsement_amount):
     """
     Calcula el monto total de comisión de agencia.
@@ -12,8 +18,9 @@ def calculate_agency_commission(agency_commissions_list, endorsement_amount):
     Calculamos: endorsement_amount * (commissionValue / 100)
     
     Args:
-        agency_commissions_list: Lista de diccionarios con comisiones de agencia
-        endorsement_amount: Monto del endorsement al que aplicar el porcentaje
+        agency_commissions_list: Lista de comisiones de agencia ya ingeridas
+            (ver app.services.validators: 'commissionValue' es float o None)
+        endorsement_amount: Monto del endorsement (float o None)
         
     Returns:
         float: Total de comisión de agencia en dólares
@@ -23,28 +30,47 @@ def calculate_agency_commission(agency_commissions_list, endorsement_amount):
     if not agency_commissions_list or not endorsement_amount:
         return total
     
-    try:
-        amount = float(endorsement_amount)
-    except (ValueError, TypeError):
-        return total
-    
     for comm in agency_commissions_list:
-        commission_percent = comm.get("commissionValue")
+        percent = comm.get("commissionValue")
         
         # Saltar si no hay valor o es None
-        if commission_percent is None:
-            continue
-            
-        try:
-            percent = float(commission_percent)
-            commission_amount = amount * (percent / 100.0)
-            total += commission_amount
-        except (ValueError, TypeError):
+        if percent is None:
             continue
+        
+        total += endorsement_amount * (percent / 100.0)
     
     return total
 
 
+def calculate_single_agent_commission(agent_comm, endorsement_amount, agency_commission_amount):
+    """
+    Calcula la comisión de UNA fila de comisión de agente.
+    
+    Args:
+        agent_comm: Comisión de agente ya ingerida ('commissionValue' float,
+            'paymentType' PaymentType)
+        endorsement_amount: Monto del endorsement (float o None)
+        agency_commission_amount: Comisión de agencia ya calculada (float o None)
+        
+    Returns:
+        float: Comisión del agente en dólares
+    """
+    percent = agent_comm.get("commissionValue")
+    
+    if percent is None:
+        return 0.0
+    
+    # Determinar la base sobre la cual calcular
+    if agent_comm.get("paymentType") is PaymentType.FROM_AGENCY_COMMISSION:
+        # Se calcula sobre la comisión de agencia
+        calculation_base = agency_commission_amount or 0.0
+    else:
+        # "From Base Premium" o cualquier otro: se calcula sobre el monto del endorsement
+        calculation_base = endorsement_amount or 0.0
+    
+    return calculation_base * (percent / 100.0)
+
+
 def calculate_agent_commission(agent_commissions_list, endorsement_amount, agency_commission_amount=None):
     """
     Calcula el monto total de comisión de agentes.
@@ -54,7 +80,7 @@ def calculate_agent_commission(agent_commissions_list, endorsement_amount, agenc
     2. "From Agency Commission": Se calcula sobre la comisión de agencia
     
     Args:
-        agent_commissions_list: Lista de diccionarios con comisiones de agentes
+        agent_commissions_list: Lista de comisiones de agentes ya ingeridas
         endorsement_amount: Monto del endorsement
         agency_commission_amount: Monto de comisión de agencia (para cálculo "From Agency Commission")
         
@@ -66,40 +92,8 @@ def calculate_agent_commission(agent_commissions_list, endorsement_amount, agenc
     if not agent_commissions_list:
         return total
     
-    try:
-        base_amount = float(endorsement_amount) if endorsement_amount else 0
-    except (ValueError, TypeError):
-        base_amount = 0
-        
-    try:
-        agency_amount = float(agency_commission_amount) if agency_commission_amount else 0
-    except (ValueError, TypeError):
-        agency_amount = 0
-    
     for comm in agent_commissions_list:
-        commission_percent = comm.get("commissionValue")
-        payment_type = comm.get("policyCommissionAgentPaymentTypeText", "")
-        
-        # Saltar si no hay valor o es None
-        if commission_percent is None:
-            continue
-            
-        try:
-            percent = float(commission_percent)
-            
-            # Determinar la base sobre la cual calcular
-            if "From Agency Commission" in payment_type:
-                # Se calcula sobre la comisión de agencia
-                calculation_base = agency_amount
-            else:
-                # "From Base Premium" o cualquier otro: se calcula sobre el monto del endorsement
-                calculation_base = base_amount
-            
-            commission_amount = calculation_base * (percent / 100.0)
-            total += commission_amount
-            
-        except (ValueError, TypeError):
-            continue
+        total += calculate_single_agent_commission(comm, endorsement_amount, agency_commission_amount)
     
     return total
 
@@ -125,4 +119,50 @@ def calculate_commissions(agency_list, agent_list, endorsement_amount):
     # Luego calcular comisión de agentes (puede depender de agency_total)
     agent_total = calculate_agent_commission(agent_list, endorsement_amount, agency_total)
     
-    return agency_total, agent_total
\ No newline at end of file
+    return agency_total, agent_total
+
+
+def safe_money(value):
+    """Convierte valores a float de forma segura (los montos ingeridos ya son float)."""
+    if value is None:
+        return 0.0
+    if type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_cancel_endorsement(endorsement_type):
+    """Indica si el tipo de endorsement corresponde a una cancelación."""
+    return "cancel" in (endorsement_type or "").lower()
+
+
+def apply_cancel_sign(endorsement_type, endorsement_amount, agency_commission, agent_commission):
+    """
+    Aplica el signo negativo de las cancelaciones a los montos de una fila.
+    
+    En los endorsements de tipo "Cancel" el monto y ambas comisiones se
+    reportan en negativo (si vienen positivos desde la API).
+    
+    Args:
+        endorsement_type: Texto del tipo de endorsement
+        endorsement_amount: Monto del endorsement (float)
+        agency_commission: Comisión de agencia (float)
+        agent_commission: Comisión de agente (float)
+        
+    Returns:
+        tuple: (endorsement_amount, agency_commission, agent_commission)
+    """
+    if not is_cancel_endorsement(endorsement_type):
+        return endorsement_amount, agency_commission, agent_commission
+    
+    if endorsement_amount > 0:
+        endorsement_amount = -endorsement_amount
+    if agency_commission > 0:
+        agency_commission = -agency_commission
+    if agent_commission > 0:
+        agent_commission = -agent_commission
+    
+    return endorsement_amount, agency_commission, agent_commission
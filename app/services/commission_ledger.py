@@ -0,0 +1,331 @@
+"""
+Ledger persistente de comisiones (SQLite local).
+
+Guarda, por endorsement, las filas ya calculadas del reporte (1 por agente,
+con los montos de app.services.commision_calculator y el signo de las
+cancelaciones aplicado) y, aparte, los totales acumulados por Agent, MGA,
+mes y tipo de endorsement, mes a mes.
+
+En cada sync solo se recalculan los endorsements cuyos datos cambiaron
+(endorsement, comisiones de agencia / agentes o datos de la póliza, según
+una huella de cada uno): a los totales se les resta lo que aportaba la
+versión anterior y se les suma lo de la nueva. Así "cuánto lleva el agente X
+en el mes" o los totales de un período son consultas al ledger, sin volver
+a descargar ni recalcular el reporte:
+
+    ledger = CommissionLedger("data_raw/commission_ledger.sqlite")
+    ledger.balance("Juan Pérez", month="2026-01")
+    ledger.summaries("2026-01", "2026-03")
+
+Los totales siguen el mismo criterio que build_commission_summaries: el
+premium y la agency commission cuentan 1 vez por endorsement en cada grupo,
+la agent commission se suma siempre.
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime
+
+from app.services.commision_calculator import apply_cancel_sign, safe_money
+from app.services.endorsement_report_service import build_endorsement_rows
+from app.services.summary_report_service import SUMMARY_DIMENSIONS
+
+
+LEDGER_FILE = "commission_ledger.sqlite"
+
+# Resultado de un sync: endorsements revisados, recalculados y quitados
+LedgerSync = namedtuple("LedgerSync", ["checked", "recomputed", "removed"])
+
+# Fila guardada: claves de cada dimensión de SUMMARY_DIMENSIONS + montos con signo
+_Entry = namedtuple(
+    "_Entry",
+    ["agent", "mga", "month", "endorsement_type", "premium", "agency_commission", "agent_commission"],
+)
+
+# Dimensión de SUMMARY_DIMENSIONS -> campo de _Entry con su clave
+_DIMENSION_FIELDS = {
+    "Agent": "agent",
+    "MGA": "mga",
+    "Month": "month",
+    "Endorsement Type": "endorsement_type",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS endorsements (
+    endorsement_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    report_date TEXT
+);
+CREATE INDEX IF NOT EXISTS endorsements_date ON endorsements (report_date);
+
+CREATE TABLE IF NOT EXISTS entries (
+    endorsement_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    mga TEXT NOT NULL,
+    month TEXT NOT NULL,
+    endorsement_type TEXT NOT NULL,
+    premium REAL NOT NULL,
+    agency_commission REAL NOT NULL,
+    agent_commission REAL NOT NULL,
+    PRIMARY KEY (endorsement_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS totals (
+    dimension TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    month TEXT NOT NULL,
+    endorsements INTEGER NOT NULL,
+    premium REAL NOT NULL,
+    agency_commission REAL NOT NULL,
+    agent_commission REAL NOT NULL,
+    PRIMARY KEY (dimension, group_key, month)
+);
+"""
+
+
+def ledger_path(snapshot_dir):
+    """Ruta del ledger dentro del directorio de snapshots."""
+    return os.path.join(snapshot_dir, LEDGER_FILE)
+
+
+class CommissionLedger:
+    """
+    Ledger de comisiones en un archivo SQLite.
+
+    Args:
+        path: Archivo .sqlite (se crea si no existe)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def sync(self, dataset, policies_map, date_from="2025-12-01", date_to=None, remove_missing=True):
+        """
+        Actualiza el ledger con los endorsements de [date_from, date_to]:
+        recalcula solo los que cambiaron y quita los que ya no están en esa
+        ventana. Lo anterior a date_from queda como estaba.
+
+        Args:
+            dataset: EndorsementDataset (ver app.services.endorsement_dataset)
+            policies_map: Mapa de pólizas (ver build_policies_map)
+            date_from: Fecha inicial "YYYY-MM-DD"
+            date_to: Fecha final inclusive "YYYY-MM-DD" (default: sin límite)
+            remove_missing: Quitar los endorsements que no están en `dataset`.
+                False si la descarga de endorsements quedó incompleta (hora
+                límite, max_pages): que falten no quiere decir que se borraron
+
+        Returns:
+            LedgerSync
+        """
+        endorsements = dataset.endorsements_between(date_from, date_to)
+
+        with self._connect() as conn:
+            query = "SELECT endorsement_id, fingerprint FROM endorsements WHERE (report_date >= ?"
+            args = [_iso(date_from)]
+            if date_to:
+                query += " AND report_date <= ?"
+                args.append(_iso(date_to))
+            # Los endorsements sin fecha entran en todas las ventanas (ver endorsements_between)
+            query += ") OR report_date IS NULL"
+            stored = dict(conn.execute(query, args))
+
+            deltas = {}
+            current = set()
+            recomputed = 0
+            for e in endorsements:
+                endorsement_id = str(e.get("databaseId"))
+                current.add(endorsement_id)
+
+                policy_data = policies_map.get(e.get("policyId"), {})
+                fingerprint = _fingerprint(e, policy_data, dataset)
+                if stored.get(endorsement_id) == fingerprint:
+                    continue
+
+                recomputed += 1
+                entries = [_entry(row) for row in build_endorsement_rows(e, policies_map, dataset)]
+                _add_contributions(deltas, self._remove(conn, endorsement_id), sign=-1)
+                _add_contributions(deltas, entries, sign=1)
+
+                conn.execute(
+                    "INSERT INTO endorsements (endorsement_id, fingerprint, report_date) VALUES (?, ?, ?)",
+                    (endorsement_id, fingerprint, _iso(e.get("date") or e.get("createDate"))),
+                )
+                conn.executemany(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(endorsement_id, seq, *entry) for seq, entry in enumerate(entries)],
+                )
+
+            gone = []
+            if remove_missing:
+                gone = [endorsement_id for endorsement_id in stored if endorsement_id not in current]
+            for endorsement_id in gone:
+                _add_contributions(deltas, self._remove(conn, endorsement_id), sign=-1)
+
+            _apply_deltas(conn, deltas)
+
+        result = LedgerSync(len(endorsements), recomputed, len(gone))
+        print(
+            f"📒 Ledger de comisiones: {result.checked:,} endorsements revisados, "
+            f"{result.recomputed:,} recalculados, {result.removed:,} quitados"
+        )
+        if not remove_missing:
+            print("⚠️ Ledger: descarga de endorsements incompleta, no se quitó ningún endorsement")
+        return result
+
+    def balance(self, agent, month=None, month_from=None, month_to=None):
+        """
+        Totales de un agente: de un mes ("YYYY-MM"), de un rango de meses o
+        de todo lo que hay en el ledger.
+
+        Returns:
+            dict: {endorsements, premium, agency_commission, agent_commission,
+                   total_commission}
+        """
+        if month:
+            month_from = month_to = month
+        rows = self._totals("Agent", month_from, month_to, group_key=agent)
+        if rows:
+            return rows[0]
+        return _totals_dict(agent, 0, 0.0, 0.0, 0.0)
+
+    def summaries(self, month_from=None, month_to=None):
+        """
+        Totales agrupados de un rango de meses ("YYYY-MM", inclusive), con la
+        misma forma que build_commission_summaries.
+
+        Returns:
+            dict: {dimensión: [ {group, endorsements, premium, agency_commission,
+                   agent_commission, total_commission}, ... ]} ordenado por grupo
+        """
+        return {
+            name: self._totals(name, month_from, month_to)
+            for name in SUMMARY_DIMENSIONS
+        }
+
+    def _totals(self, dimension, month_from, month_to, group_key=None):
+        query = (
+            "SELECT group_key, SUM(endorsements), SUM(premium), SUM(agency_commission), "
+            "SUM(agent_commission) FROM totals WHERE dimension = ?"
+        )
+        args = [dimension]
+        if group_key is not None:
+            query += " AND group_key = ?"
+            args.append(group_key)
+        if month_from:
+            query += " AND month >= ?"
+            args.append(month_from)
+        if month_to:
+            query += " AND month <= ?"
+            args.append(month_to)
+        query += " GROUP BY group_key"
+
+        with self._connect() as conn:
+            rows = [_totals_dict(*row) for row in conn.execute(query, args)]
+        return sorted(rows, key=lambda t: str(t["group"]))
+
+    def _remove(self, conn, endorsement_id):
+        """Borra un endorsement del ledger y devuelve las filas que tenía."""
+        entries = [
+            _Entry(*row) for row in conn.execute(
+                "SELECT agent, mga, month, endorsement_type, premium, agency_commission, agent_commission "
+                "FROM entries WHERE endorsement_id = ? ORDER BY seq",
+                (endorsement_id,),
+            )
+        ]
+        conn.execute("DELETE FROM entries WHERE endorsement_id = ?", (endorsement_id,))
+        conn.execute("DELETE FROM endorsements WHERE endorsement_id = ?", (endorsement_id,))
+        return entries
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _entry(row):
+    """Fila del reporte -> _Entry (claves de cada dimensión + montos con signo)."""
+    amount, agency_comm, agent_comm = apply_cancel_sign(
+        row.get("endorsement_type"),
+        safe_money(row.get("endorsement_amount")),
+        safe_money(row.get("agency_commission")),
+        safe_money(row.get("agent_commission")),
+    )
+    keys = {field: str(SUMMARY_DIMENSIONS[name](row)) for name, field in _DIMENSION_FIELDS.items()}
+    return _Entry(premium=amount, agency_commission=agency_comm, agent_commission=agent_comm, **keys)
+
+
+def _add_contributions(deltas, entries, sign):
+    """
+    Suma (sign=1) o resta (sign=-1) a `deltas` lo que aportan a los totales
+    las filas de UN endorsement: {(dimensión, grupo, mes): [endorsements,
+    premium, agency_commission, agent_commission]}.
+    """
+    seen = set()
+    for entry in entries:
+        for name, field in _DIMENSION_FIELDS.items():
+            key = (name, getattr(entry, field), entry.month)
+            totals = deltas.setdefault(key, [0, 0.0, 0.0, 0.0])
+            totals[3] += sign * entry.agent_commission
+
+            # Premium y agency commission: 1 vez por endorsement en el grupo
+            if key not in seen:
+                seen.add(key)
+                totals[0] += sign
+                totals[1] += sign * entry.premium
+                totals[2] += sign * entry.agency_commission
+
+
+def _apply_deltas(conn, deltas):
+    conn.executemany(
+        "INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (dimension, group_key, month) DO UPDATE SET "
+        "endorsements = endorsements + excluded.endorsements, "
+        "premium = premium + excluded.premium, "
+        "agency_commission = agency_commission + excluded.agency_commission, "
+        "agent_commission = agent_commission + excluded.agent_commission",
+        [(*key, *totals) for key, totals in deltas.items() if any(totals)],
+    )
+    # Grupos que se quedaron sin endorsements
+    conn.execute("DELETE FROM totals WHERE endorsements <= 0")
+
+
+def _fingerprint(e, policy_data, dataset):
+    """Huella de todo lo que entra en las filas de un endorsement."""
+    endorsement_id = e.get("databaseId")
+    parts = (
+        [e.get(field) for field in ("policyId", "endorsementTypeText", "date", "createDate", "amount", "statusText")],
+        [policy_data.get(field) for field in (
+            "policy_number", "mga", "insured", "effective_date", "expiration_date", "agent_list",
+        )],
+        [a.get("commissionValue") for a in dataset.agency_commissions(endorsement_id)],
+        [
+            (a.get("agentName"), a.get("commissionValue"), a.get("paymentType"))
+            for a in dataset.agent_commissions(endorsement_id)
+        ],
+    )
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _totals_dict(group, endorsements, premium, agency_commission, agent_commission):
+    return {
+        "group": group,
+        "endorsements": endorsements,
+        "premium": premium,
+        "agency_commission": agency_commission,
+        "agent_commission": agent_commission,
+        "total_commission": agency_commission + agent_commission,
+    }
+
+
+def _iso(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)[:10] if value else None
@@ -0,0 +1,290 @@
+"""
+Motor de escenarios "what-if" de comisiones.
+
+Responde preguntas como "¿cuánto hubieran sido las comisiones con 15% de
+agencia?" o "¿y si Juan cobrara From Agency Commission?" sin editar datos
+ni volver a correr todo el pipeline.
+
+El dataset cargado se aplana UNA vez a arrays de numpy (1 posición por
+endorsement y 1 por comisión de agente). Cada escenario aplica sus reglas
+como máscaras sobre esos arrays y recalcula todas las comisiones en una
+sola pasada vectorizada, con la misma fórmula que commision_calculator.
+Los escenarios corren en paralelo en varios procesos.
+
+Un escenario es un dict:
+
+    {
+        "name": "Agencia 15% + Juan sobre agencia",
+        "agency_percent": 15.0,                      # % total de agencia (todas)
+        "agency_percent_by_mga": {"MGA X": 12.0},    # % total de agencia por MGA
+        "agent_percent": {"Juan Pérez": 25.0},       # % por agente ("*" = todos)
+        "payment_type": {"Juan Pérez": "From Agency Commission"},  # ("*" = todos)
+    }
+
+Todas las claves salvo "name" son opcionales. Los overrides de agencia
+solo aplican a endorsements que ya tienen comisión de agencia configurada.
+Cada "name" es una columna de la hoja por agente: tienen que ser únicos y
+distintos de "agent" y del baseline (ver load_scenarios).
+"""
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.services.commision_calculator import is_cancel_endorsement
+from app.services.validators import PaymentType, parse_payment_type
+
+
+BASELINE = {"name": "Baseline (actual)"}
+
+PAYMENT_TYPE_CODES = {
+    PaymentType.FROM_BASE_PREMIUM: 0,
+    PaymentType.FROM_AGENCY_COMMISSION: 1,
+}
+
+
+def flatten_dataset(dataset, policies_map, date_from=None, date_to=None):
+    """
+    Aplana los endorsements de la ventana y sus comisiones a arrays de numpy.
+
+    Args:
+        dataset: EndorsementDataset (ver app.services.endorsement_dataset)
+        policies_map: Mapa de pólizas (para el MGA de cada endorsement)
+        date_from / date_to: Ventana de fechas (igual que el reporte)
+
+    Returns:
+        dict de arrays (ver claves abajo), listo para evaluate_scenario
+    """
+    endorsements = dataset.endorsements_between(date_from, date_to)
+
+    amount = np.empty(len(endorsements))
+    agency_pct = np.zeros(len(endorsements))
+    has_agency = np.zeros(len(endorsements), dtype=bool)
+    is_cancel = np.zeros(len(endorsements), dtype=bool)
+    mga = []
+
+    agent_endorsement = []
+    agent_pct = []
+    agent_ptype = []
+    agent_name = []
+    agent_code = []
+    # Código entero por agente (los nombres vienen internados del directorio)
+    codes = {}
+
+    for i, e in enumerate(endorsements):
+        endorsement_id = e.get("databaseId")
+        amount[i] = e.get("amount") or 0.0
+        is_cancel[i] = is_cancel_endorsement(e.get("endorsementTypeText"))
+        mga.append(policies_map.get(e.get("policyId"), {}).get("mga") or "")
+
+        for a in dataset.agency_commissions(endorsement_id):
+            if a.get("commissionValue") is not None:
+                agency_pct[i] += a["commissionValue"]
+                has_agency[i] = True
+
+        for a in dataset.agent_commissions(endorsement_id):
+            if a.get("commissionValue") is None:
+                continue
+            agent_endorsement.append(i)
+            agent_pct.append(a["commissionValue"])
+            agent_ptype.append(PAYMENT_TYPE_CODES[a.get("paymentType") or PaymentType.FROM_BASE_PREMIUM])
+            name = (a.get("agentName") or "").strip()
+            agent_name.append(name)
+            agent_code.append(codes.setdefault(name, len(codes)))
+
+    return {
+        "amount": amount,
+        "agency_pct": agency_pct,
+        "has_agency": has_agency,
+        "is_cancel": is_cancel,
+        "mga": np.array(mga, dtype=object),
+        "agent_endorsement": np.array(agent_endorsement, dtype=np.int64),
+        "agent_pct": np.array(agent_pct, dtype=float),
+        "agent_ptype": np.array(agent_ptype, dtype=np.int8),
+        "agent_name": np.array(agent_name, dtype=object),
+        "agent_code": np.array(agent_code, dtype=np.int64),
+        "agent_labels": list(codes),
+    }
+
+
+def evaluate_scenario(arrays, scenario):
+    """
+    Recalcula todas las comisiones de un escenario en una pasada vectorizada.
+
+    Returns:
+        dict: {name, endorsements, agency_commission, agent_commission,
+               total_commission, by_agent: {agente: comisión}}
+    """
+    amount = arrays["amount"]
+    agent_endorsement = arrays["agent_endorsement"]
+    agent_name = arrays["agent_name"]
+
+    # ---- % de agencia ----
+    agency_pct = arrays["agency_pct"].copy()
+    if scenario.get("agency_percent") is not None:
+        agency_pct[arrays["has_agency"]] = scenario["agency_percent"]
+    for mga, percent in (scenario.get("agency_percent_by_mga") or {}).items():
+        agency_pct[arrays["has_agency"] & (arrays["mga"] == mga)] = percent
+
+    agency = amount * (agency_pct / 100.0)
+
+    # ---- % y tipo de pago de agentes ----
+    agent_pct = _override_by_agent(arrays["agent_pct"], agent_name, scenario.get("agent_percent"))
+    agent_ptype = _override_by_agent(
+        arrays["agent_ptype"],
+        agent_name,
+        {
+            agent: PAYMENT_TYPE_CODES[parse_payment_type(text)]
+            for agent, text in (scenario.get("payment_type") or {}).items()
+        },
+    )
+
+    base = np.where(agent_ptype == 1, agency[agent_endorsement], amount[agent_endorsement])
+    agent = base * (agent_pct / 100.0)
+
+    # ---- Cancelaciones en negativo (mismo criterio que el Excel) ----
+    agency = np.where(arrays["is_cancel"] & (agency > 0), -agency, agency)
+    agent_cancel = arrays["is_cancel"][agent_endorsement]
+    agent = np.where(agent_cancel & (agent > 0), -agent, agent)
+    # El reporte no genera filas para comisiones sin agente: no cuentan en ningún total
+    agent = np.where(agent_name != "", agent, 0.0)
+
+    # ---- Totales ----
+    labels = arrays["agent_labels"]
+    totals = np.bincount(arrays["agent_code"], weights=agent, minlength=len(labels))
+    by_agent = {name: total for name, total in zip(labels, totals.tolist()) if name != ""}
+
+    agency_total = float(agency.sum())
+    agent_total = float(agent.sum())
+
+    return {
+        "name": scenario.get("name", "(sin nombre)"),
+        "endorsements": int(len(amount)),
+        "agency_commission": agency_total,
+        "agent_commission": agent_total,
+        "total_commission": agency_total + agent_total,
+        "by_agent": by_agent,
+    }
+
+
+def load_scenarios(path):
+    """
+    Carga los escenarios desde un JSON (lista de escenarios) y valida sus
+    nombres.
+
+    Returns:
+        list[dict]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        scenarios = json.load(f)
+    validate_scenarios(scenarios)
+    return scenarios
+
+
+def validate_scenarios(scenarios):
+    """
+    Verifica que cada escenario tenga un "name" único y que no choque con la
+    columna "agent" ni con el baseline (los nombres son columnas de by_agent).
+
+    Raises:
+        ValueError: Si algún nombre falta, se repite o está reservado
+    """
+    reserved = {"agent", BASELINE["name"]}
+    seen = set()
+    for i, scenario in enumerate(scenarios, start=1):
+        name = scenario.get("name")
+        if not name:
+            raise ValueError(f"❌ El escenario #{i} no tiene nombre (name)")
+        if name in reserved:
+            raise ValueError(f"❌ El nombre de escenario '{name}' está reservado")
+        if name in seen:
+            raise ValueError(f"❌ Hay dos escenarios con el nombre '{name}'")
+        seen.add(name)
+
+
+def run_scenarios(dataset, policies_map, scenarios, date_from=None, date_to=None, max_workers=None):
+    """
+    Evalúa el baseline y cada escenario (en paralelo, 1 proceso por core).
+
+    Returns:
+        tuple: (comparison, by_agent)
+            comparison: 1 fila por escenario con totales y diferencia vs baseline
+            by_agent: 1 fila por agente con la comisión en cada escenario
+    """
+    arrays = flatten_dataset(dataset, policies_map, date_from, date_to)
+    all_scenarios = [BASELINE] + list(scenarios)
+
+    print(
+        f"🧮 Evaluando {len(all_scenarios)} escenarios sobre {len(arrays['amount']):,} endorsements "
+        f"y {len(arrays['agent_pct']):,} comisiones de agentes..."
+    )
+
+    workers = min(max_workers or os.cpu_count() or 1, len(all_scenarios))
+    if workers > 1:
+        # spawn: run_scenarios corre en un thread del pipeline y hacer fork de
+        # un proceso con threads (y sus locks tomados) puede colgar al hijo
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(arrays,),
+        ) as executor:
+            results = list(executor.map(_evaluate_in_worker, all_scenarios))
+    else:
+        results = [evaluate_scenario(arrays, s) for s in all_scenarios]
+
+    baseline = results[0]
+    comparison = []
+    for r in results:
+        comparison.append({
+            "scenario": r["name"],
+            "endorsements": r["endorsements"],
+            "agency_commission": r["agency_commission"],
+            "agent_commission": r["agent_commission"],
+            "total_commission": r["total_commission"],
+            "agency_delta": r["agency_commission"] - baseline["agency_commission"],
+            "agent_delta": r["agent_commission"] - baseline["agent_commission"],
+            "total_delta": r["total_commission"] - baseline["total_commission"],
+        })
+
+    agents = sorted(set().union(*(r["by_agent"] for r in results)))
+    by_agent = [
+        {"agent": agent, **{r["name"]: r["by_agent"].get(agent, 0.0) for r in results}}
+        for agent in agents
+    ]
+
+    print(f"✅ {len(results)} escenarios evaluados")
+    return comparison, by_agent
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _override_by_agent(values, agent_name, overrides):
+    """Aplica overrides por agente ("*" = todos) sobre una copia del array."""
+    values = values.copy()
+    if not overrides:
+        return values
+    if "*" in overrides:
+        values[:] = overrides["*"]
+    for agent, value in overrides.items():
+        if agent != "*":
+            values[agent_name == agent] = value
+    return values
+
+
+_WORKER_ARRAYS = None
+
+
+def _init_worker(arrays):
+    # Los arrays se envían 1 vez por proceso, no 1 vez por escenario
+    global _WORKER_ARRAYS
+    _WORKER_ARRAYS = arrays
+
+
+def _evaluate_in_worker(scenario):
+    return evaluate_scenario(_WORKER_ARRAYS, scenario)
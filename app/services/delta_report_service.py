@@ -0,0 +1,149 @@
+"""
+Reporte delta: filas nuevas, modificadas o desaparecidas desde la corrida anterior.
+
+En cada corrida se guarda una huella compacta (hash) de cada fila emitida,
+indexada por endorsement + comisión de agente (su databaseId; endorsement +
+agente en las filas sin comisión de agente). La corrida siguiente compara sus
+filas contra esas huellas en una sola pasada, sin volver a abrir el Excel
+anterior.
+"""
+
+import hashlib
+import json
+import os
+
+
+FINGERPRINTS_DIR = "data_raw"
+
+# Campos que definen si una fila "cambió"
+FINGERPRINT_FIELDS = (
+    "policy_number",
+    "mga",
+    "insured",
+    "endorsement_type",
+    "endorsement_effective",
+    "endorsement_amount",
+    "endorsement_status",
+    "agency_commission",
+    "agent_commission",
+)
+
+
+def fingerprints_path(date_from, base_dir=FINGERPRINTS_DIR):
+    """Ruta del archivo de huellas para un reporte (una por fecha de inicio)."""
+    return os.path.join(base_dir, f"report_fingerprints_{date_from.replace('-', '')}.json")
+
+
+def load_fingerprints(path):
+    """
+    Carga las huellas de la corrida anterior.
+
+    Returns:
+        dict: {row_key: [hash, agency_commission, agent_commission, policy_number,
+               endorsement_type, endorsement_effective, agent]} (vacío si no hay
+               corrida previa)
+    """
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ No se pudieron leer las huellas anteriores ({path}): {e}")
+        return {}
+
+
+def save_fingerprints(fingerprints, path):
+    """Guarda las huellas de la corrida actual (JSON compacto, sin indentar)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, separators=(",", ":"), ensure_ascii=False, default=str)
+    print(f"💾 Huellas de {len(fingerprints):,} filas guardadas en: {path}")
+
+
+def compute_report_delta(rows, previous):
+    """
+    Compara las filas actuales contra las huellas de la corrida anterior.
+
+    Args:
+        rows: Filas unificadas de la corrida actual
+        previous: Huellas de la corrida anterior (ver load_fingerprints)
+
+    Returns:
+        tuple: (delta_rows, current_fingerprints)
+            delta_rows: filas con status "new", "changed" o "removed"
+            current_fingerprints: huellas a guardar para la próxima corrida
+    """
+    pending = dict(previous)
+    current = {}
+    delta = []
+
+    for row in rows:
+        key = _row_key(row)
+        digest = _row_hash(row)
+
+        current[key] = [
+            digest,
+            row.get("agency_commission"),
+            row.get("agent_commission"),
+            row.get("policy_number"),
+            row.get("endorsement_type"),
+            row.get("endorsement_effective"),
+            row.get("agent"),
+        ]
+
+        old = pending.pop(key, None)
+        if old is None:
+            delta.append(_delta_row("new", row, None))
+        elif old[0] != digest:
+            delta.append(_delta_row("changed", row, old))
+
+    # Lo que queda en `pending` ya no aparece en el reporte
+    for key, old in pending.items():
+        removed = {
+            "endorsement_id": key.partition("|")[0],
+            "agent": old[6],
+            "policy_number": old[3],
+            "endorsement_type": old[4],
+            "endorsement_effective": old[5],
+        }
+        delta.append(_delta_row("removed", removed, old))
+
+    return delta, current
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _row_key(row):
+    """
+    Clave endorsement|id:<databaseId de la comisión de agente>; las filas sin
+    comisión de agente (agentes de la póliza) usan endorsement|agent:<agente>.
+    """
+    agent_commission_id = row.get("agent_commission_id")
+    if agent_commission_id is None:
+        return f"{row.get('endorsement_id')}|agent:{row.get('agent') or ''}"
+    return f"{row.get('endorsement_id')}|id:{agent_commission_id}"
+
+
+def _row_hash(row):
+    """Hash corto (64 bits) de los campos relevantes de una fila."""
+    payload = json.dumps([row.get(field) for field in FINGERPRINT_FIELDS], default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _delta_row(status, row, old):
+    return {
+        "status": status,
+        "endorsement_id": row.get("endorsement_id"),
+        "agent": row.get("agent"),
+        "policy_number": row.get("policy_number"),
+        "endorsement_type": row.get("endorsement_type"),
+        "endorsement_effective": row.get("endorsement_effective"),
+        "agency_commission": row.get("agency_commission") if status != "removed" else None,
+        "agent_commission": row.get("agent_commission") if status != "removed" else None,
+        "previous_agency_commission": old[1] if old else None,
+        "previous_agent_commission": old[2] if old else None,
+    }
@@ -0,0 +1,150 @@
+"""
+Dataset en memoria de endorsements y comisiones con índices secundarios.
+
+Los índices se construyen una sola vez por carga:
+- endorsements por fecha (ordenado, búsqueda por rango con bisect); los que
+  no tienen fecha utilizable entran en todas las ventanas (ver undated)
+- endorsements por databaseId, policyId y endorsementTypeText (hash)
+- comisiones de agencia / agentes por endorsementDatabaseId (hash)
+- comisiones de agentes por agente (hash)
+
+Con eso, consultar muchas ventanas de fechas o muchos agentes sobre el
+mismo dataset cuesta O(log n + k) / O(1) por consulta, en vez de recorrer
+todas las listas cada vez.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+
+class EndorsementDataset:
+    """
+    Endorsements + comisiones ya ingeridos (ver app.services.validators),
+    indexados para consultas por rango de fechas y por clave.
+
+    Args:
+        endorsements: Endorsements ingeridos
+        agency_comms: Comisiones de agencia ingeridas
+        agent_comms: Comisiones de agentes ingeridas
+    """
+
+    def __init__(self, endorsements, agency_comms, agent_comms):
+        self.endorsements = endorsements
+
+        # ---- Índices de endorsements ----
+        self._by_id = {}
+        self._by_policy = {}
+        self._by_type = {}
+        dated = []
+        undated = []
+
+        for idx, e in enumerate(endorsements):
+            self._by_id[e.get("databaseId")] = e
+            self._by_policy.setdefault(e.get("policyId"), []).append(e)
+            self._by_type.setdefault(e.get("endorsementTypeText"), []).append(e)
+
+            report_date = e.get("date") or e.get("createDate")
+            if report_date is not None:
+                dated.append((report_date, idx))
+            else:
+                undated.append(idx)
+
+        # Índice por fecha: fechas ordenadas + posición original en `endorsements`
+        dated.sort()
+        self._dates = [d for d, _ in dated]
+        self._date_positions = [idx for _, idx in dated]
+        # Sin date ni createDate válidos (quedan en el reporte de anomalías):
+        # no se sabe en qué ventana caen, así que no se descartan
+        self._undated_positions = undated
+
+        # ---- Índices de comisiones ----
+        self._agency_by_endorsement = _group_by(agency_comms, "endorsementDatabaseId")
+        self._agents_by_endorsement = _group_by(agent_comms, "endorsementDatabaseId")
+        self._agent_comms_by_agent = {}
+        for a in agent_comms:
+            name = (a.get("agentName") or "").strip()
+            if name:
+                self._agent_comms_by_agent.setdefault(name, []).append(a)
+
+        print(
+            f"🗂️ Dataset indexado: {len(endorsements):,} endorsements, "
+            f"{len(agency_comms):,} agency / {len(agent_comms):,} agent commissions"
+        )
+        if undated:
+            print(f"⚠️ {len(undated):,} endorsements sin fecha: se incluyen en todas las ventanas del reporte")
+
+    def __len__(self):
+        return len(self.endorsements)
+
+    # -----------------------
+    # Endorsements
+    # -----------------------
+
+    def endorsements_between(self, date_from=None, date_to=None):
+        """
+        Endorsements con fecha (date o createDate) en [date_from, date_to],
+        más los que no tienen fecha (ver undated).
+
+        Acepta date, datetime o "YYYY-MM-DD"; None = sin límite. Los resultados
+        vuelven en el orden original de la descarga (igual que un filtro lineal).
+        """
+        lo = bisect_left(self._dates, _as_date(date_from)) if date_from else 0
+        hi = bisect_right(self._dates, _as_date(date_to)) if date_to else len(self._dates)
+
+        positions = sorted(self._date_positions[lo:hi] + self._undated_positions)
+        return [self.endorsements[i] for i in positions]
+
+    def undated(self):
+        """Endorsements sin date ni createDate utilizables (fecha vacía o inválida)."""
+        return [self.endorsements[i] for i in self._undated_positions]
+
+    def endorsement(self, endorsement_id):
+        return self._by_id.get(endorsement_id)
+
+    def endorsements_for_policy(self, policy_id):
+        return self._by_policy.get(policy_id, [])
+
+    def endorsements_of_type(self, endorsement_type):
+        return self._by_type.get(endorsement_type, [])
+
+    def endorsement_types(self):
+        return list(self._by_type)
+
+    # -----------------------
+    # Comisiones
+    # -----------------------
+
+    def agency_commissions(self, endorsement_id):
+        return self._agency_by_endorsement.get(endorsement_id, [])
+
+    def agent_commissions(self, endorsement_id):
+        return self._agents_by_endorsement.get(endorsement_id, [])
+
+    def agent_commissions_for_agent(self, agent_name):
+        return self._agent_comms_by_agent.get(agent_name, [])
+
+    def agents(self):
+        return list(self._agent_comms_by_agent)
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _group_by(records, field):
+    """Agrupa registros por un campo (ignora los que no lo tienen)."""
+    groups = {}
+    for r in records:
+        key = r.get(field)
+        if not key:
+            continue
+        groups.setdefault(key, []).append(r)
+    return groups
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
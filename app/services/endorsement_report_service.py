@@ -1,102 +1,111 @@
-from app.api.policies import get_policies_map
-from app.services.commision_calculator import calculate_commissions
-from datetime import datetime
-
-
-def generate_unified_endorsements(client, date_from="2025-12-01"):
+from app.services.commision_calculator import (
+    calculate_agency_commission,
+    calculate_single_agent_commission,
+)
+from app.services.endorsement_dataset import EndorsementDataset
+from app.services.external_sort import ExternalSorter
+from datetime import date
+
+
+def build_unified_endorsements(
+    policies_map,
+    endorsements,
+    agency_comms,
+    agent_comms,
+    date_from="2025-12-01",
+    memory_limit_mb=None,
+):
     """
-    Genera lista de endorsements con detalle por agente.
+    Construye las filas del reporte (1 por agente) a partir de datos ya
+    descargados e ingeridos (ver app.services.validators).
+    
+    La descarga, la ingesta y el recorte de las comisiones a la ventana de
+    fechas los hace el orquestador (ver app.services.report_orchestrator).
     
     Args:
-        client: Cliente de NowCerts API
-        date_from: Fecha inicial en formato "YYYY-MM-DD" (default: 2025-12-01)
+        policies_map: Mapa de pólizas (ver build_policies_map)
+        endorsements: Endorsements ingeridos
+        agency_comms: Comisiones de agencia ingeridas (ya recortadas a la ventana)
+        agent_comms: Comisiones de agentes ingeridas (ya recortadas a la ventana)
+        date_from: Fecha inicial en formato "YYYY-MM-DD"
+        memory_limit_mb: Si se indica, modo de memoria acotada: las filas se
+            ordenan con un ExternalSorter que vuelca runs a disco al superar
+            ese tope, y se devuelven en streaming (ver app.services.external_sort)
     
     Returns:
         Lista de endorsements con 1 fila por agente, filtrados por fecha
+        (en modo memoria acotada, un ExternalSorter iterable con len())
     """
-    print("🔹 Generando reporte con detalle por agente...")
-    print(f"📅 Filtro de fecha: desde {date_from} hasta hoy")
+    # 3-4. Indexar endorsements (por fecha) y comisiones (por endorsementDatabaseId)
+    dataset = EndorsementDataset(endorsements, agency_comms, agent_comms)
 
-    # 1. Descargar datos base
-    policies_map = get_policies_map(client)
-
-    endorsements = client.get_all_paginated(
-        endpoint="/PolicyEndorsementDetailList",
-        orderby="changeDate desc"
+    return build_unified_endorsements_from_dataset(
+        dataset, policies_map, date_from=date_from, memory_limit_mb=memory_limit_mb
     )
 
-    agency_comms = client.get_all_paginated(
-        endpoint="/PolicyEndorsementAgencyCommissionDetailList",
-        orderby="changeDate desc"
-    )
 
-    agent_comms = client.get_all_paginated(
-        endpoint="/PolicyEndorsementAgentsCommissionDetailList",
-        orderby="changeDate desc"
-    )
-
-    print(f"📄 Endorsements descargados: {len(endorsements)}")
-    print(f"🏢 Agency Commissions: {len(agency_comms)}")
-    print(f"👤 Agent Commissions: {len(agent_comms)}")
-    
-    # Guardar datos en data_raw
-    import json
-    import os
-    
-    data_raw_dir = "data_raw"
-    os.makedirs(data_raw_dir, exist_ok=True)
-    
-    # Guardar Agency Commissions
-    with open(os.path.join(data_raw_dir, "PolicyEndorsementAgencyCommissionDetailList.json"), "w") as f:
-        json.dump(agency_comms, f, indent=2)
-    print(f"💾 Agency Commissions guardadas en data_raw/")
+def build_unified_endorsements_from_dataset(
+    dataset,
+    policies_map,
+    date_from="2025-12-01",
+    date_to=None,
+    memory_limit_mb=None,
+):
+    """
+    Construye las filas del reporte a partir de un EndorsementDataset ya
+    indexado. Varias ventanas de fechas sobre el mismo dataset no vuelven
+    a recorrer ni a indexar las listas completas.
     
-    # Guardar Agent Commissions
-    with open(os.path.join(data_raw_dir, "PolicyEndorsementAgentsCommissionDetailList.json"), "w") as f:
-        json.dump(agent_comms, f, indent=2)
-    print(f"💾 Agent Commissions guardadas en data_raw/")
-
-    # 2. Filtrar endorsements por fecha
-    date_from_obj = datetime.strptime(date_from, "%Y-%m-%d")
-    endorsements_filtered = []
+    Args:
+        dataset: EndorsementDataset (ver app.services.endorsement_dataset)
+        policies_map: Mapa de pólizas (ver build_policies_map)
+        date_from: Fecha inicial en formato "YYYY-MM-DD"
+        date_to: Fecha final inclusive "YYYY-MM-DD" (default: sin límite)
+        memory_limit_mb: Ver build_unified_endorsements
     
-    for e in endorsements:
-        endorsement_date = e.get("date") or e.get("createDate")
-        if not endorsement_date:
-            continue
-        
-        try:
-            # Parse fecha (formato: "2025-12-01T00:00:00" o "2025-12-01")
-            date_str = endorsement_date.split("T")[0]
-            endorsement_date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            
-            # Filtrar desde date_from
-            if endorsement_date_obj >= date_from_obj:
-                endorsements_filtered.append(e)
-        except:
-            # Si no se puede parsear, incluir el endorsement
-            endorsements_filtered.append(e)
+    Returns:
+        Igual que build_unified_endorsements
+    """
+    # 3. Filtrar endorsements por fecha (búsqueda binaria sobre el índice;
+    #    las fechas inválidas quedan en None, figuran en el reporte de anomalías
+    #    y el endorsement se incluye igual, con "(Sin fecha)" en los resúmenes)
+    endorsements_filtered = dataset.endorsements_between(date_from, date_to)
     
     print(f"✅ Endorsements después de filtrar por fecha: {len(endorsements_filtered)}")
 
-    # 3. Indexar comisiones por endorsementDatabaseId
-    agency_by_endorsement = {}
-    for a in agency_comms:
-        eid = a.get("endorsementDatabaseId")
-        if not eid:
-            continue
-        agency_by_endorsement.setdefault(eid, []).append(a)
+    # 5. Generar filas
+    rows = _iter_report_rows(endorsements_filtered, policies_map, dataset)
 
-    agents_by_endorsement = {}
-    for a in agent_comms:
-        eid = a.get("endorsementDatabaseId")
-        if not eid:
-            continue
-        agents_by_endorsement.setdefault(eid, []).append(a)
+    # 6. Ordenar por fecha (más reciente primero)
+    if memory_limit_mb:
+        sorter = ExternalSorter(key=_row_date_key, reverse=True, max_memory_mb=memory_limit_mb)
+        sorter.extend(rows)
+        print(f"✅ Se generaron {len(sorter)} filas con comisiones.")
+        print(f"✅ Ordenadas por fecha en modo memoria acotada ({memory_limit_mb} MB, {sorter.spilled_runs} runs en disco)")
+        return sorter
+
+    unified_sorted = sorted(
+        rows,
+        key=_row_date_key,
+        reverse=True  # Más reciente primero
+    )
+    
+    print(f"✅ Se generaron {len(unified_sorted)} filas con comisiones.")
+    print(f"✅ Ordenadas por fecha (más reciente primero)")
+
+    return unified_sorted
 
-    # 4. Generar filas
-    unified = []
 
+def build_endorsement_rows(endorsement, policies_map, dataset):
+    """
+    Filas del reporte de UN endorsement (1 por agente; vacía si no tiene
+    comisiones). La usa el ledger para recalcular solo lo que cambió.
+    """
+    return list(_iter_report_rows([endorsement], policies_map, dataset))
+
+
+def _iter_report_rows(endorsements_filtered, policies_map, dataset):
+    """Genera (en streaming) las filas del reporte, 1 por agente de cada endorsement."""
     for e in endorsements_filtered:
         policy_id = e.get("policyId")
         endorsement_id = e.get("databaseId")
@@ -104,13 +113,12 @@ def generate_unified_endorsements(client, date_from="2025-12-01"):
         policy_data = policies_map.get(policy_id, {})
         
         # Obtener listas de comisiones
-        agency_comms_list = agency_by_endorsement.get(endorsement_id, [])
-        agent_comms_list = agents_by_endorsement.get(endorsement_id, [])
+        agency_comms_list = dataset.agency_commissions(endorsement_id)
+        agent_comms_list = dataset.agent_commissions(endorsement_id)
         
-        endorsement_amount = e.get("amount", 0)
+        endorsement_amount = e.get("amount") or 0.0
         
         # Calcular comisión de agencia
-        from app.services.commision_calculator import calculate_agency_commission
         agency_commission_total = calculate_agency_commission(agency_comms_list, endorsement_amount)
         
         # Solo procesar si hay comisiones de agencia O de agente
@@ -122,13 +130,8 @@ def generate_unified_endorsements(client, date_from="2025-12-01"):
         if agency_commission_total == 0 and total_agent_comm == 0:
             continue
         
-        # Obtener lista COMPLETA de agentes de la póliza
-        agents_raw = policy_data.get("agents", "")
-        agents_list_full = [a.strip() for a in agents_raw.split(",") if a.strip()] if agents_raw else []
-        
-        # Obtener lista de CSRs
-        csrs_raw = policy_data.get("csrs", "")
-        csrs_list = [c.strip() for c in csrs_raw.split(",") if c.strip()] if csrs_raw else []
+        # Obtener lista COMPLETA de agentes de la póliza (nombres del directorio)
+        agents_list_full = policy_data.get("agent_list", ())
         
         # Si NO hay agentes en agent_comms_list, usar la lista completa de la póliza
         if agent_comms_list:
@@ -153,10 +156,11 @@ def generate_unified_endorsements(client, date_from="2025-12-01"):
                     e, policy_data, endorsement_id, policy_id,
                     agent_name,  # Agente individual de este agent_comm
                     agency_commission_total,
-                    agent_commission_value
+                    agent_commission_value,
+                    agent_commission_id=agent_comm.get("databaseId"),
                 )
                 
-                unified.append(record)
+                yield record
         else:
             # Sin agent commissions configuradas, usar agentes de la póliza
             agents_to_process = agents_list_full
@@ -169,7 +173,7 @@ def generate_unified_endorsements(client, date_from="2025-12-01"):
                         "",  # Sin agente
                         agency_commission_total, 0
                     )
-                    unified.append(record)
+                    yield record
                 continue
             
             # Crear 1 fila por agente de la póliza (con comisión = 0)
@@ -180,45 +184,26 @@ def generate_unified_endorsements(client, date_from="2025-12-01"):
                     agency_commission_total,
                     0  # Sin comisión individual
                 )
-                unified.append(record)
+                yield record
 
-    # 5. Ordenar por fecha (más reciente primero)
-    unified_sorted = sorted(
-        unified,
-        key=lambda x: x.get('endorsement_effective') or '1900-01-01',
-        reverse=True  # Más reciente primero
-    )
-    
-    print(f"✅ Se generaron {len(unified_sorted)} filas con comisiones.")
-    print(f"✅ Ordenadas por fecha (más reciente primero)")
 
-    return unified_sorted
+def _row_date_key(row):
+    return row.get('endorsement_effective') or date.min
 
 
 def calculate_agent_commission_value(agent_comm, endorsement_amount, agency_commission_total):
     """Calcula el valor de comisión de un agente individual."""
-    agent_percent = agent_comm.get("commissionValue")
-    payment_type = agent_comm.get("policyCommissionAgentPaymentTypeText", "")
-    
-    if agent_percent is None:
-        return 0
-    
-    try:
-        percent = float(agent_percent)
-        if "From Agency Commission" in payment_type:
-            return agency_commission_total * (percent / 100.0)
-        else:
-            return endorsement_amount * (percent / 100.0)
-    except (ValueError, TypeError):
-        return 0
+    return calculate_single_agent_commission(agent_comm, endorsement_amount, agency_commission_total)
 
 
-def create_record(e, policy_data, endorsement_id, policy_id, agent_individual, agency_comm, agent_comm):
-    """Crea un registro unificado."""
+def create_record(e, policy_data, endorsement_id, policy_id, agent_individual, agency_comm, agent_comm,
+                  agent_commission_id=None):
+    """Crea un registro unificado (agent_commission_id: databaseId del agent_comm de la fila, si hay)."""
     return {
         # --- IDs ---
         "endorsement_id": endorsement_id,
         "policy_id": policy_id,
+        "agent_commission_id": agent_commission_id,
         
         # --- Policy info ---
         "policy_number": policy_data.get("policy_number"),
@@ -0,0 +1,141 @@
+"""
+Ordenamiento externo (external merge sort) con tope de memoria.
+
+Las filas se acumulan en memoria hasta llegar al tope configurado; en ese
+momento se ordenan y se vuelcan a disco como un "run" ordenado. Al iterar,
+los runs se combinan con heapq.merge en streaming, así nunca hace falta
+tener todas las filas en memoria a la vez.
+
+Si todas las filas entran en el tope, no se escribe nada a disco.
+"""
+
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+
+
+# Cantidad de filas que se miden para estimar el tamaño promedio de una fila
+SIZE_SAMPLE_ROWS = 200
+
+
+class ExternalSorter:
+    """
+    Acumula filas y las devuelve ordenadas, con memoria acotada.
+
+    Se puede iterar varias veces (cada iteración vuelve a leer los runs de
+    disco). Llamar a close() al terminar para borrar los archivos temporales.
+
+    Args:
+        key: Función de ordenamiento (igual que en sorted)
+        reverse: Orden descendente (igual que en sorted; el orden es estable)
+        max_memory_mb: Tope aproximado de memoria para el buffer en MB
+        spill_dir: Directorio para los runs temporales (default: temp del sistema)
+    """
+
+    def __init__(self, key, reverse=False, max_memory_mb=256, spill_dir=None):
+        self.key = key
+        self.reverse = reverse
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+
+        self._buffer = []
+        self._runs = []
+        self._count = 0
+        self._row_size = None
+        self._sample_bytes = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def spilled_runs(self):
+        return len(self._runs)
+
+    def add(self, row):
+        self._buffer.append(row)
+        self._count += 1
+
+        if self._row_size is None:
+            self._sample_bytes += _estimate_size(row)
+            if len(self._buffer) >= SIZE_SAMPLE_ROWS:
+                self._row_size = self._sample_bytes / len(self._buffer)
+            return
+
+        if len(self._buffer) * self._row_size >= self.max_memory_bytes:
+            self._spill()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def __iter__(self):
+        self._buffer.sort(key=self.key, reverse=self.reverse)
+
+        if not self._runs:
+            return iter(self._buffer)
+
+        # Runs en disco primero (fueron agregados antes) para mantener el orden estable
+        streams = [_read_run(path) for path in self._runs] + [iter(self._buffer)]
+        return heapq.merge(*streams, key=self.key, reverse=self.reverse)
+
+    def close(self):
+        """Borra los runs temporales de disco."""
+        for path in self._runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+
+    def _spill(self):
+        """Ordena el buffer actual y lo vuelca a disco como un run."""
+        self._buffer.sort(key=self.key, reverse=self.reverse)
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="report_run_", suffix=".pkl", dir=self.spill_dir)
+
+        with os.fdopen(fd, "wb") as f:
+            pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+            for row in self._buffer:
+                pickler.dump(row)
+                # Sin memo: cada fila se serializa independiente y el
+                # pickler no retiene referencias a filas ya escritas
+                pickler.clear_memo()
+
+        self._runs.append(path)
+        print(f"💽 Run {len(self._runs)} volcado a disco: {len(self._buffer):,} filas")
+        self._buffer = []
+
+
+def _read_run(path):
+    """Lee un run de disco fila por fila."""
+    with open(path, "rb") as f:
+        unpickler = pickle.Unpickler(f)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+
+def _estimate_size(row):
+    """Estimación aproximada del tamaño en memoria de una fila (dict plano)."""
+    size = sys.getsizeof(row)
+    if isinstance(row, dict):
+        for k, v in row.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+    return size
@@ -0,0 +1,342 @@
+"""
+Ejecutor de etapas del pipeline como grafo de dependencias (DAG).
+
+Cada etapa declara sus entradas (otras etapas) y sus parámetros. El
+ejecutor:
+
+- corre las etapas "fuente" (sin entradas, ej. descargas) en orden, en el
+  thread actual, y en paralelo va corriendo en threads las etapas cuyas
+  entradas ya están listas (ej. el mapa de pólizas mientras se descargan
+  las comisiones);
+- cachea en disco la salida de cada etapa, con una clave que combina el
+  código de la etapa, sus parámetros y las claves de sus entradas. Si solo
+  cambia el exportador o la ventana de fechas, se re-ejecutan solo las
+  etapas afectadas; el resto se lee del cache.
+
+La clave de una etapa fuente es la huella de su salida (fingerprint), así
+los datos descargados sin cambios reutilizan todo lo que depende de ellos.
+
+Las etapas no cacheables y las que salen del cache se evalúan recién cuando
+alguien necesita su valor: si el reporte final está en cache, no se vuelve a
+cargar ni construir nada intermedio.
+"""
+
+import contextlib
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+# name: nombre único, func: función(*entradas, **params), inputs: nombres de
+# las etapas de entrada (en el orden de los argumentos), params: dict de
+# parámetros (forman parte de la clave), cacheable: guardar la salida en disco
+# y ejecutarla apenas están sus entradas (las no cacheables se difieren),
+# code: módulos / funciones extra cuyo código forma parte de la clave,
+# fingerprint: función(salida) -> str para etapas fuente
+Stage = namedtuple(
+    "Stage",
+    ["name", "func", "inputs", "params", "cacheable", "code", "fingerprint"],
+    defaults=((), None, True, (), None),
+)
+
+# Entradas de cache que se conservan por etapa
+CACHE_KEEP_PER_STAGE = 2
+
+
+class StageCache:
+    """
+    Cache en disco de salidas de etapas (1 pickle por etapa + clave).
+
+    Args:
+        cache_dir: Directorio del cache
+        keep: Entradas que se conservan por etapa (las más viejas se borran)
+    """
+
+    def __init__(self, cache_dir, keep=CACHE_KEEP_PER_STAGE):
+        self.cache_dir = cache_dir
+        self.keep = keep
+        self.hits = 0
+        self.misses = 0
+
+    def has(self, stage_name, key):
+        return os.path.exists(self._path(stage_name, key))
+
+    def load(self, stage_name, key):
+        with open(self._path(stage_name, key), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, stage_name, key, value):
+        path = self._path(stage_name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._prune(os.path.dirname(path))
+
+    def _path(self, stage_name, key):
+        return os.path.join(self.cache_dir, _safe_name(stage_name), f"{key}.pkl")
+
+    def _prune(self, stage_dir):
+        entries = sorted(
+            (os.path.getmtime(os.path.join(stage_dir, name)), name)
+            for name in os.listdir(stage_dir)
+            if name.endswith(".pkl")
+        )
+        for _, name in entries[:-self.keep]:
+            try:
+                os.remove(os.path.join(stage_dir, name))
+            except OSError:
+                pass
+
+
+def stage_key(stage, input_keys):
+    """Clave de una etapa: código + parámetros + claves de sus entradas."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(stage.name.encode("utf-8"))
+    for obj in (stage.func,) + tuple(stage.code):
+        h.update(_code_hash(obj).encode("utf-8"))
+    h.update(repr(sorted((stage.params or {}).items())).encode("utf-8"))
+    for key in input_keys:
+        h.update(key.encode("utf-8"))
+    return h.hexdigest()
+
+
+def run_pipeline(stages, targets, cache=None, max_workers=None, profiler=None):
+    """
+    Ejecuta las etapas necesarias para obtener `targets`.
+
+    Args:
+        stages: Lista de Stage (las fuentes se ejecutan en este orden)
+        targets: Nombres de las etapas cuyo valor se devuelve
+        cache: StageCache (None = sin cache)
+        max_workers: Threads para etapas no fuente
+        profiler: StageProfiler; con profiling activo todo corre en el
+            thread actual, una etapa a la vez
+
+    Returns:
+        dict: {etapa objetivo: valor} (None si la etapa o una entrada falló)
+    """
+    by_name = {s.name: s for s in stages}
+    needed = _ancestors(by_name, targets)
+    ordered = [s for s in stages if s.name in needed]
+
+    run = _PipelineRun(by_name, cache, profiler)
+    if profiler is not None and profiler.enabled:
+        executor = _InlineExecutor()
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers or 4)
+
+    with executor:
+        run.executor = executor
+
+        # Fuentes en orden (ej. descargas, 1 endpoint a la vez por el rate limit)
+        for stage in ordered:
+            if not stage.inputs:
+                run.run_source(stage)
+                run.advance(ordered)
+
+        run.wait_all(ordered)
+
+    results = {}
+    for name in targets:
+        try:
+            results[name] = run.value(name)
+        except Exception as e:
+            print(f"❌ Error en la etapa '{name}': {e}")
+            results[name] = None
+
+    if cache is not None:
+        print(f"🧩 Cache de etapas: {cache.hits} reutilizadas, {cache.misses} ejecutadas")
+    return results
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+class _Node:
+    """Estado de una etapa durante la corrida: clave + valor (inmediato, futuro o diferido)."""
+
+    def __init__(self, key):
+        self.key = key
+        self.lock = threading.Lock()
+        self.future = None
+        self.compute = None
+        self.done = False
+        self.value = None
+        self.error = None
+
+
+class _PipelineRun:
+    def __init__(self, by_name, cache, profiler):
+        self.by_name = by_name
+        self.cache = cache
+        self.profiler = profiler
+        self.nodes = {}
+        self.executor = None
+        # RLock: el callback de una etapa que termina al instante (modo inline)
+        # vuelve a entrar en advance() desde el mismo thread
+        self._lock = threading.RLock()
+
+    # ---- Valores ----
+
+    def value(self, name):
+        """Valor de una etapa ya resuelta (evalúa las diferidas la primera vez)."""
+        node = self.nodes[name]
+        if node.future is not None:
+            return node.future.result()
+
+        with node.lock:
+            if not node.done:
+                try:
+                    node.value = node.compute()
+                except Exception as e:
+                    node.error = e
+                node.done = True
+                node.compute = None
+        if node.error is not None:
+            raise node.error
+        return node.value
+
+    def _execute(self, stage, key):
+        args = [self.value(name) for name in stage.inputs]
+        with self._stage_context(stage.name):
+            value = stage.func(*args, **(stage.params or {}))
+        if stage.cacheable and self.cache is not None:
+            self.cache.save(stage.name, key, value)
+        return value
+
+    def _load(self, stage, key):
+        with self._stage_context(f"cache:{stage.name}"):
+            return self.cache.load(stage.name, key)
+
+    def _stage_context(self, name):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.stage(name)
+
+    # ---- Planificación ----
+
+    def run_source(self, stage):
+        node = _Node(None)
+        try:
+            with self._stage_context(stage.name):
+                node.value = stage.func(**(stage.params or {}))
+            node.key = stage.fingerprint(node.value) if stage.fingerprint else uuid.uuid4().hex
+        except Exception as e:
+            node.error = e
+            node.key = uuid.uuid4().hex
+        node.done = True
+        with self._lock:
+            self.nodes[stage.name] = node
+
+    def advance(self, ordered):
+        """Resuelve las etapas cuyas entradas ya tienen clave."""
+        with self._lock:
+            progressed = True
+            while progressed:
+                progressed = False
+                for stage in ordered:
+                    if stage.name in self.nodes or not stage.inputs:
+                        continue
+                    if not all(self._key_ready(name) for name in stage.inputs):
+                        continue
+
+                    key = stage_key(stage, [self.nodes[name].key for name in stage.inputs])
+                    node = _Node(key)
+                    self.nodes[stage.name] = node
+                    progressed = True
+
+                    if stage.cacheable and self.cache is not None and self.cache.has(stage.name, key):
+                        self.cache.hits += 1
+                        node.compute = lambda stage=stage, key=key: self._load(stage, key)
+                    elif stage.cacheable:
+                        # Se ejecuta ya (en paralelo con las descargas que siguen)
+                        if self.cache is not None:
+                            self.cache.misses += 1
+                        node.future = self.executor.submit(self._execute, stage, key)
+                        node.future.add_done_callback(lambda _, ordered=ordered: self.advance(ordered))
+                    else:
+                        # Sin cache: se evalúa recién cuando alguien necesita el valor
+                        node.compute = lambda stage=stage, key=key: self._execute(stage, key)
+
+    def _key_ready(self, name):
+        node = self.nodes.get(name)
+        if node is None:
+            return False
+        # Una etapa en ejecución ya tiene clave, pero sus consumidores cacheables
+        # esperan su valor: se resuelven cuando termina (ver add_done_callback)
+        return node.future is None or node.future.done()
+
+    def wait_all(self, ordered):
+        """Espera a que terminen las etapas en ejecución y se resuelvan todas."""
+        while True:
+            self.advance(ordered)
+            with self._lock:
+                running = [
+                    n.future for n in self.nodes.values()
+                    if n.future is not None and not n.future.done()
+                ]
+            if not running:
+                return
+            wait(running)
+
+
+class _InlineExecutor:
+    """Executor que corre cada tarea en el thread actual (modo profiling)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def _ancestors(by_name, targets):
+    needed = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        if name not in by_name:
+            raise KeyError(f"Etapa desconocida: {name}")
+        needed.add(name)
+        stack.extend(by_name[name].inputs)
+    return needed
+
+
+_CODE_HASHES = {}
+
+
+def _code_hash(obj):
+    """Hash del código fuente del módulo de `obj` (o de obj si es un módulo)."""
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    target = module or obj
+    cache_key = getattr(target, "__name__", repr(target))
+    if cache_key not in _CODE_HASHES:
+        try:
+            source = inspect.getsource(target)
+        except (OSError, TypeError):
+            source = repr(target)
+        _CODE_HASHES[cache_key] = hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+    return _CODE_HASHES[cache_key]
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -0,0 +1,81 @@
+"""
+Reporte de receivables (cuentas por cobrar) por póliza.
+
+Se construye sobre el mismo dataset compartido que el reporte de comisiones
+(pólizas + receivables), sin volver a descargar /PolicyList.
+"""
+
+from datetime import date
+
+
+# Tramos de antigüedad (días vencidos): (límite superior inclusive, etiqueta)
+AGING_BUCKETS = (
+    (0, "Current"),
+    (30, "1-30"),
+    (60, "31-60"),
+    (90, "61-90"),
+)
+AGING_OVER = "90+"
+
+
+def build_receivables_report(policies_map, receivables, as_of=None):
+    """
+    Genera las filas del reporte de receivables con saldo pendiente.
+
+    Args:
+        policies_map: Mapa de pólizas (ver app.api.policies.build_policies_map)
+        receivables: Receivables ingeridos (ver app.services.validators.ingest_receivables)
+        as_of: Fecha de corte para calcular días vencidos (default: hoy)
+
+    Returns:
+        Lista de filas (1 por receivable con saldo != 0), más vencidas primero
+    """
+    as_of = as_of or date.today()
+    rows = []
+
+    for r in receivables:
+        balance = _balance(r)
+        if not balance:
+            continue
+
+        policy_id = r.get("policyDatabaseId") or r.get("policyId")
+        policy_data = policies_map.get(policy_id, {})
+
+        due_date = r.get("dueDate")
+        days_past_due = (as_of - due_date).days if due_date else 0
+
+        rows.append({
+            "receivable_id": r.get("databaseId"),
+            "policy_id": policy_id,
+            "policy_number": policy_data.get("policy_number"),
+            "mga": policy_data.get("mga"),
+            "insured": policy_data.get("insured"),
+            "agents": policy_data.get("agents"),
+            "due_date": due_date,
+            "amount": r.get("amount") or 0.0,
+            "paid": r.get("paidAmount") or 0.0,
+            "balance": balance,
+            "days_past_due": max(days_past_due, 0),
+            "aging": aging_bucket(days_past_due),
+            "status": r.get("statusText"),
+        })
+
+    rows.sort(key=lambda x: x["days_past_due"], reverse=True)
+    print(f"✅ Se generaron {len(rows)} filas de receivables con saldo pendiente.")
+    return rows
+
+
+def aging_bucket(days_past_due):
+    """Devuelve el tramo de antigüedad para una cantidad de días vencidos."""
+    for limit, label in AGING_BUCKETS:
+        if days_past_due <= limit:
+            return label
+    return AGING_OVER
+
+
+def _balance(receivable):
+    """Saldo pendiente: `balance` si la API lo trae, si no amount - paidAmount."""
+    balance = receivable.get("balance")
+    if balance is not None:
+        return balance
+    return (receivable.get("amount") or 0.0) - (receivable.get("paidAmount") or 0.0)
@@ -0,0 +1,440 @@
+"""
+Orquestador de reportes sobre un dataset compartido.
+
+Cada reporte declara qué datasets necesita. El orquestador descarga cada
+endpoint UNA sola vez por corrida (en vez de que cada reporte descargue lo
+suyo y duplique el consumo del rate limit), lo ingiere una vez y lo comparte
+en memoria con todos los reportes.
+
+Las etapas (descarga → ingesta → mapa de pólizas / dataset indexado →
+reportes) se arman como un grafo y las ejecuta app.services.pipeline: las
+etapas independientes corren en paralelo (ej. el mapa de pólizas mientras se
+descargan las comisiones) y la salida de cada etapa se cachea según sus
+entradas. Cambiar la ventana de fechas cambia la poda de las comisiones
+(etapa window_ids): se re-ingieren solo las comisiones y se rearma el mapa de
+pólizas de la ventana; pólizas y endorsements salen del cache.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import date
+
+from app.api import agents as agents_api
+from app.api import policies as policies_api
+from app.api.agents import AGENT_DIRECTORY_FILE, AgentDirectory, get_agent_directory, intern_agent_names
+from app.api.commissions import get_agency_commissions, get_agent_commissions
+from app.api.endorsements import get_all_endorsements
+from app.api.policies import build_policies_map
+from app.api.policy_list import get_policy_list
+from app.api.receivables import get_receivables
+from app.api.snapshot_store import load_snapshot, snapshot_path
+from app.services import (
+    commision_calculator,
+    endorsement_dataset,
+    receivable_report_service,
+    semi_join,
+    validators,
+)
+from app.services.commission_ledger import CommissionLedger
+from app.services.commission_scenarios import run_scenarios
+from app.services.endorsement_dataset import EndorsementDataset
+from app.services.endorsement_report_service import build_unified_endorsements_from_dataset
+from app.services.pipeline import Stage, StageCache, run_pipeline
+from app.services.receivable_report_service import build_receivables_report
+from app.services.semi_join import WindowIds, prune_records, window_ids
+from app.services.validators import (
+    ValidationReport,
+    ingest_agency_commissions,
+    ingest_agent_commissions,
+    ingest_endorsements,
+    ingest_policies,
+    ingest_receivables,
+)
+from config.settings import NOWCERTS_RECEIVABLES_ENDPOINT
+
+
+DatasetSpec = namedtuple("DatasetSpec", ["endpoint", "fetch", "ingest"])
+
+DATASETS = {
+    "policies": DatasetSpec("/PolicyList", get_policy_list, ingest_policies),
+    "endorsements": DatasetSpec("/PolicyEndorsementDetailList", get_all_endorsements, ingest_endorsements),
+    "agency_commissions": DatasetSpec(
+        "/PolicyEndorsementAgencyCommissionDetailList", get_agency_commissions, ingest_agency_commissions
+    ),
+    "agent_commissions": DatasetSpec(
+        "/PolicyEndorsementAgentsCommissionDetailList", get_agent_commissions, ingest_agent_commissions
+    ),
+    "receivables": DatasetSpec(NOWCERTS_RECEIVABLES_ENDPOINT, get_receivables, ingest_receivables),
+}
+
+
+# Datasets de comisiones (se podan contra los endorsements de la ventana)
+COMMISSION_DATASETS = ("agency_commissions", "agent_commissions")
+# Datasets cuyos nombres de agentes se unen al directorio en la ingesta
+AGENT_NAME_DATASETS = ("agent_commissions",)
+
+# Salida de la etapa de ingesta: registros tipados + anomalías encontradas
+IngestedDataset = namedtuple("IngestedDataset", ["records", "validation"])
+
+# name: nombre del reporte, datasets: tupla de claves de DATASETS (qué se
+# descarga), inputs: etapas de entrada de `build` en orden (datasets ingeridos,
+# "policies_map", "window_policies_map" o "endorsement_dataset"),
+# build: función(*inputs, **params),
+# params: parámetros del reporte (forman parte de la clave de cache),
+# cacheable: guardar el resultado en el cache de etapas, code: módulos extra
+# cuyo código invalida el cache
+ReportSpec = namedtuple(
+    "ReportSpec",
+    ["name", "datasets", "inputs", "build", "params", "cacheable", "code"],
+    defaults=(None, True, ()),
+)
+
+
+# -----------------------
+# Reportes disponibles
+# -----------------------
+
+def commission_report_spec(date_from, memory_limit_mb=None):
+    """
+    Reporte de comisiones (1 fila por agente) desde `date_from`.
+
+    Con memory_limit_mb el resultado es un ExternalSorter (modo memoria
+    acotada, con runs en archivos temporales: no se cachea).
+    """
+    return ReportSpec(
+        name="commissions",
+        datasets=("policies", "endorsements", "agency_commissions", "agent_commissions"),
+        inputs=("endorsement_dataset", "window_policies_map"),
+        build=build_unified_endorsements_from_dataset,
+        params={"date_from": date_from, "memory_limit_mb": memory_limit_mb},
+        cacheable=not memory_limit_mb,
+        code=(commision_calculator,),
+    )
+
+
+def scenarios_report_spec(scenarios, date_from, max_workers=None):
+    """Comparación de escenarios what-if de comisiones desde `date_from`."""
+    return ReportSpec(
+        name="scenarios",
+        datasets=("policies", "endorsements", "agency_commissions", "agent_commissions"),
+        inputs=("endorsement_dataset", "window_policies_map"),
+        build=run_scenarios,
+        params={"scenarios": scenarios, "date_from": date_from, "max_workers": max_workers},
+        code=(commision_calculator,),
+    )
+
+
+def ledger_report_spec(date_from, path, client=None):
+    """
+    Sync del ledger de comisiones en `path` con los endorsements desde
+    `date_from` (ver app.services.commission_ledger). No se cachea: el ledger
+    se actualiza en cada corrida.
+
+    Con `client`, si su descarga de endorsements quedó incompleta (ver
+    NowCertsClient.fetch_status) no se quitan del ledger los que faltan.
+    """
+    return ReportSpec(
+        name="ledger",
+        datasets=("policies", "endorsements", "agency_commissions", "agent_commissions"),
+        inputs=("endorsement_dataset", "window_policies_map"),
+        build=_sync_ledger,
+        params={"path": path, "date_from": date_from, "client": client},
+        cacheable=False,
+    )
+
+
+def receivables_report_spec(as_of=None):
+    """Reporte de receivables con saldo pendiente al `as_of` (default: hoy)."""
+    return ReportSpec(
+        name="receivables",
+        datasets=("policies", "receivables"),
+        inputs=("policies_map", "receivables"),
+        build=_build_receivables_report,
+        # La fecha de corte se fija acá para que forme parte de la clave de cache
+        params={"as_of": as_of or date.today()},
+        code=(receivable_report_service,),
+    )
+
+
+# -----------------------
+# Orquestación
+# -----------------------
+
+def needed_datasets(reports):
+    """Claves de DATASETS que piden los reportes, sin repetir y en orden de pedido."""
+    needed = []
+    for spec in reports:
+        for name in spec.datasets:
+            if name not in needed:
+                needed.append(name)
+    return needed
+
+
+def run_reports(
+    client,
+    reports,
+    validation_report=None,
+    snapshot_dir=None,
+    max_workers=None,
+    profiler=None,
+    cache_dir=None,
+):
+    """
+    Descarga cada dataset necesario una sola vez y construye los reportes.
+
+    Los datasets se descargan en el orden en que los piden los reportes
+    (de a uno, por el rate limit); mientras tanto, en otros threads, se
+    ingieren los ya descargados y se construye lo que ya tiene sus entradas.
+
+    Args:
+        client: Cliente de NowCerts API (None si se usa snapshot_dir)
+        reports: Lista de ReportSpec
+        validation_report: ValidationReport donde acumular anomalías
+        snapshot_dir: Si se indica, lee los datasets de los snapshots en
+            disco (ej. "data_raw") en lugar de descargarlos
+        max_workers: Threads para ingesta / construcción (default: 4)
+        profiler: StageProfiler para perfilar cada etapa. Con profiling
+            activo las etapas corren en el thread actual, una a la vez, para
+            que cada etapa sea atribuible.
+        cache_dir: Directorio del cache de etapas (None = sin cache)
+
+    Returns:
+        dict: {nombre del reporte: resultado} (None si el reporte falló)
+    """
+    report = validation_report if validation_report is not None else ValidationReport()
+    needed = needed_datasets(reports)
+
+    print(f"🔹 Orquestador: {len(reports)} reportes comparten {len(needed)} datasets ({', '.join(needed)})")
+
+    stages = build_report_stages(client, reports, snapshot_dir=snapshot_dir)
+    targets = [f"validation:{name}" for name in needed] + [f"report:{spec.name}" for spec in reports]
+    cache = StageCache(cache_dir) if cache_dir else None
+
+    values = run_pipeline(stages, targets, cache=cache, max_workers=max_workers, profiler=profiler)
+
+    # Anomalías de la ingesta de cada dataset (también cuando sale del cache)
+    for name in needed:
+        validation = values[f"validation:{name}"]
+        if validation is not None:
+            report.anomalies.extend(validation.anomalies)
+            report.records_checked.update(validation.records_checked)
+    report.print_summary()
+
+    return {spec.name: values[f"report:{spec.name}"] for spec in reports}
+
+
+def build_report_stages(client, reports, snapshot_dir=None):
+    """
+    Arma el grafo de etapas de los reportes.
+
+    Etapas: agent_directory, fetch:<dataset> → <dataset> (ingesta) →
+    validation:<dataset>, policies_map, endorsement_dataset → report:<reporte>.
+
+    Las comisiones se podan antes de ingerirlas contra los endorsements de la
+    ventana de fechas más amplia que piden los reportes (etapa window_ids, ver
+    app.services.semi_join), y los reportes de comisiones usan un mapa con
+    solo las pólizas de esa ventana (window_policies_map). Por eso una
+    date_from nueva re-ingiere agency_commissions y agent_commissions y
+    rearma window_policies_map, no solo los reportes.
+
+    Los nombres de agentes de las comisiones se unen al directorio en la
+    ingesta de agent_commissions (el directorio es una de sus entradas): las
+    etapas siguientes no modifican lo que reciben, que puede venir del cache.
+
+    Returns:
+        list[Stage] (las descargas, en el orden en que se ejecutan)
+    """
+    needed = needed_datasets(reports)
+    prune = "endorsements" in needed
+
+    # Directorio de agentes (actualización incremental, ver app.api.agents)
+    stages = [Stage(
+        name="agent_directory",
+        func=_load_agent_directory,
+        params={"client": client, "snapshot_dir": snapshot_dir},
+        cacheable=False,
+        fingerprint=AgentDirectory.fingerprint,
+    )]
+    for name in needed:
+        spec = DATASETS[name]
+        directory = ("agent_directory",) if name in AGENT_NAME_DATASETS else ()
+        stages.append(Stage(
+            name=f"fetch:{name}",
+            func=_fetch_dataset,
+            params={"client": client, "spec": spec, "snapshot_dir": snapshot_dir},
+            cacheable=False,
+            fingerprint=records_fingerprint,
+        ))
+        if prune and name in COMMISSION_DATASETS:
+            stages.append(Stage(
+                name=name,
+                func=_ingest_window_commissions,
+                inputs=(f"fetch:{name}", "window_ids") + directory,
+                params={"dataset": name},
+                code=(validators, semi_join, agents_api),
+            ))
+        else:
+            stages.append(Stage(
+                name=name,
+                func=_ingest_dataset,
+                inputs=(f"fetch:{name}",) + directory,
+                params={"dataset": name},
+                code=(validators, agents_api),
+            ))
+        # Las anomalías se cachean aparte (un pickle chico por dataset): con el
+        # cache caliente se cargan solo estas, sin leer los datos ingeridos
+        stages.append(Stage(
+            name=f"validation:{name}",
+            func=_dataset_validation,
+            inputs=(name,),
+        ))
+
+    stages.append(Stage(
+        name="window_ids",
+        func=_window_ids,
+        inputs=("endorsements",),
+        params={"date_from": _window_from(reports)},
+        code=(semi_join,),
+    ))
+    stages.append(Stage(
+        name="policies_map",
+        func=_build_policies_map,
+        inputs=("policies", "agent_directory"),
+        code=(policies_api, agents_api),
+    ))
+    stages.append(Stage(
+        name="window_policies_map",
+        func=_build_window_policies_map,
+        inputs=("policies", "window_ids", "agent_directory"),
+        code=(policies_api, agents_api),
+    ))
+    # El índice se reconstruye rápido y duplicaría en disco los datos ingeridos:
+    # no se cachea (y solo se construye si algún reporte lo necesita)
+    stages.append(Stage(
+        name="endorsement_dataset",
+        func=_build_endorsement_dataset,
+        inputs=("endorsements", "agency_commissions", "agent_commissions"),
+        cacheable=False,
+        code=(endorsement_dataset,),
+    ))
+
+    for spec in reports:
+        stages.append(Stage(
+            name=f"report:{spec.name}",
+            func=spec.build,
+            inputs=spec.inputs,
+            params=spec.params or {},
+            cacheable=spec.cacheable,
+            code=spec.code,
+        ))
+
+    return stages
+
+
+def records_fingerprint(records):
+    """
+    Huella de una lista de registros de NowCerts (databaseId + changeDate).
+
+    Si cambia cualquier registro, cambia su changeDate y por lo tanto la huella.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(records)).encode("utf-8"))
+    for r in records:
+        if r.get("databaseId") is not None and r.get("changeDate") is not None:
+            h.update(f"{r['databaseId']}|{r['changeDate']}\n".encode("utf-8"))
+        else:
+            h.update(json.dumps(r, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+# -----------------------
+# Etapas
+# -----------------------
+
+def _fetch_dataset(client, spec, snapshot_dir):
+    if snapshot_dir:
+        return _load_snapshot(snapshot_dir, spec.endpoint)
+    return spec.fetch(client)
+
+
+def _ingest_dataset(records, agent_directory=None, *, dataset):
+    validation = ValidationReport()
+    DATASETS[dataset].ingest(records, validation)
+    # Nombres de agentes del directorio (por ID), internados
+    if agent_directory is not None:
+        intern_agent_names(records, agent_directory)
+    return IngestedDataset(records, validation)
+
+
+def _ingest_window_commissions(records, window, agent_directory=None, *, dataset):
+    before = len(records)
+    records = prune_records(records, "endorsementDatabaseId", window.endorsements)
+    if window.endorsements is not None:
+        print(f"✂️ {dataset}: {len(records):,} de {before:,} filas son de endorsements de la ventana")
+    return _ingest_dataset(records, agent_directory, dataset=dataset)
+
+
+def _window_ids(endorsements, date_from):
+    if date_from is None:
+        return WindowIds(None, None)
+    return window_ids(endorsements.records, date_from)
+
+
+def _window_from(reports):
+    """Fecha desde más temprana de los reportes que usan el dataset indexado (None = sin poda)."""
+    dates = [
+        (spec.params or {}).get("date_from")
+        for spec in reports
+        if "endorsement_dataset" in spec.inputs
+    ]
+    if not dates or None in dates:
+        return None
+    return min(dates, key=lambda d: str(d)[:10])
+
+
+def _dataset_validation(ingested):
+    return ingested.validation
+
+
+def _load_agent_directory(client, snapshot_dir):
+    if snapshot_dir:
+        return AgentDirectory(os.path.join(snapshot_dir, AGENT_DIRECTORY_FILE))
+    return get_agent_directory(client, snapshot_dir=client.snapshot_dir)
+
+
+def _build_policies_map(policies, agent_directory):
+    return build_policies_map(policies.records, agent_directory=agent_directory)
+
+
+def _build_window_policies_map(policies, window, agent_directory):
+    return build_policies_map(policies.records, policy_ids=window.policies, agent_directory=agent_directory)
+
+
+def _build_endorsement_dataset(endorsements, agency_comms, agent_comms):
+    return EndorsementDataset(endorsements.records, agency_comms.records, agent_comms.records)
+
+
+def _build_receivables_report(policies_map, receivables, as_of):
+    return build_receivables_report(policies_map, receivables.records, as_of=as_of)
+
+
+def _sync_ledger(dataset, policies_map, path, date_from, client):
+    status = getattr(client, "fetch_status", {}).get(DATASETS["endorsements"].endpoint)
+    remove_missing = status is None or status.complete
+    return CommissionLedger(path).sync(dataset, policies_map, date_from=date_from, remove_missing=remove_missing)
+
+
+def _load_snapshot(snapshot_dir, endpoint):
+    """Carga el snapshot guardado por get_all_paginated (.snap, o el .json de versiones anteriores)."""
+    path = snapshot_path(snapshot_dir, endpoint)
+    if os.path.exists(path):
+        records = load_snapshot(path)
+    else:
+        safe_name = endpoint.strip("/").replace("/", "_")
+        path = os.path.join(snapshot_dir, f"{safe_name}.json")
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    print(f"📂 {len(records):,} registros cargados desde {path}")
+    return records
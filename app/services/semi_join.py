@@ -0,0 +1,147 @@
+"""
+Semi-join: descartar filas que no pueden aparecer en el reporte.
+
+Las comisiones (agencia y agentes) se descargan con toda la historia, pero
+el reporte solo consulta las de los endorsements de la ventana de fechas.
+Antes de ingerir / indexar las comisiones se arma el conjunto de IDs de los
+endorsements de la ventana (y de sus pólizas) y se descartan las filas que
+no los referencian. Así el costo de la ingesta, del índice y la memoria que
+ocupan dependen del tamaño de la ventana y no de toda la historia.
+
+Para ventanas muy grandes el conjunto exacto de IDs se reemplaza por un
+filtro de Bloom (~1.2 bytes por ID en vez de ~100). Un falso positivo solo
+deja pasar una fila de más, que el reporte nunca consulta: el resultado es
+el mismo que sin poda.
+"""
+
+import hashlib
+import math
+from collections import namedtuple
+from datetime import date, datetime
+
+
+# Hasta cuántos IDs se usa un set exacto (más arriba, filtro de Bloom)
+EXACT_SET_LIMIT = 100_000
+BLOOM_ERROR_RATE = 0.01
+
+# IDs de la ventana: endorsements (databaseId) y sus pólizas (policyId).
+# Cada uno es un set o un BloomFilter (ambos soportan `in`)
+WindowIds = namedtuple("WindowIds", ["endorsements", "policies"])
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre IDs (strings / números).
+
+    `x in filtro` nunca da falso negativo; da falso positivo con
+    probabilidad ~error_rate si se agregan hasta `capacity` IDs.
+
+    Args:
+        capacity: Cantidad esperada de IDs
+        error_rate: Tasa de falsos positivos buscada
+    """
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, value):
+        # Doble hashing: k posiciones a partir de 2 hashes de 64 bits
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+def id_filter(ids, exact_limit=EXACT_SET_LIMIT):
+    """
+    Filtro de pertenencia para `ids`: set exacto o, si son más de
+    `exact_limit`, filtro de Bloom.
+    """
+    ids = set(ids)
+    if len(ids) <= exact_limit:
+        return ids
+
+    bloom = BloomFilter(len(ids))
+    for value in ids:
+        bloom.add(value)
+    return bloom
+
+
+def window_ids(endorsements, date_from=None, date_to=None, exact_limit=EXACT_SET_LIMIT):
+    """
+    IDs de los endorsements con fecha (date o createDate) en
+    [date_from, date_to] y de sus pólizas (mismo criterio que
+    EndorsementDataset.endorsements_between).
+
+    Args:
+        endorsements: Endorsements ya ingeridos (fechas parseadas)
+        date_from / date_to: date o "YYYY-MM-DD"; None = sin límite
+
+    Returns:
+        WindowIds
+    """
+    date_from = _as_date(date_from)
+    date_to = _as_date(date_to)
+
+    endorsement_ids = []
+    policy_ids = []
+    for e in endorsements:
+        report_date = e.get("date") or e.get("createDate")
+        if report_date is None:
+            continue
+        if isinstance(report_date, datetime):
+            report_date = report_date.date()
+        if date_from and report_date < date_from:
+            continue
+        if date_to and report_date > date_to:
+            continue
+        endorsement_ids.append(e.get("databaseId"))
+        policy_ids.append(e.get("policyId"))
+
+    return WindowIds(id_filter(endorsement_ids, exact_limit), id_filter(policy_ids, exact_limit))
+
+
+def prune_records(records, field, keep):
+    """
+    Filas de `records` cuyo `field` está en `keep` (semi-join).
+
+    Args:
+        records: Iterable de dicts (ej. comisiones crudas, a medida que llegan)
+        field: Campo de la clave (ej. "endorsementDatabaseId")
+        keep: set o BloomFilter; None = no podar
+
+    Returns:
+        list[dict]
+    """
+    if keep is None:
+        return list(records)
+    return [r for r in records if r.get(field) in keep]
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _as_date(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
@@ -0,0 +1,197 @@
+"""
+Profiling por etapa del pipeline (modo --profile de run_report.py).
+
+Cada etapa se envuelve en cProfile (CPU por función) y tracemalloc (pico de
+memoria y líneas que más asignan). Al terminar se escribe, junto al reporte:
+
+- <etapa>.prof: perfil de cProfile de cada etapa (pstats / snakeviz)
+- profile_summary.txt: tiempos por etapa y ranking de funciones más costosas
+
+El tiempo dormido por rate limit (la ventana del limiter de cada cliente, ver
+app.api.rate_limiter, los 429 y los sleeps entre páginas / reintentos, ver
+NowCertsClient.rate_limit_wait_seconds) se informa aparte del tiempo de
+cómputo, así una descarga lenta no se confunde con un cuello de botella de CPU.
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from collections import namedtuple
+
+
+# name: etapa, wall: segundos reales, sleep: segundos esperando rate limit,
+# cpu: segundos de CPU del proceso, peak_mb: pico de memoria asignada en la etapa
+StageTiming = namedtuple("StageTiming", ["name", "wall", "sleep", "cpu", "peak_mb", "top_allocations"])
+
+# Funciones que no son cómputo: se excluyen del ranking de funciones calientes
+SLEEP_FUNCTIONS = ("{built-in method time.sleep}",)
+
+HOT_FUNCTIONS = 25
+TOP_ALLOCATIONS = 5
+
+# Las asignaciones del propio tracemalloc / profiler no son del pipeline
+_ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+)
+
+
+class StageProfiler:
+    """
+    Perfila etapas nombradas del pipeline.
+
+    Con enabled=False, stage() no hace nada (sin overhead en corridas normales).
+
+    Args:
+        output_dir: Directorio donde escribir los .prof y el resumen
+        enabled: Activar el profiling
+        clients: Clientes de NowCerts cuyo tiempo de rate limit se descuenta
+    """
+
+    def __init__(self, output_dir=None, enabled=True, clients=()):
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.clients = list(clients)
+        self.timings = []
+        self._profiles = []
+
+        self._started_tracemalloc = enabled and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+
+    def stage(self, name):
+        """Context manager que perfila el bloque como la etapa `name`."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._profile_stage(name)
+
+    @contextlib.contextmanager
+    def _profile_stage(self, name):
+        profile = cProfile.Profile()
+        tracemalloc.reset_peak()
+        snapshot_before = tracemalloc.take_snapshot()
+        sleep_before = self._rate_limit_wait()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            sleep = self._rate_limit_wait() - sleep_before
+            _, peak = tracemalloc.get_traced_memory()
+
+            snapshot_after = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+            diff = snapshot_after.compare_to(snapshot_before.filter_traces(_ALLOCATION_FILTERS), "lineno")
+            top_allocations = [
+                (str(stat.traceback[0]), stat.size_diff)
+                for stat in diff[:TOP_ALLOCATIONS]
+                if stat.size_diff >= 1024
+            ]
+
+            self.timings.append(StageTiming(name, wall, sleep, cpu, peak / 1024 / 1024, top_allocations))
+            self._profiles.append((name, profile))
+            print(f"⏱️ Etapa '{name}': {wall:.2f}s ({sleep:.2f}s rate limit, {cpu:.2f}s CPU, pico {peak / 1024 / 1024:.1f} MB)")
+
+    def write(self):
+        """
+        Escribe los .prof por etapa y el resumen con el ranking de funciones.
+
+        Returns:
+            str: Ruta del resumen (None si el profiling está deshabilitado)
+        """
+        if not self.enabled or not self._profiles:
+            return None
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        combined = None
+        for name, profile in self._profiles:
+            profile.dump_stats(os.path.join(self.output_dir, f"{_safe_name(name)}.prof"))
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+
+        summary_path = os.path.join(self.output_dir, "profile_summary.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(self.summary(combined))
+
+        print(f"💾 Profiling guardado en: {self.output_dir}")
+        return summary_path
+
+    def summary(self, combined=None):
+        """Texto con tiempos por etapa + funciones más costosas (sin sleeps)."""
+        lines = [
+            "TIEMPOS POR ETAPA",
+            "(incluyen el overhead de cProfile + tracemalloc: comparar etapas entre sí,",
+            " no contra una corrida sin --profile)",
+            "",
+        ]
+        lines.append(f"{'Etapa':<32} {'Total':>9} {'Rate limit':>11} {'Cómputo':>9} {'CPU':>9} {'Pico MB':>9}")
+
+        total_wall = total_sleep = 0.0
+        for t in self.timings:
+            total_wall += t.wall
+            total_sleep += t.sleep
+            lines.append(
+                f"{t.name:<32} {t.wall:>8.2f}s {t.sleep:>10.2f}s {t.wall - t.sleep:>8.2f}s "
+                f"{t.cpu:>8.2f}s {t.peak_mb:>9.1f}"
+            )
+        lines.append(
+            f"{'TOTAL':<32} {total_wall:>8.2f}s {total_sleep:>10.2f}s {total_wall - total_sleep:>8.2f}s"
+        )
+
+        lines += ["", "MEMORIA: LÍNEAS QUE MÁS ASIGNAN POR ETAPA", ""]
+        for t in self.timings:
+            for location, size in t.top_allocations:
+                lines.append(f"{t.name:<32} {size / 1024:>10,.0f} KB  {location}")
+
+        if combined is not None:
+            lines += ["", f"FUNCIONES MÁS COSTOSAS (tiempo propio, sin sleeps, top {HOT_FUNCTIONS})", ""]
+            lines += _hot_functions(combined)
+
+        return "\n".join(lines) + "\n"
+
+    def _rate_limit_wait(self):
+        return sum(client.rate_limit_wait_seconds for client in self.clients)
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _hot_functions(stats):
+    """Ranking de funciones por tiempo propio (tottime), excluyendo sleeps."""
+    rows = []
+    for (filename, lineno, func), (cc, nc, tottime, cumtime, _) in stats.stats.items():
+        label = pstats.func_std_string((filename, lineno, func))
+        if label in SLEEP_FUNCTIONS:
+            continue
+        rows.append((tottime, cumtime, nc, label))
+
+    rows.sort(reverse=True)
+
+    out = io.StringIO()
+    out.write(f"{'Propio':>9} {'Acumulado':>10} {'Llamadas':>10}  Función\n")
+    for tottime, cumtime, calls, label in rows[:HOT_FUNCTIONS]:
+        out.write(f"{tottime:>8.3f}s {cumtime:>9.3f}s {calls:>10,}  {label}\n")
+    return out.getvalue().splitlines()
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
@@ -0,0 +1,112 @@
+"""
+Resúmenes precalculados del reporte de comisiones.
+
+Agrupa las filas unificadas (1 fila por agente) por Agent, MGA, mes y
+tipo de endorsement en una sola pasada, para que Finance no tenga que
+recalcular tablas dinámicas en Excel cada vez que abre el archivo.
+"""
+
+from app.services.commision_calculator import apply_cancel_sign, safe_money
+
+
+# Clave de `summaries` con el total general (ver build_commission_summaries)
+SUMMARY_TOTAL = "TOTAL"
+
+# Dimensiones de agrupación: nombre de la hoja -> función que obtiene la clave
+SUMMARY_DIMENSIONS = {
+    "Agent": lambda row: row.get("agent") or "(Sin agente)",
+    "MGA": lambda row: row.get("mga") or "(Sin MGA)",
+    "Month": lambda row: _month_key(row.get("endorsement_effective")),
+    "Endorsement Type": lambda row: row.get("endorsement_type") or "(Sin tipo)",
+}
+
+
+def build_commission_summaries(rows):
+    """
+    Calcula los totales agrupados del reporte en una sola pasada.
+
+    Como la Agency Commission y el Endorsement Amount se repiten en cada
+    fila de agente, solo se suman la primera vez que un endorsement aparece
+    dentro de cada grupo. La Agent Commission es individual y se suma siempre.
+    Las cancelaciones se suman en negativo (mismo criterio que el Excel).
+
+    El total general (clave SUMMARY_TOTAL) cuenta cada endorsement 1 sola
+    vez: no es la suma de los grupos, porque en By Agent un endorsement con
+    varios agentes está en varios grupos.
+
+    Args:
+        rows: Filas del reporte de comisiones (ver build_unified_endorsements_from_dataset)
+
+    Returns:
+        dict: {dimensión: [ {group, endorsements, premium, agency_commission,
+               agent_commission, total_commission}, ... ]} ordenado por grupo,
+               más {SUMMARY_TOTAL: {group, endorsements, ...}}
+    """
+    groups = {name: {} for name in SUMMARY_DIMENSIONS}
+    seen = {name: set() for name in SUMMARY_DIMENSIONS}
+    grand_total = _empty_totals(SUMMARY_TOTAL)
+    seen_total = set()
+
+    for row in rows:
+        amount, agency_comm, agent_comm = apply_cancel_sign(
+            row.get("endorsement_type"),
+            safe_money(row.get("endorsement_amount")),
+            safe_money(row.get("agency_commission")),
+            safe_money(row.get("agent_commission")),
+        )
+        endorsement_id = row.get("endorsement_id")
+
+        for name, key_fn in SUMMARY_DIMENSIONS.items():
+            key = key_fn(row)
+            totals = groups[name].get(key)
+            if totals is None:
+                totals = groups[name][key] = _empty_totals(key)
+
+            totals["agent_commission"] += agent_comm
+
+            # Premium y agency commission: 1 vez por endorsement en el grupo
+            if (key, endorsement_id) not in seen[name]:
+                seen[name].add((key, endorsement_id))
+                totals["endorsements"] += 1
+                totals["premium"] += amount
+                totals["agency_commission"] += agency_comm
+
+        grand_total["agent_commission"] += agent_comm
+        if endorsement_id not in seen_total:
+            seen_total.add(endorsement_id)
+            grand_total["endorsements"] += 1
+            grand_total["premium"] += amount
+            grand_total["agency_commission"] += agency_comm
+
+    summaries = {}
+    for name, by_key in groups.items():
+        summary_rows = sorted(by_key.values(), key=lambda t: str(t["group"]))
+        for totals in summary_rows:
+            totals["total_commission"] = totals["agency_commission"] + totals["agent_commission"]
+        summaries[name] = summary_rows
+
+    grand_total["total_commission"] = grand_total["agency_commission"] + grand_total["agent_commission"]
+    summaries[SUMMARY_TOTAL] = grand_total
+
+    return summaries
+
+
+# -----------------------
+# Helpers
+# -----------------------
+
+def _empty_totals(group):
+    return {
+        "group": group,
+        "endorsements": 0,
+        "premium": 0.0,
+        "agency_commission": 0.0,
+        "agent_commission": 0.0,
+    }
+
+
+def _month_key(value):
+    """Devuelve el mes "YYYY-MM" de una fecha ISO."""
+    if not value:
+        return "(Sin fecha)"
+    return str(value)[:7]
@@ -0,0 +1,202 @@
+"""
+Ingesta y validación de registros crudos de NowCerts.
+
+Cada registro se convierte UNA sola vez a valores tipados (fechas, montos,
+porcentajes y tipo de pago del agente) apenas se descarga. Todo lo que viene
+después (filtros, calculador de comisiones, exportador) trabaja sobre los
+valores ya parseados, sin volver a hacer strptime / float() en cada paso.
+
+Los valores que no se pueden convertir no se descartan en silencio:
+quedan en None y se registran en un ValidationReport.
+"""
+
+from collections import Counter, namedtuple
+from datetime import date, datetime
+from enum import Enum
+
+
+class PaymentType(Enum):
+    """Tipo de pago de la comisión de un agente."""
+    FROM_BASE_PREMIUM = "From Base Premium"
+    FROM_AGENCY_COMMISSION = "From Agency Commission"
+
+
+class UnknownValue(ValueError):
+    """Valor no reconocido que igual tiene un valor por defecto utilizable."""
+
+    def __init__(self, default, message):
+        super().__init__(message)
+        self.default = default
+
+
+# source: campo crudo de la API, target: campo tipado, parser: función de conversión
+Field = namedtuple("Field", ["source", "target", "parser"])
+
+
+# -----------------------
+# Parsers
+# -----------------------
+
+def parse_date(value):
+    """Convierte "2025-12-01T00:00:00" o "2025-12-01" a date."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+def parse_amount(value):
+    """Convierte un monto a float."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError("valor booleano")
+    return float(value)
+
+
+def parse_percent(value):
+    """Convierte un porcentaje (ej. 15 = 15%) a float."""
+    percent = parse_amount(value)
+    if percent is not None and not -100.0 <= percent <= 100.0:
+        # Se conserva el valor, pero se reporta para revisión
+        raise UnknownValue(percent, f"porcentaje fuera de rango: {percent}")
+    return percent
+
+
+def parse_payment_type(value):
+    """
+    Convierte `policyCommissionAgentPaymentTypeText` a PaymentType.
+
+    Igual que antes, todo lo que no sea "From Agency Commission" se calcula
+    sobre la prima base; los textos desconocidos se reportan como anomalía.
+    """
+    if not value:
+        return PaymentType.FROM_BASE_PREMIUM
+    if PaymentType.FROM_AGENCY_COMMISSION.value in value:
+        return PaymentType.FROM_AGENCY_COMMISSION
+    if PaymentType.FROM_BASE_PREMIUM.value in value:
+        return PaymentType.FROM_BASE_PREMIUM
+    raise UnknownValue(PaymentType.FROM_BASE_PREMIUM, f"tipo de pago desconocido: {value!r}")
+
+
+# -----------------------
+# Schemas por endpoint
+# -----------------------
+
+ENDORSEMENT_SCHEMA = (
+    Field("date", "date", parse_date),
+    Field("createDate", "createDate", parse_date),
+    Field("amount", "amount", parse_amount),
+)
+
+AGENCY_COMMISSION_SCHEMA = (
+    Field("commissionValue", "commissionValue", parse_percent),
+)
+
+AGENT_COMMISSION_SCHEMA = (
+    Field("commissionValue", "commissionValue", parse_percent),
+    Field("policyCommissionAgentPaymentTypeText", "paymentType", parse_payment_type),
+)
+
+RECEIVABLE_SCHEMA = (
+    Field("dueDate", "dueDate", parse_date),
+    Field("amount", "amount", parse_amount),
+    Field("paidAmount", "paidAmount", parse_amount),
+    Field("balance", "balance", parse_amount),
+)
+
+POLICY_SCHEMA = (
+    Field("effectiveDate", "effectiveDate", parse_date),
+    Field("expirationDate", "expirationDate", parse_date),
+)
+
+
+# -----------------------
+# Reporte de anomalías
+# -----------------------
+
+class ValidationReport:
+    """Acumula las anomalías encontradas durante la ingesta."""
+
+    def __init__(self):
+        self.anomalies = []
+        self.records_checked = Counter()
+
+    def add(self, source, record_id, field, value, reason):
+        self.anomalies.append({
+            "source": source,
+            "record_id": record_id,
+            "field": field,
+            "value": value,
+            "reason": reason,
+        })
+
+    def counts(self):
+        """Cantidad de anomalías por (source, field)."""
+        return Counter((a["source"], a["field"]) for a in self.anomalies)
+
+    def print_summary(self):
+        total = sum(self.records_checked.values())
+        if not self.anomalies:
+            print(f"✅ Validación: {total:,} registros sin anomalías")
+            return
+
+        print(f"⚠️ Validación: {len(self.anomalies):,} anomalías en {total:,} registros")
+        for (source, field), count in sorted(self.counts().items()):
+            print(f"   - {source}.{field}: {count:,}")
+
+
+def ingest_records(records, schema, source, report):
+    """
+    Convierte una lista de registros crudos a valores tipados según `schema`.
+
+    Los registros se modifican in-place (vienen recién descargados y nadie
+    más los usa en crudo), así no se duplica la memoria.
+
+    Args:
+        records: Lista de diccionarios crudos de la API
+        schema: Tupla de Field (ver *_SCHEMA)
+        source: Nombre del endpoint/origen (para el reporte)
+        report: ValidationReport donde se acumulan las anomalías
+
+    Returns:
+        La misma lista, con los campos del schema ya convertidos
+    """
+    for record in records:
+        for field in schema:
+            raw = record.get(field.source)
+            try:
+                value = field.parser(raw)
+            except UnknownValue as e:
+                value = e.default
+                report.add(source, record.get("databaseId"), field.source, raw, str(e))
+            except (ValueError, TypeError) as e:
+                value = None
+                report.add(source, record.get("databaseId"), field.source, raw, str(e))
+            record[field.target] = value
+
+    report.records_checked[source] += len(records)
+    return records
+
+
+def ingest_endorsements(records, report):
+    return ingest_records(records, ENDORSEMENT_SCHEMA, "PolicyEndorsementDetailList", report)
+
+
+def ingest_agency_commissions(records, report):
+    return ingest_records(records, AGENCY_COMMISSION_SCHEMA, "PolicyEndorsementAgencyCommissionDetailList", report)
+
+
+def ingest_agent_commissions(records, report):
+    return ingest_records(records, AGENT_COMMISSION_SCHEMA, "PolicyEndorsementAgentsCommissionDetailList", report)
+
+
+def ingest_policies(records, report):
+    return ingest_records(records, POLICY_SCHEMA, "PolicyList", report)
+
+
+def ingest_receivables(records, report):
+    return ingest_records(records, RECEIVABLE_SCHEMA, "Receivables", report)
@@ -18,22 +18,84 @@ load_dotenv(dotenv_path=ENV_PATH)
 # --------------------------------------------------
 NOWCERTS_API_BASE_URL = "https://api.nowcerts.com/api"
 
+# Endpoint de receivables (facturas de pólizas); configurable por si la
+# cuenta de NowCerts lo expone con otro nombre
+NOWCERTS_RECEIVABLES_ENDPOINT = os.getenv(
+    "NOWCERTS_RECEIVABLES_ENDPOINT", "/PolicyInvoiceDetailList"
+)
+# El reporte de receivables es opcional ("1" o --receivables): el endpoint
+# default no está confirmado en todas las cuentas y, si no existe, cada
+# corrida gastaría requests y reintentos en él
+INCLUDE_RECEIVABLES = os.getenv("INCLUDE_RECEIVABLES", "0") == "1"
+
 # --------------------------------------------------
 # AUTH
 # --------------------------------------------------
+# Token default (1 sola agencia). En modo multi-agencia cada perfil trae su
+# propio token, así que no se exige acá: NowCertsClient valida que haya uno.
 NOWCERTS_ACCESS_TOKEN = os.getenv("NOWCERTS_ACCESS_TOKEN")
 
-if not NOWCERTS_ACCESS_TOKEN:
-    raise RuntimeError(
-        f"❌ Falta NOWCERTS_ACCESS_TOKEN en el .env ({ENV_PATH})"
-    )
-
 # --------------------------------------------------
 # REQUEST SETTINGS
 # --------------------------------------------------
 REQUEST_TIMEOUT = 60
 
+# Cliente asyncio (app.api.async_client): conexiones abiertas (keep-alive) por
+# cliente y páginas pedidas por adelantado mientras se procesa la actual
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS") or 8)
+ASYNC_PREFETCH_PAGES = int(os.getenv("ASYNC_PREFETCH_PAGES") or 3)
+
+# --------------------------------------------------
+# RATE LIMIT (100 req/min por token)
+# --------------------------------------------------
+# Compartido entre todos los procesos del host que usan el mismo token
+# (cron + corridas manuales + scripts), vía un archivo de estado con lock.
+# "0" = cada cliente cuenta solo sus propios requests.
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "1") != "0"
+# Directorio de los archivos de estado (default: temp del sistema)
+RATE_LIMIT_STATE_DIR = os.getenv("RATE_LIMIT_STATE_DIR") or None
+
+# --------------------------------------------------
+# CACHE HTTP (respuestas de NowCerts en disco)
+# --------------------------------------------------
+# TTL en segundos; 0 = cache deshabilitado
+HTTP_CACHE_TTL_SECONDS = int(os.getenv("HTTP_CACHE_TTL_SECONDS") or 0)
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR") or os.path.join("data_raw", "http_cache")
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES") or 5000)
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB") or 512)
+
+# Directorio default de snapshots JSON de cada endpoint
+SNAPSHOT_DIR = "data_raw"
+
+# --------------------------------------------------
+# HISTORIAL VERSIONADO (reportes "as of" sin re-descargar)
+# --------------------------------------------------
+# Cada descarga completa guarda las versiones nuevas de cada registro
+# (databaseId + changeDate) en <snapshot_dir>/history.sqlite. "0" = no guardar.
+HISTORY_STORE = os.getenv("HISTORY_STORE", "1") != "0"
+
+# --------------------------------------------------
+# LEDGER DE COMISIONES (saldos por agente / MGA / mes sin recalcular)
+# --------------------------------------------------
+# Cada corrida actualiza <snapshot_dir>/commission_ledger.sqlite recalculando
+# solo los endorsements que cambiaron. "0" = no actualizar el ledger.
+COMMISSION_LEDGER = os.getenv("COMMISSION_LEDGER", "1") != "0"
+
+# --------------------------------------------------
+# CACHE DE ETAPAS (ingesta / mapas / reportes)
+# --------------------------------------------------
+# Reutiliza la salida de cada etapa si no cambiaron sus entradas, su código
+# ni sus parámetros. "0" = siempre recalcular todo.
+STAGE_CACHE = os.getenv("STAGE_CACHE", "1") != "0"
+
 # --------------------------------------------------
 # PAGINACIÓN DEFAULT
 # --------------------------------------------------
 DEFAULT_TOP = 500
+
+# --------------------------------------------------
+# MODO MEMORIA ACOTADA
+# --------------------------------------------------
+# Tope (MB) para las filas del reporte en memoria; al superarlo se ordenan
+# en runs a disco y el Excel se escribe en streaming. Vacío = todo en memoria.
+REPORT_MEMORY_LIMIT_MB = float(os.getenv("REPORT_MEMORY_LIMIT_MB") or 0) or None
@@ -8,40 +8,178 @@ VERSIÓN CON FILTRO DE FECHAS:
 - Solo endorsements con comisiones > 0
 """
 
+import argparse
+import json
+import multiprocessing
 import os
-from datetime import datetime
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from app.api.client import NowCertsClient
-from app.services.endorsement_report_service import generate_unified_endorsements
-from app.exports.excel_reporter import export_endorsements_to_excel
+from app.api.history_store import HistoryClient, history_path
+from app.api.request_planner import plan_requests, print_plan
+from config.settings import (
+    COMMISSION_LEDGER,
+    INCLUDE_RECEIVABLES,
+    NOWCERTS_RECEIVABLES_ENDPOINT,
+    REPORT_MEMORY_LIMIT_MB,
+    SNAPSHOT_DIR,
+    STAGE_CACHE,
+)
+from app.services.commission_ledger import CommissionLedger, ledger_path
+from app.services.commission_scenarios import load_scenarios
+from app.services.report_orchestrator import (
+    DATASETS,
+    commission_report_spec,
+    ledger_report_spec,
+    needed_datasets,
+    receivables_report_spec,
+    run_reports,
+    scenarios_report_spec,
+)
+from app.services.stage_profiler import StageProfiler
+from app.services.summary_report_service import build_commission_summaries
+from app.services.validators import ValidationReport
+from app.services.delta_report_service import (
+    compute_report_delta,
+    fingerprints_path,
+    load_fingerprints,
+    save_fingerprints,
+)
+from app.exports.excel_reporter import (
+    export_delta_to_excel,
+    export_endorsements_to_excel,
+    export_receivables_to_excel,
+    export_scenarios_to_excel,
+)
 
 
-def main(date_from="2025-12-01"):
+def main(
+    date_from="2025-12-01",
+    include_receivables=INCLUDE_RECEIVABLES,
+    memory_limit_mb=REPORT_MEMORY_LIMIT_MB,
+    scenarios=None,
+    dry_run=False,
+    client=None,
+    output_dir="output",
+    snapshot_dir=SNAPSHOT_DIR,
+    profile=False,
+    as_of=None,
+    deadline_minutes=None,
+    access_token=None,
+):
     """
     Genera el reporte de comisiones con filtro de fecha.
     
     Args:
         date_from: Fecha inicial en formato "YYYY-MM-DD" (default: 2025-12-01)
+        include_receivables: Generar también el reporte de receivables,
+            reutilizando las pólizas ya descargadas (default:
+            INCLUDE_RECEIVABLES del .env)
+        memory_limit_mb: Tope de memoria (MB) para las filas del reporte; si se
+            indica, ordena con runs a disco y exporta en streaming
+            (default: REPORT_MEMORY_LIMIT_MB del .env)
+        scenarios: Lista de escenarios what-if a comparar contra el baseline
+            (ver app.services.commission_scenarios)
+        dry_run: Solo contar registros e imprimir el plan de descarga
+            (páginas, requests y tiempo estimado), sin descargar nada
+        client: Cliente de NowCerts ya creado (default: uno nuevo con
+            `access_token`)
+        output_dir: Directorio de los Excel generados
+        snapshot_dir: Directorio de snapshots y huellas del delta
+        profile: Perfilar cada etapa (CPU + memoria) y guardar los perfiles y
+            un ranking de funciones en output_dir/profile_<fecha-hora>/
+        as_of: Reconstruir los reportes con los datos del último sync hasta
+            esa fecha ("YYYY-MM-DD" o "YYYY-MM-DDTHH:MM"), desde el historial
+            local de snapshot_dir, sin requests a la API. No calcula delta.
+        deadline_minutes: Hora límite de la descarga, en minutos desde el
+            arranque. Al llegar se corta (quedan afuera las páginas más
+            viejas), se completa con los snapshots anteriores y el reporte
+            marca qué endpoints quedaron incompletos (hoja "Data Status").
+        access_token: Token de la agencia para el cliente que se crea acá
+            (default: NOWCERTS_ACCESS_TOKEN del .env)
     """
     print("=" * 80)
     print("GENERADOR DE REPORTE DE COMISIONES - CON FILTRO DE FECHAS")
     print("=" * 80)
     print()
-    print(f"📅 Período: desde {date_from} hasta {datetime.now().strftime('%Y-%m-%d')}")
+    if as_of:
+        print(f"📅 Período: desde {date_from}, con los datos al {as_of} (historial local)")
+    else:
+        print(f"📅 Período: desde {date_from} hasta {datetime.now().strftime('%Y-%m-%d')}")
     print()
     print("📋 Características:")
     print("   - 1 fila por agente de cada endorsement")
     print("   - Solo endorsements con comisiones")
     print("   - Lista completa de agentes de la póliza")
+    if memory_limit_mb:
+        print(f"   - Modo memoria acotada: {memory_limit_mb} MB")
     print()
     
-    # 1️⃣ Inicializar cliente
-    print("🔹 Inicializando cliente NowCerts...")
-    client = NowCertsClient()
-    print()
+    # 1️⃣ Inicializar cliente (as of: lee del historial, sin API)
+    if as_of:
+        client = HistoryClient(history_path(snapshot_dir), as_of, snapshot_dir=snapshot_dir)
+    elif client is None:
+        print("🔹 Inicializando cliente NowCerts...")
+        client = NowCertsClient(access_token=access_token, snapshot_dir=snapshot_dir)
+        print()
+
+    deadline_mode = bool(deadline_minutes) and not as_of
+    if deadline_mode:
+        client.deadline = time.time() + deadline_minutes * 60
+        print(f"⏰ Hora límite de descarga: {datetime.fromtimestamp(client.deadline).strftime('%H:%M:%S')} ({deadline_minutes} min)")
+        print()
+
+    profiler = StageProfiler(
+        output_dir=os.path.join(output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"),
+        enabled=profile,
+        clients=[client],
+    )
+
+    reports = [commission_report_spec(date_from, memory_limit_mb=memory_limit_mb)]
+    if include_receivables:
+        reports.append(receivables_report_spec(as_of=_as_of_date(as_of)))
+    if scenarios:
+        reports.append(scenarios_report_spec(scenarios, date_from))
+    # Ledger de comisiones: solo con los datos actuales (no en as of)
+    if COMMISSION_LEDGER and not as_of:
+        reports.append(ledger_report_spec(date_from, ledger_path(snapshot_dir), client=client))
+
+    # Plan de descarga: $count por endpoint -> páginas, requests y tiempo estimado
+    if not as_of:
+        with profiler.stage("plan"):
+            plans = plan_requests(client, [DATASETS[name].endpoint for name in needed_datasets(reports)])
+        print_plan(plans)
+        print()
+    if dry_run:
+        print("🧪 Dry run: no se descargó nada")
+        return
 
-    # 2️⃣ Generar reporte
+    # 2️⃣ Generar reportes (cada endpoint se descarga 1 sola vez)
     print("🔹 Generando reporte con detalle por agente...")
-    unified_endorsements = generate_unified_endorsements(client, date_from=date_from)
+    validation_report = ValidationReport()
+
+    results = run_reports(
+        client,
+        reports,
+        validation_report=validation_report,
+        profiler=profiler,
+        cache_dir=os.path.join(snapshot_dir, "stage_cache") if STAGE_CACHE else None,
+    )
+    if client.cache:
+        client.cache.print_stats()
+    data_status = list(client.fetch_status.values()) if deadline_mode else None
+    if data_status:
+        _print_data_status(data_status)
+    unified_endorsements = results["commissions"]
+    if unified_endorsements is None:
+        print("❌ No se pudo generar el reporte de comisiones")
+        client.flush_snapshots()
+        return
     
     # Contar endorsements únicos
     unique_endorsements = len(set(e.get('endorsement_id') for e in unified_endorsements))
@@ -52,20 +190,87 @@ def main(date_from="2025-12-01"):
     print(f"   Promedio de filas por endorsement: {len(unified_endorsements)/unique_endorsements:.1f}")
     print()
 
-    # 3️⃣ Definir ruta de salida
-    output_dir = "output"
+    # 3️⃣ Totales precalculados (Agent, MGA, mes, tipo)
+    print("🔹 Calculando resúmenes por Agent / MGA / mes / tipo...")
+    with profiler.stage("summaries"):
+        summaries = build_commission_summaries(unified_endorsements)
+    print()
+
+    # 4️⃣ Definir ruta de salida
     os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, f"endorsements_commission_report_{date_from.replace('-', '')}_to_today.xlsx")
+    period = f"as_of_{_as_of_date(as_of).strftime('%Y%m%d')}" if as_of else "to_today"
+    output_file = os.path.join(output_dir, f"endorsements_commission_report_{date_from.replace('-', '')}_{period}.xlsx")
 
-    # 4️⃣ Exportar a Excel
+    # 5️⃣ Exportar a Excel
     print(f"🔹 Exportando a Excel...")
-    export_endorsements_to_excel(unified_endorsements, filename=output_file)
+    with profiler.stage("export:commissions"):
+        export_endorsements_to_excel(
+            unified_endorsements,
+            filename=output_file,
+            summaries=summaries,
+            anomalies=validation_report.anomalies,
+            write_only=bool(memory_limit_mb),
+            data_status=data_status,
+        )
+    print()
+
+    # 6️⃣ Delta contra la corrida anterior (solo hashes, sin abrir el Excel previo)
+    delta_file = None
+    if as_of:
+        print("ℹ️ Reporte as of: se omite el delta (las huellas son de la última corrida)")
+    else:
+        delta_file, delta_rows = _report_delta(unified_endorsements, date_from, output_dir, snapshot_dir, profiler)
+
+    # Runs temporales del modo memoria acotada
+    if hasattr(unified_endorsements, "close"):
+        unified_endorsements.close()
+
+    # 7️⃣ Reporte de receivables (mismo dataset de pólizas)
+    receivables_file = None
+    if results.get("receivables") == []:
+        print()
+        print(
+            f"ℹ️ Receivables: sin saldos pendientes (o {NOWCERTS_RECEIVABLES_ENDPOINT} no devolvió datos); "
+            "no se genera el Excel"
+        )
+    elif results.get("receivables") is not None:
+        print()
+        stamp = _as_of_date(as_of).strftime('%Y%m%d') if as_of else datetime.now().strftime('%Y%m%d')
+        receivables_file = os.path.join(output_dir, f"receivables_report_{stamp}.xlsx")
+        with profiler.stage("export:receivables"):
+            export_receivables_to_excel(results["receivables"], filename=receivables_file)
+
+    # 8️⃣ Comparación de escenarios what-if
+    scenarios_file = None
+    if results.get("scenarios") is not None:
+        print()
+        comparison, by_agent = results["scenarios"]
+        scenarios_file = os.path.join(output_dir, f"commission_scenarios_{date_from.replace('-', '')}_{period}.xlsx")
+        with profiler.stage("export:scenarios"):
+            export_scenarios_to_excel(comparison, by_agent, filename=scenarios_file)
+
+    # Snapshots de los endpoints (se escriben en segundo plano durante la corrida)
+    client.flush_snapshots()
+
+    # Profiling: perfiles por etapa + ranking de funciones (solo con --profile)
+    profile_file = profiler.write()
     
     print()
     print("=" * 80)
     print("🎉 REPORTE GENERADO CORRECTAMENTE")
     print("=" * 80)
     print(f"📄 Archivo: {output_file}")
+    if delta_file:
+        print(f"📄 Delta: {delta_file} ({len(delta_rows):,} cambios)")
+    if receivables_file:
+        print(f"📄 Receivables: {receivables_file}")
+    if scenarios_file:
+        print(f"📄 Escenarios: {scenarios_file}")
+    if profile_file:
+        print(f"📄 Profiling: {profile_file}")
+    stale = [s.endpoint for s in data_status or () if not s.complete]
+    if stale:
+        print(f"⚠️ Datos INCOMPLETOS (hora límite) en: {', '.join(stale)} (ver hoja 'Data Status')")
     print()
     print("📊 Estructura:")
     print("   ✅ Solo endorsements desde", date_from)
@@ -73,16 +278,373 @@ def main(date_from="2025-12-01"):
     print("   ✅ Agents: lista completa de la póliza")
     print("   ✅ Agency Commission: repetida por agente")
     print("   ✅ Agent Commission: individual por agente")
+    print("   ✅ Hojas de resumen: By Agent / By MGA / By Month / By Endorsement Type")
+    print()
+
+
+def ledger_query(snapshot_dir=SNAPSHOT_DIR, agent=None, month=None, period=None):
+    """
+    Consulta el ledger de comisiones (sin API ni recálculo).
+
+    Args:
+        snapshot_dir: Directorio del ledger (en modo multi-agencia, el
+            snapshot_dir de la agencia; ver ledger_query_agencies)
+        agent: Saldo de este agente en `month`
+        month: Mes "YYYY-MM" (default: el mes actual, "month-to-date")
+        period: Totales por Agent / MGA de "YYYY-MM" o "YYYY-MM:YYYY-MM"
+    """
+    path = ledger_path(snapshot_dir)
+    if not os.path.exists(path):
+        print(f"❌ No hay ledger de comisiones en {path} (se crea al generar el reporte)")
+        return
+    ledger = CommissionLedger(path)
+
+    if agent:
+        month = month or date.today().strftime("%Y-%m")
+        totals = ledger.balance(agent, month=month)
+        print(f"📒 {agent} - {month}: {totals['endorsements']:,} endorsements")
+        print(f"   Agent Commission:  ${totals['agent_commission']:,.2f}")
+        print(f"   Agency Commission: ${totals['agency_commission']:,.2f}")
+        print(f"   Premium:           ${totals['premium']:,.2f}")
+
+    if period:
+        month_from, _, month_to = period.partition(":")
+        month_to = month_to or month_from
+        summaries = ledger.summaries(month_from, month_to)
+        for name in ("Agent", "MGA"):
+            print()
+            print(f"📒 By {name} ({month_from} a {month_to}):")
+            for t in summaries[name]:
+                print(
+                    f"   {t['group']}: {t['endorsements']:,} endorsements, "
+                    f"agency ${t['agency_commission']:,.2f}, agent ${t['agent_commission']:,.2f}, "
+                    f"total ${t['total_commission']:,.2f}"
+                )
+
+
+def ledger_query_agencies(profiles, agency=None, **query):
+    """
+    Consulta el ledger de cada agencia (o solo de `agency`), desde su
+    snapshot_dir.
+
+    Args:
+        profiles: Lista de AgencyProfile (ver load_agency_profiles)
+        agency: Nombre de la agencia (default: todas)
+        **query: agent / month / period de ledger_query
+    """
+    if agency:
+        profiles = [p for p in profiles if p.name == agency]
+        if not profiles:
+            print(f"❌ No hay una agencia '{agency}' en el archivo de agencias")
+            return
+
+    for p in profiles:
+        print(f"🏢 {p.name}")
+        ledger_query(p.snapshot_dir, **query)
+        print()
+
+
+def _print_data_status(data_status):
+    """Tabla con el estado de cada endpoint después de una descarga con hora límite."""
     print()
+    print("⏰ Estado de los datos:")
+    for s in data_status:
+        if s.complete:
+            print(f"   ✅ {s.endpoint}: completo ({s.fetched:,} registros)")
+        else:
+            print(
+                f"   ⚠️ {s.endpoint}: INCOMPLETO - {s.fetched:,} de la API (hasta changeDate {s.oldest_change or '-'}) "
+                f"+ {s.from_snapshot:,} del snapshot anterior"
+            )
+    print()
+
+
+def _report_delta(unified_endorsements, date_from, output_dir, snapshot_dir, profiler):
+    """Delta contra las huellas de la corrida anterior; guarda las huellas nuevas."""
+    print("🔹 Calculando cambios desde la corrida anterior...")
+    fp_path = fingerprints_path(date_from, base_dir=snapshot_dir)
+    with profiler.stage("delta"):
+        previous_fingerprints = load_fingerprints(fp_path)
+        delta_rows, current_fingerprints = compute_report_delta(unified_endorsements, previous_fingerprints)
+
+        delta_file = None
+        if previous_fingerprints:
+            delta_file = os.path.join(output_dir, f"endorsements_commission_delta_{date_from.replace('-', '')}_to_today.xlsx")
+            export_delta_to_excel(delta_rows, filename=delta_file)
+        else:
+            print("ℹ️ No hay corrida anterior: se omite el delta en esta ejecución")
+
+        save_fingerprints(current_fingerprints, fp_path)
+
+    return delta_file, delta_rows
+
+
+def _as_of_date(as_of):
+    """Fecha (date) de un as_of "YYYY-MM-DD[THH:MM]" / date / datetime (None si no hay)."""
+    if not as_of:
+        return None
+    if isinstance(as_of, datetime):
+        return as_of.date()
+    if isinstance(as_of, date):
+        return as_of
+    return datetime.strptime(str(as_of)[:10], "%Y-%m-%d").date()
+
+
+# -----------------------
+# Modo multi-agencia
+# -----------------------
+
+# name: nombre de la agencia, token: Access Token de NowCerts,
+# output_dir / snapshot_dir: directorios propios, date_from: "YYYY-MM-DD"
+AgencyProfile = namedtuple("AgencyProfile", ["name", "token", "output_dir", "snapshot_dir", "date_from"])
+
+
+def load_agency_profiles(path, default_date_from, require_token=True):
+    """
+    Carga los perfiles de agencias desde un JSON.
+
+    Formato (el token puede ir directo o, mejor, en una variable de entorno):
+
+        [
+            {"name": "Agencia Norte", "token_env": "NOWCERTS_TOKEN_NORTE", "date_from": "2025-11-01"},
+            {"name": "Agencia Sur", "token": "...", "output_dir": "output/sur"}
+        ]
+
+    Por defecto cada agencia escribe en output/<agencia> y data_raw/<agencia>.
+    Con require_token=False no se exige el token (consultas al ledger, sin API).
+
+    Returns:
+        list[AgencyProfile]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw_profiles = json.load(f)
+
+    profiles = []
+    for raw in raw_profiles:
+        name = raw["name"]
+        token = raw.get("token") or os.getenv(raw.get("token_env") or "")
+        if not token and require_token:
+            raise ValueError(f"❌ La agencia '{name}' no tiene token (token / token_env)")
+
+        slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+        profiles.append(AgencyProfile(
+            name=name,
+            token=token,
+            output_dir=raw.get("output_dir") or os.path.join("output", slug),
+            snapshot_dir=raw.get("snapshot_dir") or os.path.join(SNAPSHOT_DIR, slug),
+            date_from=raw.get("date_from") or default_date_from,
+        ))
+
+    return profiles
+
+
+def run_agencies(profiles, **main_kwargs):
+    """
+    Corre el pipeline completo de cada agencia en paralelo.
+
+    Cada agencia corre en su propio proceso, con sus propios directorios y
+    su propio cliente (token, rate limiter y cuota), que arma main() igual
+    que con una sola agencia: las opciones de main_kwargs aplican a todas.
+    Así el tiempo total se acerca al de la agencia más lenta en vez de la
+    suma de todas. Cada línea que imprime una agencia lleva su nombre
+    adelante, para que la salida de varias agencias no se mezcle.
+
+    Returns:
+        dict: {agencia: segundos} (None si la agencia falló)
+    """
+    print(f"🏢 Modo multi-agencia: {len(profiles)} agencias en paralelo")
+
+    # spawn: cada agencia arranca un intérprete limpio (sin threads heredados)
+    # y cProfile / tracemalloc de --profile quedan separados por agencia
+    elapsed = {}
+    with ProcessPoolExecutor(
+        max_workers=len(profiles) or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = {
+            profile.name: executor.submit(_run_agency, profile, main_kwargs)
+            for profile in profiles
+        }
+        for name, future in futures.items():
+            try:
+                elapsed[name] = future.result()
+            except Exception as e:
+                print(f"❌ Error en la agencia '{name}': {e}")
+                elapsed[name] = None
+
+    print()
+    print("🏢 Resumen multi-agencia:")
+    for name, seconds in elapsed.items():
+        status = f"{seconds:.0f}s" if seconds is not None else "falló"
+        print(f"   {name}: {status}")
+
+    return elapsed
+
+
+def _run_agency(profile, main_kwargs):
+    """Corre main() de una agencia (en su proceso) con su nombre en cada línea impresa."""
+    sys.stdout = _PrefixedStdout(sys.stdout, f"[{profile.name}] ")
+    start = time.time()
+    main(
+        date_from=profile.date_from,
+        access_token=profile.token,
+        output_dir=profile.output_dir,
+        snapshot_dir=profile.snapshot_dir,
+        **main_kwargs,
+    )
+    return time.time() - start
+
+
+class _PrefixedStdout:
+    """Envuelve stdout: antepone `prefix` a cada línea y escribe solo líneas completas."""
+
+    def __init__(self, stream, prefix):
+        self.stream = stream
+        self.prefix = prefix
+        self._pending = ""
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            *lines, self._pending = (self._pending + text).split("\n")
+            if lines:
+                self.stream.write("".join(f"{self.prefix}{line}\n" for line in lines))
+                self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera el reporte de comisiones de NowCerts.")
+    parser.add_argument(
+        "--date-from",
+        default="2025-12-01",
+        help="Fecha inicial YYYY-MM-DD (default: 2025-12-01)",
+    )
+    parser.add_argument(
+        "--scenarios",
+        metavar="JSON",
+        help="Archivo JSON con una lista de escenarios what-if a comparar",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Solo imprime el plan de descarga (registros, páginas, requests y tiempo estimado)",
+    )
+    parser.add_argument(
+        "--agencies",
+        metavar="JSON",
+        help="Archivo JSON con perfiles de agencias (token, directorios, fecha) a correr en paralelo",
+    )
+    parser.add_argument(
+        "--receivables",
+        action="store_true",
+        default=INCLUDE_RECEIVABLES,
+        help="Genera también el reporte de receivables (default: INCLUDE_RECEIVABLES del .env)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila cada etapa (CPU, memoria, espera por rate limit) y guarda el resultado junto al reporte",
+    )
+    parser.add_argument(
+        "--as-of",
+        metavar="FECHA",
+        help="Reconstruye el reporte con los datos al YYYY-MM-DD[THH:MM] desde el historial local (sin API)",
+    )
+    parser.add_argument(
+        "--deadline",
+        metavar="MINUTOS",
+        type=float,
+        help="Corta la descarga a los N minutos y completa con los snapshots anteriores (marca los endpoints incompletos)",
+    )
+    parser.add_argument(
+        "--balance",
+        metavar="AGENTE",
+        help="Saldo del agente en el mes (--month, default: el actual) desde el ledger, sin API",
+    )
+    parser.add_argument(
+        "--month",
+        metavar="YYYY-MM",
+        help="Mes de --balance (default: el mes actual)",
+    )
+    parser.add_argument(
+        "--period",
+        metavar="YYYY-MM[:YYYY-MM]",
+        help="Totales por Agent / MGA de ese mes o rango de meses desde el ledger, sin API",
+    )
+    parser.add_argument(
+        "--agency",
+        metavar="NOMBRE",
+        help="Con --agencies y --balance / --period: consulta solo el ledger de esa agencia (default: todas)",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default=SNAPSHOT_DIR,
+        help=f"Directorio del ledger para --balance / --period (default: {SNAPSHOT_DIR})",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
     # 🔥 CONFIGURACIÓN DE FECHA 🔥
-    
-    # Opción 1: Desde 12/01/2025 (default)
-    main(date_from="2025-12-01")
-    
-    # Opción 2: Cambiar la fecha de inicio
-    # main(date_from="2025-11-01")  # Desde noviembre
-    # main(date_from="2026-01-01")  # Desde enero 2026
-    # main(date_from="2026-02-01")  # Desde febrero 2026
\ No newline at end of file
+    #
+    # Por defecto desde 12/01/2025. Para cambiar la fecha de inicio:
+    #   python run_report.py --date-from 2025-11-01  # Desde noviembre
+    #   python run_report.py --date-from 2026-01-01  # Desde enero 2026
+    #
+    # Escenarios what-if (ver app/services/commission_scenarios.py):
+    #   python run_report.py --scenarios scenarios.json
+    #
+    # Ver cuánto va a tardar la descarga sin descargar nada:
+    #   python run_report.py --dry-run
+    #
+    # Reporte de receivables (opcional; endpoint en NOWCERTS_RECEIVABLES_ENDPOINT):
+    #   python run_report.py --receivables
+    #
+    # Varias agencias en paralelo (cada una con su token):
+    #   python run_report.py --agencies agencies.json
+    #
+    # Ver en qué se va el tiempo (rate limit vs cómputo, por etapa):
+    #   python run_report.py --profile
+    #
+    # El reporte tal como era el 5 de enero (historial local, sin API):
+    #   python run_report.py --date-from 2025-12-01 --as-of 2026-01-05
+    #
+    # Con hora límite (ej. el reporte de la mañana): a los 20 minutos corta la
+    # descarga y usa los snapshots anteriores para lo que faltó:
+    #   python run_report.py --deadline 20
+    #
+    # Saldos desde el ledger de comisiones (sin API, ver app/services/commission_ledger.py):
+    #   python run_report.py --balance "Juan Pérez"              # mes en curso
+    #   python run_report.py --balance "Juan Pérez" --month 2026-01
+    #   python run_report.py --period 2026-01:2026-03
+    #   python run_report.py --agencies agencies.json --agency "Agencia Norte" --period 2026-01
+    args = parse_args()
+
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else None
+
+    if (args.balance or args.period) and args.agencies:
+        profiles = load_agency_profiles(args.agencies, default_date_from=args.date_from, require_token=False)
+        ledger_query_agencies(profiles, agency=args.agency, agent=args.balance, month=args.month, period=args.period)
+    elif args.balance or args.period:
+        ledger_query(args.snapshot_dir, agent=args.balance, month=args.month, period=args.period)
+    elif args.agencies:
+        profiles = load_agency_profiles(args.agencies, default_date_from=args.date_from)
+        run_agencies(profiles, scenarios=scenarios, dry_run=args.dry_run, profile=args.profile, as_of=args.as_of,
+                     deadline_minutes=args.deadline, include_receivables=args.receivables)
+    else:
+        main(
+            date_from=args.date_from,
+            scenarios=scenarios,
+            dry_run=args.dry_run,
+            profile=args.profile,
+            as_of=args.as_of,
+            deadline_minutes=args.deadline,
+            include_receivables=args.receivables,
+        )
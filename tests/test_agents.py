@@ -0,0 +1,66 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from app.api.agents import AgentDirectory, get_agent_directory, intern_agent_names
+from app.api.policies import build_policies_map
+
+
+class FakeAgentListClient:
+    def __init__(self, agents):
+        self.agents = agents
+        self.requests = []
+
+    def get(self, endpoint, params=None, use_cache=True):
+        self.requests.append(params["$skip"])
+        ordered = sorted(self.agents, key=lambda a: a["changeDate"], reverse=True)
+        return {"value": ordered[params["$skip"]:params["$skip"] + params["$top"]]}
+
+
+def agent(agent_id, first, last, change_date):
+    return {"id": agent_id, "firstName": first, "lastName": last, "changeDate": change_date}
+
+
+class TestAgentDirectory(unittest.TestCase):
+    def test_incremental_refresh_stops_at_unchanged_agents(self):
+        agents = [agent(f"A{i}", "Agent", str(i), f"2025-01-{i + 1:02d}T00:00:00") for i in range(10)]
+        client = FakeAgentListClient(agents)
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            directory = get_agent_directory(client, snapshot_dir=tmp)
+            directory.refresh(client, top=3)
+            self.assertEqual(len(directory), 10)
+
+            # Cambia 1 agente: la próxima corrida pide solo la primera página
+            agents[2] = agent("A2", "Juan", "Pérez ", "2025-02-01T00:00:00")
+            client.requests.clear()
+            directory = get_agent_directory(client, snapshot_dir=tmp)
+
+            self.assertEqual(client.requests, [0])
+            self.assertEqual(directory.names["A2"], "Juan Pérez")
+            self.assertEqual(AgentDirectory(os.path.join(tmp, "agent_directory.json")).names["A2"], "Juan Pérez")
+
+    def test_policies_and_commissions_join_by_id(self):
+        directory = AgentDirectory()
+        directory.names = {"A1": "Juan Pérez"}
+
+        policies_map = build_policies_map([{
+            "databaseId": "P1",
+            "agents": [{"id": "A1", "firstName": "J.", "lastName": "Perez"}, {"firstName": "Maria", "lastName": "B"}],
+            "csRs": [],
+        }], agent_directory=directory)
+        self.assertEqual(policies_map["P1"]["agent_list"], ("Juan Pérez", "Maria B"))
+        self.assertEqual(policies_map["P1"]["agents"], "Juan Pérez, Maria B")
+
+        comms = intern_agent_names([
+            {"agentDatabaseId": "A1", "agentName": "Juan Perez"},
+            {"agentDatabaseId": "X9", "agentName": " Maria B "},
+        ], directory)
+        self.assertEqual([a["agentName"] for a in comms], ["Juan Pérez", "Maria B"])
+        # Mismo objeto string que el mapa de pólizas (internado)
+        self.assertIs(comms[0]["agentName"], policies_map["P1"]["agent_list"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import contextlib
+import io
+import tempfile
+import time
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.api.async_client import AsyncNowCertsClient
+from app.api.rate_limiter import RateLimiter
+
+
+RECORDS = [{"databaseId": f"P{i}", "changeDate": f"2026-01-{i % 28 + 1:02d}"} for i in range(23)]
+
+
+class FakeNowCerts:
+    """API falsa: páginas OData de RECORDS, con latencia y un 429 al principio."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.throttled = False
+
+    async def handle(self, request):
+        if not self.throttled:
+            self.throttled = True
+            return web.Response(status=429, headers={"Retry-After": "0"})
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            skip = int(request.query.get("$skip", 0))
+            top = int(request.query.get("$top", 1))
+            self.requests.append(skip)
+            if request.query.get("$count"):
+                return web.json_response({"@odata.count": len(RECORDS), "value": RECORDS[:1]})
+            return web.json_response({"value": RECORDS[skip:skip + top]})
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.api = FakeNowCerts()
+        app = web.Application()
+        app.router.add_get("/PolicyList", self.api.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stdout = contextlib.redirect_stdout(io.StringIO())
+        self.stdout.__enter__()
+        self.client = AsyncNowCertsClient(
+            access_token="test-token",
+            snapshot_dir=self.tmp.name,
+            rate_limiter=RateLimiter(max_requests=1000),
+            max_connections=2,
+        )
+        self.client.cache = None
+        self.client.BASE_URL = str(self.server.make_url(""))
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+        self.stdout.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    async def test_pages_in_order_with_bounded_prefetch(self):
+        items = await self.client.get_all_paginated("/PolicyList", top=5, prefetch=4)
+
+        self.assertEqual(items, RECORDS)
+        # Varias páginas en vuelo a la vez, pero nunca más que el pool de conexiones
+        self.assertEqual(self.api.max_in_flight, 2)
+        # 429 inicial reintentado con backoff cooperativo
+        self.assertTrue(self.api.throttled)
+
+    async def test_planned_count_requests_exact_pages(self):
+        self.client.planned_counts["/PolicyList"] = await self.client.count("/PolicyList")
+        self.api.requests.clear()
+
+        pages = [len(page) async for page in self.client.iter_pages("/PolicyList", top=5)]
+
+        self.assertEqual(pages, [5, 5, 5, 5, 3])
+        self.assertEqual(sorted(self.api.requests), [0, 5, 10, 15, 20])
+
+    async def test_records_added_after_count_are_not_dropped(self):
+        # $count desactualizado: el plan dice 12, la API ya tiene 23
+        self.client.planned_counts["/PolicyList"] = 12
+
+        items = await self.client.get_all_paginated("/PolicyList", top=5)
+
+        self.assertEqual(items, RECORDS)
+        self.assertEqual(sorted(s for s in self.api.requests), [0, 5, 10, 15, 20])
+
+    async def test_concurrent_pulls_share_the_client(self):
+        first, second = await asyncio.gather(
+            self.client.get_all_paginated("/PolicyList", top=10),
+            self.client.get_all_paginated("/PolicyList", top=7, skip_start=7),
+        )
+        self.assertEqual(first, RECORDS)
+        self.assertEqual(second, RECORDS[7:])
+
+    async def test_deadline_cut_fills_from_previous_snapshot(self):
+        await self.client.get_all_paginated("/PolicyList", top=5)
+        await self.client.flush_snapshots()
+        self.assertTrue(self.client.fetch_status["/PolicyList"].complete)
+
+        # Hora límite ya vencida: no se pide ninguna página, todo sale del snapshot
+        self.api.requests.clear()
+        self.client.deadline = time.time() - 1
+        items = await self.client.get_all_paginated("/PolicyList", top=5)
+
+        self.assertEqual(self.api.requests, [])
+        self.assertEqual([r["databaseId"] for r in items], [r["databaseId"] for r in RECORDS])
+        status = self.client.fetch_status["/PolicyList"]
+        self.assertEqual((status.complete, status.fetched, status.from_snapshot), (False, 0, len(RECORDS)))
+
+
+if __name__ == "__main__":
+    unittest.main()
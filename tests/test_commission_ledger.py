@@ -0,0 +1,140 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.api.client import FetchStatus
+from app.services import commission_ledger
+from app.services.commission_ledger import CommissionLedger
+from app.services.endorsement_dataset import EndorsementDataset
+from app.services.endorsement_report_service import build_unified_endorsements_from_dataset
+from app.services.report_orchestrator import DATASETS, _sync_ledger
+from app.services.summary_report_service import build_commission_summaries
+from app.services.validators import PaymentType
+
+
+POLICIES_MAP = {
+    "P1": {"mga": "MGA A", "agent_list": ("Juan", "Maria")},
+    "P2": {"mga": "MGA B", "agent_list": ("Maria",)},
+}
+
+
+def endorsement(endorsement_id, policy_id, day, amount, endorsement_type="New"):
+    return {
+        "databaseId": endorsement_id, "policyId": policy_id, "endorsementTypeText": endorsement_type,
+        "date": day, "amount": amount,
+    }
+
+
+class TestCommissionLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = CommissionLedger(os.path.join(self.tmp.name, "commission_ledger.sqlite"))
+
+        self.endorsements = [
+            endorsement("E1", "P1", date(2026, 1, 5), 1000.0),
+            endorsement("E2", "P1", date(2026, 1, 20), 500.0, "Cancel"),
+            endorsement("E3", "P2", date(2026, 2, 3), 800.0),
+            endorsement("E4", "P2", date(2025, 11, 3), 300.0),
+        ]
+        self.agency = [
+            {"endorsementDatabaseId": e, "commissionValue": 10.0} for e in ("E1", "E2", "E3", "E4")
+        ]
+        self.agents = [
+            {"endorsementDatabaseId": "E1", "agentName": "Juan", "commissionValue": 50.0,
+             "paymentType": PaymentType.FROM_AGENCY_COMMISSION},
+            {"endorsementDatabaseId": "E1", "agentName": "Maria", "commissionValue": 2.0,
+             "paymentType": PaymentType.FROM_BASE_PREMIUM},
+            {"endorsementDatabaseId": "E2", "agentName": "Juan", "commissionValue": 50.0,
+             "paymentType": PaymentType.FROM_AGENCY_COMMISSION},
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sync(self, remove_missing=True):
+        dataset = EndorsementDataset(self.endorsements, self.agency, self.agents)
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = build_unified_endorsements_from_dataset(dataset, POLICIES_MAP, date_from="2025-12-01")
+            result = self.ledger.sync(dataset, POLICIES_MAP, date_from="2025-12-01", remove_missing=remove_missing)
+            return result, rows
+
+    def _assert_matches_report(self, rows):
+        expected = build_commission_summaries(rows)
+        actual = self.ledger.summaries()
+        for name in ("Agent", "MGA", "Month", "Endorsement Type"):
+            self.assertEqual([t["group"] for t in actual[name]], [t["group"] for t in expected[name]])
+            for a, e in zip(actual[name], expected[name]):
+                self.assertEqual(a["endorsements"], e["endorsements"])
+                for field in ("premium", "agency_commission", "agent_commission", "total_commission"):
+                    self.assertAlmostEqual(a[field], e[field])
+
+    def test_totals_match_report_summaries(self):
+        result, rows = self._sync()
+        self.assertEqual(tuple(result), (3, 3, 0))
+        self._assert_matches_report(rows)
+
+        # Juan en enero: 50 (E1) - 25 (cancelación E2)
+        self.assertAlmostEqual(self.ledger.balance("Juan", month="2026-01")["agent_commission"], 25.0)
+        self.assertEqual(self.ledger.balance("Nadie", month="2026-01")["endorsements"], 0)
+
+    def test_resync_recomputes_only_changed_endorsements(self):
+        self._sync()
+
+        # E1 cambia el % de Juan, E3 se borra
+        self.agents[0] = dict(self.agents[0], commissionValue=20.0)
+        self.endorsements = [e for e in self.endorsements if e["databaseId"] != "E3"]
+
+        with patch.object(
+            commission_ledger, "build_endorsement_rows", wraps=commission_ledger.build_endorsement_rows
+        ) as rows_spy:
+            result, rows = self._sync()
+
+        self.assertEqual(tuple(result), (2, 1, 1))
+        self.assertEqual([c.args[0]["databaseId"] for c in rows_spy.call_args_list], ["E1"])
+        self._assert_matches_report(rows)
+        self.assertAlmostEqual(self.ledger.balance("Juan", month="2026-01")["agent_commission"], -5.0)
+        self.assertEqual(self.ledger.summaries("2026-02", "2026-02")["MGA"], [])
+
+    def test_incomplete_pull_does_not_remove_missing_endorsements(self):
+        self._sync()
+
+        # Descarga cortada (hora límite / max_pages): E3 no vino, pero no se borró
+        self.endorsements = [e for e in self.endorsements if e["databaseId"] != "E3"]
+        result, _ = self._sync(remove_missing=False)
+
+        self.assertEqual(tuple(result), (2, 0, 0))
+        self.assertEqual(self.ledger.summaries("2026-02", "2026-02")["MGA"][0]["premium"], 800.0)
+
+    def test_undated_endorsements_stay_in_the_ledger(self):
+        # Fecha inválida (None tras la ingesta) y sin createDate
+        self.endorsements.append(endorsement("E5", "P2", None, 200.0))
+        self.agency.append({"endorsementDatabaseId": "E5", "commissionValue": 10.0})
+        result, rows = self._sync()
+
+        self.assertEqual(tuple(result), (4, 4, 0))
+        self.assertIn("E5", [r["endorsement_id"] for r in rows])
+        self._assert_matches_report(rows)
+
+        # Re-sync sin cambios: E5 se reconoce como ya guardado
+        result, _ = self._sync()
+        self.assertEqual(tuple(result), (4, 0, 0))
+
+    def test_ledger_stage_reads_the_endorsements_fetch_status(self):
+        dataset = EndorsementDataset(self.endorsements, self.agency, self.agents)
+        path = os.path.join(self.tmp.name, "commission_ledger.sqlite")
+        endpoint = DATASETS["endorsements"].endpoint
+
+        with patch.object(CommissionLedger, "sync") as sync:
+            client = SimpleNamespace(fetch_status={endpoint: FetchStatus(endpoint, False, 10, 90, None)})
+            _sync_ledger(dataset, POLICIES_MAP, path, "2025-12-01", client)
+            _sync_ledger(dataset, POLICIES_MAP, path, "2025-12-01", None)
+
+        self.assertEqual([c.kwargs["remove_missing"] for c in sync.call_args_list], [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.services import commission_scenarios
+from app.services.commission_scenarios import load_scenarios, run_scenarios
+from app.services.endorsement_dataset import EndorsementDataset
+from app.services.validators import (
+    ValidationReport,
+    ingest_agency_commissions,
+    ingest_agent_commissions,
+    ingest_endorsements,
+)
+
+
+class TestCommissionScenarios(unittest.TestCase):
+    def setUp(self):
+        report = ValidationReport()
+        endorsements = ingest_endorsements([
+            {"databaseId": "E1", "policyId": "P1", "date": "2025-12-05", "amount": 20000, "endorsementTypeText": "New"},
+            {"databaseId": "E2", "policyId": "P2", "date": "2025-12-06", "amount": 5000,
+             "endorsementTypeText": "Policy Cancellation"},
+        ], report)
+        agency = ingest_agency_commissions([
+            {"endorsementDatabaseId": "E1", "commissionValue": 12},
+            {"endorsementDatabaseId": "E2", "commissionValue": 15},
+        ], report)
+        agents = ingest_agent_commissions([
+            {"endorsementDatabaseId": "E1", "agentName": "Maria", "commissionValue": 25,
+             "policyCommissionAgentPaymentTypeText": "From Agency Commission"},
+            {"endorsementDatabaseId": "E2", "agentName": "Juan", "commissionValue": 10,
+             "policyCommissionAgentPaymentTypeText": "From Base Premium"},
+            # Sin agente: el reporte no la incluye, los escenarios tampoco
+            {"endorsementDatabaseId": "E1", "agentName": " ", "commissionValue": 5,
+             "policyCommissionAgentPaymentTypeText": "From Base Premium"},
+        ], report)
+        self.dataset = EndorsementDataset(endorsements, agency, agents)
+        self.policies_map = {"P1": {"mga": "MGA A"}, "P2": {"mga": "MGA B"}}
+
+    def test_baseline_and_overrides(self):
+        comparison, by_agent = run_scenarios(
+            self.dataset,
+            self.policies_map,
+            [
+                {"name": "MGA A 10%", "agency_percent_by_mga": {"MGA A": 10}},
+                {"name": "Maria base", "payment_type": {"Maria": "From Base Premium"}},
+            ],
+            date_from="2025-12-01",
+            max_workers=1,
+        )
+        baseline, mga_a, maria_base = comparison
+
+        # Baseline: 2400 - 750 de agencia, 600 - 500 de agentes (cancel en negativo)
+        self.assertAlmostEqual(baseline["agency_commission"], 1650.0)
+        self.assertAlmostEqual(baseline["agent_commission"], 100.0)
+        self.assertAlmostEqual(mga_a["agency_delta"], -400.0)
+        self.assertAlmostEqual(mga_a["agent_delta"], -100.0)
+        self.assertAlmostEqual(maria_base["agent_delta"], 4400.0)
+        self.assertEqual(by_agent[0], {"agent": "Juan", "Baseline (actual)": -500.0, "MGA A 10%": -500.0,
+                                       "Maria base": -500.0})
+
+        self.assertEqual([row["agent"] for row in by_agent], ["Juan", "Maria"])
+
+    def test_worker_processes_are_spawned(self):
+        # Se llama desde threads del pipeline: nada de fork
+        with patch.object(commission_scenarios, "ProcessPoolExecutor") as pool:
+            pool.return_value.__enter__.return_value.map.side_effect = lambda f, items: [
+                commission_scenarios.evaluate_scenario(pool.call_args.kwargs["initargs"][0], s) for s in items
+            ]
+            run_scenarios(self.dataset, self.policies_map, [{"name": "A"}], max_workers=2)
+
+        self.assertEqual(pool.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+
+
+class TestLoadScenarios(unittest.TestCase):
+    def _load(self, scenarios):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scenarios.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(scenarios, f)
+            return load_scenarios(path)
+
+    def test_valid_names(self):
+        scenarios = [{"name": "A", "agency_percent": 10}, {"name": "B"}]
+        self.assertEqual(self._load(scenarios), scenarios)
+
+    def test_names_must_be_unique_and_not_reserved(self):
+        for scenarios in (
+            [{"name": "A"}, {"name": "A", "agency_percent": 10}],
+            [{"name": "agent"}],
+            [{"name": "Baseline (actual)"}],
+            [{"agency_percent": 10}],
+        ):
+            with self.assertRaises(ValueError):
+                self._load(scenarios)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from app.api.client import NowCertsClient
+from app.api.rate_limiter import DeadlineExceeded, RateLimiter
+from app.api.snapshot_store import SnapshotWriter, snapshot_path
+
+
+def record(record_id, change_date, amount=0):
+    return {"databaseId": record_id, "changeDate": change_date, "amount": amount}
+
+
+class TestDeadlineRateLimiter(unittest.TestCase):
+    def test_acquire_raises_instead_of_waiting_past_deadline(self):
+        limiter = RateLimiter(max_requests=1, window_seconds=60)
+        limiter.acquire(deadline=time.time() + 5)
+        with self.assertRaises(DeadlineExceeded), contextlib.redirect_stdout(io.StringIO()):
+            limiter.acquire(deadline=time.time() + 5)
+        self.assertEqual(limiter.waited_seconds, 0.0)
+
+
+class TestDeadlineFetch(unittest.TestCase):
+    @patch("app.api.client.requests.Session")
+    def test_cut_at_deadline_fills_from_previous_snapshot(self, mock_session_class):
+        # API (changeDate desc): E7 es nuevo y E6 cambió desde el snapshot anterior
+        api = [record(f"E{i}", f"2026-01-{i:02d}", i) for i in range(7, 0, -1)]
+        api[1]["amount"] = 60
+        previous = [record(f"E{i}", f"2026-01-{i:02d}", i) for i in range(6, 0, -1)]
+
+        def page(url, params=None, **kwargs):
+            return MagicMock(status_code=200, headers={}, json=MagicMock(
+                return_value={"value": api[params["$skip"]:params["$skip"] + params["$top"]]}
+            ))
+
+        mock_session_class.return_value.get.side_effect = page
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            SnapshotWriter().submit(snapshot_path(tmp, "/Endorsements"), previous).result()
+
+            # 2 requests por minuto: la tercera página ya no llega antes de la hora límite
+            client = NowCertsClient(
+                access_token="test-token",
+                snapshot_dir=tmp,
+                rate_limiter=RateLimiter(max_requests=2, window_seconds=60),
+            )
+            client.cache = None
+            client.deadline = time.time() + 30
+
+            items = client.get_all_paginated("/Endorsements", top=2, sleep_seconds=0)
+            client.flush_snapshots()
+            history_syncs = client.history.syncs() if client.history is not None else []
+
+        self.assertEqual([(r["databaseId"], r["amount"]) for r in items], [
+            ("E7", 7), ("E6", 60), ("E5", 5), ("E4", 4), ("E3", 3), ("E2", 2), ("E1", 1),
+        ])
+        status = client.fetch_status["/Endorsements"]
+        self.assertFalse(status.complete)
+        self.assertEqual((status.fetched, status.from_snapshot, status.oldest_change), (4, 3, "2026-01-04"))
+        # Una descarga incompleta no entra al historial
+        self.assertEqual(history_syncs, [])
+
+    def test_remaining_time_split_by_planned_pages(self):
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            client = NowCertsClient(access_token="test-token", snapshot_dir=tmp)
+        client.planned_counts = {"/PolicyList": 1000, "/Endorsements": 3000}
+
+        self.assertIsNone(client._endpoint_deadline("/PolicyList", 500))
+
+        client.deadline = time.time() + 100
+        self.assertAlmostEqual(client._endpoint_deadline("/PolicyList", 500) - time.time(), 25, delta=1)
+        self.assertAlmostEqual(client._endpoint_deadline("/Other", 500), client.deadline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from app.services.delta_report_service import compute_report_delta
+
+
+def _row(endorsement_id, agent, agent_comm, agent_commission_id=None):
+    return {
+        "endorsement_id": endorsement_id,
+        "agent_commission_id": agent_commission_id,
+        "agent": agent,
+        "endorsement_type": "Endorsement",
+        "agency_commission": 100.0,
+        "agent_commission": agent_comm,
+    }
+
+
+class TestReportDelta(unittest.TestCase):
+    def test_new_changed_and_removed_rows(self):
+        _, previous = compute_report_delta(
+            [_row("E1", "Juan", 10.0), _row("E2", "Maria", 5.0), _row("E3", "Carlos", 1.0)],
+            {},
+        )
+
+        delta, _ = compute_report_delta(
+            [_row("E1", "Juan", 10.0), _row("E2", "Maria", 7.5), _row("E4", "Ana", 2.0)],
+            previous,
+        )
+        by_status = {d["status"]: d for d in delta}
+
+        self.assertEqual(len(delta), 3)
+        self.assertEqual(by_status["changed"]["endorsement_id"], "E2")
+        self.assertEqual(by_status["changed"]["previous_agent_commission"], 5.0)
+        self.assertEqual(by_status["changed"]["agent_commission"], 7.5)
+        self.assertEqual(by_status["new"]["endorsement_id"], "E4")
+        self.assertEqual(by_status["removed"]["agent"], "Carlos")
+        self.assertEqual(by_status["removed"]["previous_agent_commission"], 1.0)
+
+    def test_repeated_agent_rows_keyed_by_agent_commission(self):
+        _, previous = compute_report_delta(
+            [_row("E1", "Juan", 10.0, "AC1"), _row("E1", "Juan", 3.0, "AC2"), _row("E2", "Team #2", 4.0, "AC3")],
+            {},
+        )
+
+        # Mismas comisiones en otro orden: sin cambios; se borra la de "Team #2"
+        delta, _ = compute_report_delta([_row("E1", "Juan", 3.0, "AC2"), _row("E1", "Juan", 10.0, "AC1")], previous)
+
+        self.assertEqual([(d["status"], d["agent"]) for d in delta], [("removed", "Team #2")])
+
+    def test_rows_without_agent_commission_keyed_by_agent(self):
+        rows = [_row("E1", "Juan", 0.0), _row("E1", "Maria", 0.0)]
+
+        delta, fingerprints = compute_report_delta(rows, {})
+
+        self.assertEqual(set(fingerprints), {"E1|agent:Juan", "E1|agent:Maria"})
+        self.assertEqual(compute_report_delta(list(reversed(rows)), fingerprints)[0], [])
+
+if __name__ == "__main__":
+    unittest.main()
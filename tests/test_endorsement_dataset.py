@@ -0,0 +1,46 @@
+import unittest
+from datetime import date
+from app.services.endorsement_dataset import EndorsementDataset
+
+
+class TestEndorsementDataset(unittest.TestCase):
+    def setUp(self):
+        endorsements = [
+            {"databaseId": "E3", "policyId": "P1", "endorsementTypeText": "Cancel", "date": date(2025, 12, 20)},
+            {"databaseId": "E1", "policyId": "P1", "endorsementTypeText": "New", "date": date(2025, 11, 2)},
+            {"databaseId": "E2", "policyId": "P2", "endorsementTypeText": "New", "date": None,
+             "createDate": date(2025, 12, 1)},
+            {"databaseId": "E4", "policyId": "P2", "endorsementTypeText": "New", "date": None},
+        ]
+        agency = [{"endorsementDatabaseId": "E1", "commissionValue": 10.0}]
+        agents = [
+            {"endorsementDatabaseId": "E1", "agentName": "Juan ", "commissionValue": 5.0},
+            {"endorsementDatabaseId": "E3", "agentName": "Juan", "commissionValue": 2.0},
+            {"endorsementDatabaseId": None, "agentName": "Maria", "commissionValue": 1.0},
+        ]
+        self.dataset = EndorsementDataset(endorsements, agency, agents)
+
+    def _ids(self, records):
+        return [r["databaseId"] for r in records]
+
+    def test_date_range_keeps_download_order(self):
+        self.assertEqual(self._ids(self.dataset.endorsements_between("2025-12-01")), ["E3", "E2", "E4"])
+        self.assertEqual(self._ids(self.dataset.endorsements_between("2025-11-01", "2025-12-01")), ["E1", "E2", "E4"])
+        self.assertEqual(len(self.dataset.endorsements_between()), 4)
+
+    def test_undated_endorsements_are_kept(self):
+        # Sin fecha (ni date ni createDate): no se sabe la ventana, entra en todas
+        self.assertEqual(self._ids(self.dataset.undated()), ["E4"])
+        self.assertIn("E4", self._ids(self.dataset.endorsements_between("2030-01-01", "2030-12-31")))
+
+    def test_point_lookups(self):
+        self.assertEqual(self._ids(self.dataset.endorsements_for_policy("P2")), ["E2", "E4"])
+        self.assertEqual(self._ids(self.dataset.endorsements_of_type("Cancel")), ["E3"])
+        self.assertEqual(self.dataset.agency_commissions("E1")[0]["commissionValue"], 10.0)
+        self.assertEqual(self.dataset.agent_commissions("E9"), [])
+        self.assertEqual(len(self.dataset.agent_commissions_for_agent("Juan")), 2)
+        self.assertEqual(len(self.dataset.agent_commissions_for_agent("Maria")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
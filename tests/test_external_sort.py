@@ -0,0 +1,35 @@
+import os
+import random
+import tempfile
+import unittest
+from app.services.external_sort import ExternalSorter
+
+
+class TestExternalSorter(unittest.TestCase):
+    def test_spilled_runs_merge_like_sorted(self):
+        random.seed(7)
+        rows = [{"date": random.randint(1, 50), "n": i, "pad": "x" * 50} for i in range(3000)]
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+            with ExternalSorter(key=lambda r: r["date"], reverse=True, max_memory_mb=0.1, spill_dir=spill_dir) as sorter:
+                sorter.extend(rows)
+
+                self.assertGreater(sorter.spilled_runs, 1)
+                self.assertEqual(len(sorter), len(rows))
+                # Mismo resultado (y mismo orden estable) que sorted(), y se puede iterar 2 veces
+                expected = sorted(rows, key=lambda r: r["date"], reverse=True)
+                self.assertEqual(list(sorter), expected)
+                self.assertEqual(list(sorter), expected)
+
+            self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_small_input_stays_in_memory(self):
+        sorter = ExternalSorter(key=lambda r: r, max_memory_mb=10)
+        sorter.extend([3, 1, 2])
+
+        self.assertEqual(list(sorter), [1, 2, 3])
+        self.assertEqual(sorter.spilled_runs, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from app.api.client import NowCertsClient
+from app.api.history_store import HistoryClient, HistoryStore, history_path
+
+
+def record(record_id, change_date, amount):
+    return {"databaseId": record_id, "changeDate": change_date, "amount": amount}
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(os.path.join(self.tmp.name, "history.sqlite"))
+
+        # Sync 1: E1, E2, E3
+        self.store.record_sync("/Endorsements", [
+            record("E3", "2026-01-03", 30),
+            record("E2", "2026-01-02", 20),
+            record("E1", "2026-01-01", 10),
+        ], synced_at="2026-01-05T07:00:00")
+        # Sync 2: E2 cambia, E3 se borra, aparece E4
+        self.store.record_sync("/Endorsements", [
+            record("E4", "2026-01-08", 40),
+            record("E2", "2026-01-07", 25),
+            record("E1", "2026-01-01", 10),
+        ], synced_at="2026-01-10T07:00:00")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _amounts(self, records):
+        return [(r["databaseId"], r["amount"]) for r in records]
+
+    def test_reconstructs_each_sync(self):
+        first = self.store.sync_as_of("/Endorsements", "2026-01-06")
+        second = self.store.sync_as_of("/Endorsements", "2026-01-10")
+
+        self.assertEqual(self._amounts(self.store.load("/Endorsements", first[0])), [
+            ("E3", 30), ("E2", 20), ("E1", 10),
+        ])
+        self.assertEqual(self._amounts(self.store.load("/Endorsements", second[0])), [
+            ("E4", 40), ("E2", 25), ("E1", 10),
+        ])
+        self.assertIsNone(self.store.sync_as_of("/Endorsements", "2026-01-04"))
+
+    def test_unchanged_records_stored_once(self):
+        with self.store._connect() as conn:
+            versions = conn.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+        # E1 x1, E2 x2, E3 x1, E4 x1
+        self.assertEqual(versions, 5)
+
+    def test_history_client_serves_as_of_pages(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = HistoryClient(self.store, as_of="2026-01-06")
+            self.assertEqual(self._amounts(client.get_all_paginated("/Endorsements")), [
+                ("E3", 30), ("E2", 20), ("E1", 10),
+            ])
+            page = client.get("/Endorsements", params={"$top": 2, "$skip": 2})
+            self.assertEqual(self._amounts(page["value"]), [("E1", 10)])
+            self.assertEqual(client.get("/AgentList", params={"$top": 2, "$skip": 0}), {"value": []})
+            with self.assertRaises(ValueError):
+                client.get_all_paginated("/PolicyList")
+
+
+class TestClientHistory(unittest.TestCase):
+    @patch("app.api.client.HISTORY_STORE", True)
+    @patch("app.api.client.requests.Session")
+    def test_only_complete_pulls_are_recorded(self, mock_session_class):
+        def page(url, params=None, **kwargs):
+            skip = params.get("$skip", 0)
+            body = {"@odata.count": 6, "value": []} if params.get("$count") else {
+                "value": [record(f"E{i}", "2026-01-01", i) for i in range(skip, min(skip + 2, 6))]
+            }
+            return MagicMock(status_code=200, headers={}, json=MagicMock(return_value=body))
+
+        mock_session_class.return_value.get.side_effect = page
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            client = NowCertsClient(access_token="test-token", snapshot_dir=tmp)
+            client.cache = None
+            client.planned_counts["/Endorsements"] = client.count("/Endorsements")
+
+            # Cortada por max_pages (aunque haya plan): no es un sync completo
+            client.get_all_paginated("/Endorsements", top=2, max_pages=2, sleep_seconds=0)
+            client.flush_snapshots()
+            self.assertIsNone(client.history)
+            self.assertFalse(os.path.exists(history_path(tmp)))
+
+            client.get_all_paginated("/Endorsements", top=2, sleep_seconds=0)
+            client.flush_snapshots()
+            self.assertEqual([s[3] for s in client.history.syncs("/Endorsements")], [6])
+
+
+if __name__ == "__main__":
+    unittest.main()
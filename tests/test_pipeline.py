@@ -0,0 +1,121 @@
+import contextlib
+import io
+import tempfile
+import threading
+import time
+import unittest
+from app.services.pipeline import Stage, StageCache, run_pipeline
+
+
+CALLS = []
+
+
+def fetch(rows):
+    CALLS.append("fetch")
+    return list(rows)
+
+
+def ingest(rows):
+    CALLS.append("ingest")
+    return [r * 10 for r in rows]
+
+
+def report(ingested, date_from):
+    CALLS.append("report")
+    return [r for r in ingested if r >= date_from]
+
+
+def build_stages(rows, date_from):
+    return [
+        Stage("fetch", fetch, params={"rows": rows}, cacheable=False, fingerprint=lambda v: repr(v)),
+        Stage("ingest", ingest, inputs=("fetch",)),
+        Stage("report", report, inputs=("ingest",), params={"date_from": date_from}),
+    ]
+
+
+def run_quiet(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_pipeline(*args, **kwargs)
+
+
+class TestStageCache(unittest.TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_only_stages_downstream_of_a_change_rerun(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = run_quiet(build_stages([1, 2, 3], 20), ["report"], cache=StageCache(tmp))
+            self.assertEqual(first, {"report": [20, 30]})
+            self.assertEqual(CALLS, ["fetch", "ingest", "report"])
+
+            # Mismo dato, otra ventana: solo se rehace el reporte
+            CALLS.clear()
+            second = run_quiet(build_stages([1, 2, 3], 30), ["report"], cache=StageCache(tmp))
+            self.assertEqual(second, {"report": [30]})
+            self.assertEqual(CALLS, ["fetch", "report"])
+
+            # Dato nuevo: cambia la huella de la descarga y se re-ingiere
+            CALLS.clear()
+            third = run_quiet(build_stages([1, 2, 4], 30), ["report"], cache=StageCache(tmp))
+            self.assertEqual(third, {"report": [40]})
+            self.assertEqual(CALLS, ["fetch", "ingest", "report"])
+
+    def test_cached_target_does_not_load_intermediates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            run_quiet(build_stages([1, 2, 3], 20), ["report"], cache=StageCache(tmp))
+
+            cache = StageCache(tmp)
+            loads = []
+            original_load = cache.load
+            cache.load = lambda name, key: loads.append(name) or original_load(name, key)
+
+            result = run_quiet(build_stages([1, 2, 3], 20), ["report"], cache=cache)
+            self.assertEqual(result, {"report": [20, 30]})
+            self.assertEqual(loads, ["report"])
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_independent_stage_overlaps_next_source(self):
+        events = []
+        started = threading.Event()
+
+        def slow_source():
+            started.wait(2)
+            events.append("source_b")
+            return 2
+
+        def build_from_a(a):
+            started.set()
+            events.append("build_a")
+            return a + 1
+
+        stages = [
+            Stage("a", lambda: 1, cacheable=False),
+            Stage("b", slow_source, cacheable=False),
+            Stage("build_a", build_from_a, inputs=("a",)),
+            Stage("total", lambda x, b: x + b, inputs=("build_a", "b")),
+        ]
+
+        start = time.perf_counter()
+        result = run_quiet(stages, ["total"])
+
+        self.assertEqual(result, {"total": 4})
+        self.assertEqual(events, ["build_a", "source_b"])
+        self.assertLess(time.perf_counter() - start, 2)
+
+    def test_failing_stage_only_fails_its_targets(self):
+        def boom(a):
+            raise ValueError("boom")
+
+        stages = [
+            Stage("a", lambda: 1, cacheable=False),
+            Stage("bad", boom, inputs=("a",)),
+            Stage("good", lambda a: a * 2, inputs=("a",)),
+        ]
+
+        result = run_quiet(stages, ["bad", "good"])
+        self.assertEqual(result, {"bad": None, "good": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from app.api.rate_limiter import RateLimiter, SharedRateLimiter
+
+
+def _acquire_many(state_dir, n):
+    limiter = SharedRateLimiter("test-token", state_dir=state_dir, max_requests=5, window_seconds=1)
+    times = []
+    for _ in range(n):
+        limiter.acquire()
+        times.append(time.time())
+    return times
+
+
+class TestRateLimiter(unittest.TestCase):
+    @patch("app.api.rate_limiter.time.sleep", return_value=None)
+    @patch("app.api.rate_limiter.time.time")
+    def test_waits_when_window_is_full(self, mock_time, mock_sleep):
+        mock_time.return_value = 1000.0
+        limiter = RateLimiter(max_requests=3, window_seconds=60)
+
+        for _ in range(3):
+            limiter.acquire()
+        mock_sleep.assert_not_called()
+
+        # 4to request 10s después de abrir la ventana: espera el resto + 1s de margen
+        mock_time.return_value = 1010.0
+        limiter.acquire()
+        mock_sleep.assert_called_once_with(51.0)
+        self.assertEqual(limiter.waited_seconds, 51.0)
+
+    @patch("app.api.rate_limiter.time.sleep", return_value=None)
+    @patch("app.api.rate_limiter.time.time")
+    def test_no_wait_after_window_expired(self, mock_time, mock_sleep):
+        mock_time.return_value = 0.0
+        limiter = RateLimiter(max_requests=2, window_seconds=60)
+        limiter.acquire()
+        limiter.acquire()
+
+        mock_time.return_value = 75.0
+        limiter.acquire()
+        mock_sleep.assert_not_called()
+
+    def test_reserve_is_not_blocked_by_a_waiting_acquire(self):
+        limiter = RateLimiter(max_requests=1, window_seconds=0.2)
+        limiter.acquire()
+
+        # Otro thread espera la próxima ventana (~1.2s) sin tener el lock
+        waiter = threading.Thread(target=limiter.acquire)
+        with contextlib.redirect_stdout(io.StringIO()):
+            waiter.start()
+            time.sleep(0.05)
+
+            start = time.time()
+            wait_time = limiter.reserve()
+            self.assertLess(time.time() - start, 0.1)
+            # El cupo de la ventana siguiente ya está tomado por el thread que espera
+            self.assertGreater(wait_time, 1.0)
+            waiter.join()
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def test_processes_share_the_window(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            with ProcessPoolExecutor(max_workers=3) as executor:
+                results = list(executor.map(_acquire_many, [state_dir] * 3, [4] * 3))
+
+        times = sorted(t for r in results for t in r)
+        self.assertEqual(len(times), 12)
+        # En ninguna ventana de 1s entran más de 5 requests, sumando los 3 procesos
+        for i in range(len(times) - 5):
+            self.assertGreaterEqual(times[i + 5] - times[i], 0.95)
+
+    def test_backoff_is_seen_by_other_instances(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            SharedRateLimiter("tok", state_dir=state_dir).backoff(0.3)
+
+            other = SharedRateLimiter("tok", state_dir=state_dir)
+            start = time.time()
+            other.acquire()
+            self.assertGreaterEqual(time.time() - start, 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import unittest
+from datetime import date
+from app.services.receivable_report_service import aging_bucket, build_receivables_report
+
+
+POLICIES_MAP = {
+    "P1": {"policy_number": "POL-1", "mga": "MGA A", "insured": "Trucks SA", "agents": "Juan"},
+}
+
+
+class TestReceivablesReport(unittest.TestCase):
+    def test_aging_buckets(self):
+        self.assertEqual(
+            [aging_bucket(d) for d in (-5, 0, 1, 30, 31, 60, 61, 90, 91)],
+            ["Current", "Current", "1-30", "1-30", "31-60", "31-60", "61-90", "61-90", "90+"],
+        )
+
+    def test_rows_with_balance_oldest_first(self):
+        receivables = [
+            {"databaseId": "R1", "policyDatabaseId": "P1", "dueDate": date(2026, 3, 1), "amount": 100.0,
+             "paidAmount": 40.0},
+            {"databaseId": "R2", "policyId": "P1", "dueDate": date(2026, 1, 1), "amount": 80.0,
+             "balance": 80.0},
+            {"databaseId": "R3", "policyDatabaseId": "P1", "dueDate": date(2026, 1, 1), "amount": 50.0,
+             "paidAmount": 50.0},
+            {"databaseId": "R4", "policyDatabaseId": "P9", "dueDate": None, "amount": 10.0},
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = build_receivables_report(POLICIES_MAP, receivables, as_of=date(2026, 3, 11))
+
+        self.assertEqual([r["receivable_id"] for r in rows], ["R2", "R1", "R4"])
+        self.assertEqual([r["balance"] for r in rows], [80.0, 60.0, 10.0])
+        self.assertEqual([r["days_past_due"] for r in rows], [69, 10, 0])
+        self.assertEqual([r["aging"] for r in rows], ["61-90", "1-30", "Current"])
+        self.assertEqual(rows[0]["policy_number"], "POL-1")
+        self.assertIsNone(rows[2]["policy_number"])
+
+
+if __name__ == "__main__":
+    unittest.main()
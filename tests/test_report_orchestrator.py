@@ -0,0 +1,168 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+from app.api.agents import AGENT_DIRECTORY_FILE, AgentDirectory
+from app.api.snapshot_store import SnapshotWriter, snapshot_path
+from app.services import receivable_report_service
+from app.services.pipeline import StageCache
+from app.services.report_orchestrator import (
+    DATASETS,
+    build_report_stages,
+    commission_report_spec,
+    receivables_report_spec,
+    run_reports,
+)
+from app.services.validators import ValidationReport
+
+
+POLICIES = [
+    {"databaseId": "P1", "changeDate": "2026-01-02", "number": "POL-1", "mgaName": "MGA A",
+     "insuredCommercialName": "Trucks SA", "effectiveDate": "2026-01-01T00:00:00",
+     "expirationDate": "2027-01-01T00:00:00"},
+    # Fecha inválida: 1 anomalía de la ingesta
+    {"databaseId": "P2", "changeDate": "2026-01-02", "number": "POL-2", "mgaName": "MGA B",
+     "effectiveDate": "pronto", "expirationDate": None},
+]
+
+ENDORSEMENTS = [
+    {"databaseId": "E1", "changeDate": "2026-01-05", "policyId": "P1", "endorsementTypeText": "New",
+     "date": "2026-01-05T00:00:00", "createDate": "2026-01-05T00:00:00", "amount": 1000},
+]
+
+AGENCY_COMMISSIONS = [
+    {"databaseId": "AC1", "changeDate": "2026-01-05", "endorsementDatabaseId": "E1", "commissionValue": 10},
+]
+
+AGENT_COMMISSIONS = [
+    {"databaseId": "G1", "changeDate": "2026-01-05", "endorsementDatabaseId": "E1", "agentName": "Juan",
+     "agentDatabaseId": "A1",
+     "commissionValue": 50, "policyCommissionAgentPaymentTypeText": "From Agency Commission"},
+]
+
+RECEIVABLES = [
+    {"databaseId": "R1", "changeDate": "2026-01-10", "policyDatabaseId": "P1",
+     "dueDate": "2026-01-10T00:00:00", "amount": 500, "paidAmount": 200},
+    {"databaseId": "R2", "changeDate": "2026-01-10", "policyDatabaseId": "P1",
+     "dueDate": "2026-03-01T00:00:00", "amount": 300, "paidAmount": 300},
+]
+
+
+class TestReportOrchestrator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        writer = SnapshotWriter()
+        for name, records in (
+            ("policies", POLICIES),
+            ("endorsements", ENDORSEMENTS),
+            ("agency_commissions", AGENCY_COMMISSIONS),
+            ("agent_commissions", AGENT_COMMISSIONS),
+            ("receivables", RECEIVABLES),
+        ):
+            writer.submit(snapshot_path(self.tmp.name, DATASETS[name].endpoint), records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            writer.flush()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stages_fetch_each_dataset_once(self):
+        reports = [commission_report_spec("2026-01-01"), receivables_report_spec(as_of=date(2026, 2, 1))]
+        names = [s.name for s in build_report_stages(None, reports, snapshot_dir=self.tmp.name)]
+
+        fetches = [n for n in names if n.startswith("fetch:")]
+        self.assertEqual(
+            fetches,
+            ["fetch:policies", "fetch:endorsements", "fetch:agency_commissions",
+             "fetch:agent_commissions", "fetch:receivables"],
+        )
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("report:commissions", names)
+        self.assertIn("report:receivables", names)
+
+    def test_report_keys_follow_the_report_service_code(self):
+        stages = {s.name: s for s in build_report_stages(None, [receivables_report_spec(as_of=date(2026, 2, 1))])}
+        self.assertIn(receivable_report_service, stages["report:receivables"].code)
+
+    def test_run_reports_from_snapshots(self):
+        reports = [commission_report_spec("2026-01-01"), receivables_report_spec(as_of=date(2026, 2, 1))]
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_reports(None, reports, snapshot_dir=self.tmp.name)
+
+        receivables = results["receivables"]
+        self.assertEqual([r["receivable_id"] for r in receivables], ["R1"])
+        self.assertEqual(receivables[0]["balance"], 300.0)
+        self.assertEqual(receivables[0]["days_past_due"], 22)
+        self.assertEqual(receivables[0]["mga"], "MGA A")
+
+        self.assertEqual([r["endorsement_id"] for r in results["commissions"]], ["E1"])
+
+
+    def test_warm_cache_loads_only_validations_and_reports(self):
+        reports = [commission_report_spec("2026-01-01"), receivables_report_spec(as_of=date(2026, 2, 1))]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            runs = []
+            for _ in range(2):
+                validation = ValidationReport()
+                with patch.object(StageCache, "load", autospec=True, side_effect=StageCache.load) as load, \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    results = run_reports(
+                        None, reports, validation_report=validation, snapshot_dir=self.tmp.name,
+                        cache_dir=cache_dir,
+                    )
+                runs.append((results, validation, [c.args[1] for c in load.call_args_list]))
+
+        (cold, cold_validation, cold_loads), (warm, warm_validation, warm_loads) = runs
+        self.assertEqual(cold_loads, [])
+        self.assertEqual(
+            sorted(warm_loads),
+            sorted([f"validation:{name}" for name in DATASETS] + ["report:commissions", "report:receivables"]),
+        )
+        self.assertEqual(warm, cold)
+        # Las anomalías de la ingesta siguen saliendo con todo en cache
+        self.assertEqual(len(warm_validation.anomalies), 1)
+        self.assertEqual(warm_validation.anomalies, cold_validation.anomalies)
+        self.assertEqual(warm_validation.records_checked, cold_validation.records_checked)
+
+    def test_agent_names_come_from_the_directory_of_each_run(self):
+        reports = [commission_report_spec("2026-01-01")]
+        directory = AgentDirectory(os.path.join(self.tmp.name, AGENT_DIRECTORY_FILE))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            agents = []
+            for name, last_change in (("Juan Pérez", "2026-01-01"), ("Juan P. Pérez", "2026-02-01")):
+                directory.names["A1"] = name
+                directory.last_change = last_change
+                directory.save()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = run_reports(None, reports, snapshot_dir=self.tmp.name, cache_dir=cache_dir)
+                agents.append([r["agent"] for r in results["commissions"]])
+
+            # La ingesta cacheada de la 1ra corrida no quedó con el nombre viejo
+            self.assertEqual(agents, [["Juan Pérez"], ["Juan P. Pérez"]])
+
+    def test_new_date_from_reingests_only_the_commissions(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            saved = []
+            for date_from in ("2026-01-01", "2025-12-01"):
+                with patch.object(StageCache, "save", autospec=True, side_effect=StageCache.save) as save, \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    run_reports(None, [commission_report_spec(date_from)], snapshot_dir=self.tmp.name,
+                                cache_dir=cache_dir)
+                saved.append(sorted(c.args[1] for c in save.call_args_list))
+
+        self.assertIn("policies", saved[0])
+        self.assertEqual(
+            saved[1],
+            ["agency_commissions", "agent_commissions", "report:commissions",
+             "validation:agency_commissions", "validation:agent_commissions",
+             "window_ids", "window_policies_map"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from app.api.client import NowCertsClient
+from app.api.request_planner import estimate_seconds, plan_requests
+
+
+class FakeCountClient:
+    def __init__(self, counts):
+        self.counts = counts
+        self.planned_counts = {}
+
+    def count(self, endpoint):
+        return self.counts.get(endpoint)
+
+
+class TestRequestPlanner(unittest.TestCase):
+    def test_plan_pages_and_requests(self):
+        client = FakeCountClient({"/PolicyList": 1001, "/Empty": 0})
+        plans = plan_requests(client, ["/PolicyList", "/Empty", "/NoCount"], top=500)
+
+        self.assertEqual([(p.records, p.pages, p.requests) for p in plans], [
+            (1001, 3, 3),
+            (0, 0, 1),
+            (None, None, None),
+        ])
+        self.assertEqual(client.planned_counts, {"/PolicyList": 1001, "/Empty": 0})
+
+    def test_estimate_respects_rate_window(self):
+        self.assertEqual(estimate_seconds(0), 0)
+        self.assertAlmostEqual(estimate_seconds(10, avg_request_seconds=0.3, sleep_seconds=0.7), 10.0)
+        # 190 requests rápidos = 2 ventanas completas de 1 minuto
+        self.assertAlmostEqual(estimate_seconds(190, avg_request_seconds=0.1, sleep_seconds=0.1), 122.0)
+
+    @patch("app.api.client.requests.Session")
+    @patch("app.api.client.time.sleep", return_value=None)
+    def test_rejected_count_fails_fast(self, mock_sleep, mock_session_class):
+        response = MagicMock(status_code=400, headers={})
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError("400", response=response)
+        mock_session = mock_session_class.return_value
+        mock_session.get.return_value = response
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            client = NowCertsClient(access_token="test-token", snapshot_dir=tmp)
+            plans = plan_requests(client, ["/PolicyList"])
+
+        self.assertEqual(plans[0].records, None)
+        # Sin reintentos ni sleeps de 5s: un 4xx no se arregla reintentando
+        self.assertEqual(mock_session.get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+
+class TestPlannedPagination(unittest.TestCase):
+    def _fetch(self, mock_session_class, counted, available, top=2):
+        """$count devuelve `counted`, pero al descargar ya hay `available` registros."""
+        mock_session = mock_session_class.return_value
+
+        def page(url, params=None, **kwargs):
+            response = MagicMock(status_code=200, headers={})
+            if params.get("$count"):
+                response.json.return_value = {"@odata.count": counted, "value": [{}]}
+            else:
+                skip = params["$skip"]
+                size = max(0, min(top, available - skip))
+                response.json.return_value = {"value": [{"skip": skip + i} for i in range(size)]}
+            return response
+
+        mock_session.get.side_effect = page
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = NowCertsClient(access_token="test-token", snapshot_dir=tmp)
+            client.cache = None  # sin cache HTTP aunque el .env lo habilite
+            plan_requests(client, ["/PolicyList"], top=top)
+
+            items = client.get_all_paginated("/PolicyList", top=top)
+            client.flush_snapshots()
+
+        skips = [c.kwargs["params"].get("$skip") for c in mock_session.get.call_args_list]
+        return items, skips
+
+    @patch("app.api.client.requests.Session")
+    @patch("app.api.client.time.sleep", return_value=None)
+    def test_planned_pages_stop_at_short_page(self, mock_sleep, mock_session_class):
+        items, skips = self._fetch(mock_session_class, counted=5, available=5)
+
+        self.assertEqual(len(items), 5)
+        # 1 request de $count + exactamente 3 páginas (la última incompleta corta)
+        self.assertEqual(skips, [None, 0, 2, 4])
+
+    @patch("app.api.client.requests.Session")
+    @patch("app.api.client.time.sleep", return_value=None)
+    def test_records_added_after_count_are_not_dropped(self, mock_sleep, mock_session_class):
+        # El plan dice 4 (2 páginas), pero entre el $count y la descarga llegaron 3 más
+        items, skips = self._fetch(mock_session_class, counted=4, available=7)
+
+        self.assertEqual([r["skip"] for r in items], list(range(7)))
+        self.assertEqual(skips, [None, 0, 2, 4, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
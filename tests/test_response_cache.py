@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from app.api.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_fresh_hit_and_miss(self):
+        cache = ResponseCache(self.cache_dir, ttl_seconds=60)
+        params = {"$top": 500, "$skip": 0}
+
+        self.assertIsNone(cache.lookup("/PolicyList", params))
+        cache.store("/PolicyList", params, {"value": [{"id": 1}]}, etag='"abc"')
+
+        entry = cache.lookup("/PolicyList", {"$skip": 0, "$top": 500})
+        self.assertTrue(entry["fresh"])
+        self.assertEqual(entry["body"], {"value": [{"id": 1}]})
+        self.assertIsNone(cache.lookup("/PolicyList", {"$top": 500, "$skip": 500}))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 2, 1))
+
+    def test_stale_entry_revalidates(self):
+        cache = ResponseCache(self.cache_dir, ttl_seconds=0)
+        cache.store("/PolicyList", None, [1, 2], etag='"v1"', last_modified="Mon, 01 Dec 2025 00:00:00 GMT")
+
+        entry = cache.lookup("/PolicyList", None)
+        self.assertFalse(entry["fresh"])
+        self.assertEqual(
+            cache.conditional_headers(entry),
+            {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Dec 2025 00:00:00 GMT"},
+        )
+
+        cache.mark_revalidated(entry)
+        stats = cache.stats()
+        self.assertEqual(stats["revalidated"], 1)
+        # Reescrita de forma atómica y con su tamaño actualizado en el índice
+        files = os.listdir(self.cache_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith(".json"))
+        self.assertEqual(stats["bytes"], os.path.getsize(os.path.join(self.cache_dir, files[0])))
+        self.assertEqual(cache.lookup("/PolicyList", None)["body"], [1, 2])
+
+    def test_lru_eviction_survives_reload(self):
+        cache = ResponseCache(self.cache_dir, ttl_seconds=60, max_entries=2)
+        cache.store("/A", None, "a")
+        cache.store("/B", None, "b")
+        # /A pasa a ser la más reciente; al agregar /C se desaloja /B
+        cache.lookup("/A", None)
+        cache.store("/C", None, "c")
+
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        reloaded = ResponseCache(self.cache_dir, ttl_seconds=60, max_entries=2)
+        self.assertIsNone(reloaded.lookup("/B", None))
+        self.assertEqual(reloaded.lookup("/A", None)["body"], "a")
+        self.assertEqual(reloaded.lookup("/C", None)["body"], "c")
+
+    def test_concurrent_writers_of_the_same_key(self):
+        # Varias instancias (como varios procesos con el mismo token) sobre el mismo directorio
+        caches = [ResponseCache(self.cache_dir, ttl_seconds=60) for _ in range(4)]
+        body = {"value": list(range(2000))}
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: caches[i % 4].store("/PolicyList", None, body), range(100)))
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertEqual(ResponseCache(self.cache_dir, ttl_seconds=60).lookup("/PolicyList", None)["body"], body)
+
+
+if __name__ == "__main__":
+    unittest.main()
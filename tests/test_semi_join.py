@@ -0,0 +1,56 @@
+import unittest
+from datetime import date
+from app.api.policies import build_policies_map
+from app.services.semi_join import BloomFilter, id_filter, prune_records, window_ids
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives_and_low_false_positive_rate(self):
+        bloom = BloomFilter(5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"E{i}")
+
+        self.assertTrue(all(f"E{i}" in bloom for i in range(5000)))
+        false_positives = sum(f"X{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_large_id_sets_use_bloom(self):
+        self.assertIsInstance(id_filter(["a", "b"], exact_limit=10), set)
+        bloom = id_filter([f"E{i}" for i in range(20)], exact_limit=10)
+        self.assertIsInstance(bloom, BloomFilter)
+        self.assertIn("E7", bloom)
+
+
+class TestWindowPruning(unittest.TestCase):
+    def setUp(self):
+        self.endorsements = [
+            {"databaseId": "E1", "policyId": "P1", "date": date(2025, 10, 1)},
+            {"databaseId": "E2", "policyId": "P2", "date": None, "createDate": date(2025, 12, 1)},
+            {"databaseId": "E3", "policyId": "P3", "date": date(2025, 12, 20)},
+            {"databaseId": "E4", "policyId": "P1", "date": None},
+        ]
+
+    def test_window_ids_match_endorsement_dates(self):
+        window = window_ids(self.endorsements, "2025-11-01")
+        self.assertEqual(window.endorsements, {"E2", "E3"})
+        self.assertEqual(window.policies, {"P2", "P3"})
+
+        window = window_ids(self.endorsements, "2025-11-01", date(2025, 12, 10))
+        self.assertEqual(window.endorsements, {"E2"})
+
+    def test_prune_commissions_and_policies(self):
+        window = window_ids(self.endorsements, "2025-11-01")
+        comms = [
+            {"endorsementDatabaseId": "E1", "commissionValue": 10.0},
+            {"endorsementDatabaseId": "E3", "commissionValue": 12.0},
+            {"endorsementDatabaseId": None, "commissionValue": 1.0},
+        ]
+        self.assertEqual(prune_records(comms, "endorsementDatabaseId", window.endorsements), [comms[1]])
+        self.assertEqual(prune_records(comms, "endorsementDatabaseId", None), comms)
+
+        policies = [{"databaseId": p} for p in ("P1", "P2", "P3")]
+        self.assertEqual(sorted(build_policies_map(policies, policy_ids=window.policies)), ["P2", "P3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from app.api.snapshot_store import SnapshotWriter, load_snapshot, snapshot_path
+
+
+RECORDS = [
+    {"databaseId": "E1", "amount": 100.5, "agents": [{"firstName": "Juan"}], "statusText": "Active"},
+    {"databaseId": "E2", "amount": None, "agents": [], "statusText": "Active"},
+    {"databaseId": "E3", "amount": -20.0, "extra": "solo acá"},
+]
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def test_roundtrip_in_background(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = snapshot_path(tmp, "/PolicyEndorsementDetailList")
+            self.assertTrue(path.endswith("PolicyEndorsementDetailList.snap"))
+
+            records = [dict(r) for r in RECORDS]
+            writer = SnapshotWriter()
+            writer.submit(path, records)
+            # La ingesta modifica los registros en el lugar mientras se escribe
+            records[0]["amount"] = "modificado"
+            writer.flush()
+
+            self.assertEqual(load_snapshot(path), RECORDS)
+
+    def test_load_selected_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = snapshot_path(tmp, "/X")
+            writer = SnapshotWriter()
+            writer.submit(path, RECORDS)
+            writer.flush()
+
+            self.assertEqual(
+                load_snapshot(path, columns=["databaseId", "extra"]),
+                [{"databaseId": "E1"}, {"databaseId": "E2"}, {"databaseId": "E3", "extra": "solo acá"}],
+            )
+
+    def test_empty_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "empty.snap")
+            writer = SnapshotWriter()
+            writer.submit(path, [])
+            writer.flush()
+            self.assertEqual(load_snapshot(path), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import time
+import unittest
+from app.services.stage_profiler import StageProfiler
+
+
+class FakeClient:
+    rate_limit_wait_seconds = 0.0
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_rate_limit_wait_reported_apart_from_compute(self):
+        client = FakeClient()
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = StageProfiler(output_dir=tmp, clients=[client])
+
+            with profiler.stage("fetch:policies"):
+                time.sleep(0.05)
+                client.rate_limit_wait_seconds += 0.05
+            with profiler.stage("build"):
+                sorted(str(i) for i in range(20000))
+
+            fetch, build = profiler.timings
+            self.assertAlmostEqual(fetch.sleep, 0.05)
+            self.assertEqual(build.sleep, 0.0)
+            self.assertGreater(build.peak_mb, 0)
+
+            summary_path = profiler.write()
+            self.assertTrue(os.path.exists(os.path.join(tmp, "fetch_policies.prof")))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "build.prof")))
+
+            with open(summary_path, encoding="utf-8") as f:
+                summary = f.read()
+            self.assertIn("fetch:policies", summary)
+            self.assertNotIn("time.sleep", summary)
+
+    def test_disabled_is_noop(self):
+        profiler = StageProfiler(enabled=False)
+        with profiler.stage("anything"):
+            pass
+        self.assertEqual(profiler.timings, [])
+        self.assertIsNone(profiler.write())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from openpyxl import load_workbook
+from app.exports.excel_reporter import export_endorsements_to_excel
+from app.services.summary_report_service import SUMMARY_TOTAL, build_commission_summaries
+
+
+def _row(endorsement_id, agent, agency, agent_comm, amount=1000.0, endorsement_type="Endorsement", mga="MGA A"):
+    return {
+        "endorsement_id": endorsement_id,
+        "agent": agent,
+        "mga": mga,
+        "endorsement_type": endorsement_type,
+        "endorsement_effective": "2025-12-13T00:00:00",
+        "endorsement_amount": amount,
+        "agency_commission": agency,
+        "agent_commission": agent_comm,
+    }
+
+
+class TestCommissionSummaries(unittest.TestCase):
+    def test_agency_commission_counted_once_per_endorsement(self):
+        rows = [
+            _row("E1", "Juan", 120.0, 50.0),
+            _row("E1", "Maria", 120.0, 24.0),
+        ]
+
+        summaries = build_commission_summaries(rows)
+        mga = summaries["MGA"][0]
+
+        self.assertEqual(mga["endorsements"], 1)
+        self.assertEqual(mga["premium"], 1000.0)
+        self.assertEqual(mga["agency_commission"], 120.0)
+        self.assertEqual(mga["agent_commission"], 74.0)
+        self.assertEqual(mga["total_commission"], 194.0)
+        self.assertEqual([g["group"] for g in summaries["Agent"]], ["Juan", "Maria"])
+        self.assertEqual(summaries["Month"][0]["group"], "2025-12")
+
+    def test_cancel_rows_are_negative(self):
+        rows = [
+            _row("E1", "Juan", 100.0, 10.0),
+            _row("E2", "Juan", 40.0, 4.0, amount=400.0, endorsement_type="Policy Cancellation"),
+        ]
+
+        juan = build_commission_summaries(rows)["Agent"][0]
+
+        self.assertEqual(juan["endorsements"], 2)
+        self.assertEqual(juan["premium"], 600.0)
+        self.assertEqual(juan["agency_commission"], 60.0)
+        self.assertEqual(juan["agent_commission"], 6.0)
+
+    def test_grand_total_counts_multi_agent_endorsement_once(self):
+        rows = [
+            _row("E1", "Juan", 120.0, 50.0),
+            _row("E1", "Maria", 120.0, 24.0),
+            _row("E2", "Juan", 30.0, 10.0, amount=300.0),
+        ]
+
+        summaries = build_commission_summaries(rows)
+        total = summaries[SUMMARY_TOTAL]
+
+        self.assertEqual(total["endorsements"], 2)
+        self.assertEqual(total["premium"], 1300.0)
+        self.assertEqual(total["agency_commission"], 150.0)
+        self.assertEqual(total["agent_commission"], 84.0)
+        self.assertEqual(total["total_commission"], 234.0)
+        # Por agente E1 está en 2 grupos: la suma de los grupos lo duplica
+        self.assertEqual(sum(g["premium"] for g in summaries["Agent"]), 2300.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.xlsx")
+            with contextlib.redirect_stdout(io.StringIO()):
+                export_endorsements_to_excel(rows, path, summaries=summaries)
+            wb = load_workbook(path)
+
+        self.assertNotIn(f"By {SUMMARY_TOTAL}", wb.sheetnames)
+        for name in ("By Agent", "By MGA"):
+            last = [c.value for c in list(wb[name].iter_rows())[-1]]
+            self.assertEqual(last, ["TOTAL", 2, 1300.0, 150.0, 84.0, 234.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
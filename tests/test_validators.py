@@ -0,0 +1,60 @@
+import unittest
+from datetime import date
+from app.services.commision_calculator import calculate_commissions
+from app.services.validators import (
+    PaymentType,
+    ValidationReport,
+    ingest_agency_commissions,
+    ingest_agent_commissions,
+    ingest_endorsements,
+)
+
+
+class TestIngestion(unittest.TestCase):
+    def test_endorsements_are_typed_and_anomalies_collected(self):
+        report = ValidationReport()
+        records = [
+            {"databaseId": "E1", "date": "2025-12-13T00:00:00", "amount": "1500.5"},
+            {"databaseId": "E2", "date": "13/12/2025", "amount": "n/a"},
+        ]
+
+        ingest_endorsements(records, report)
+
+        self.assertEqual(records[0]["date"], date(2025, 12, 13))
+        self.assertEqual(records[0]["amount"], 1500.5)
+        self.assertIsNone(records[1]["date"])
+        self.assertIsNone(records[1]["amount"])
+        self.assertEqual(
+            report.counts(),
+            {("PolicyEndorsementDetailList", "date"): 1, ("PolicyEndorsementDetailList", "amount"): 1},
+        )
+
+    def test_payment_type_enum(self):
+        report = ValidationReport()
+        records = [
+            {"commissionValue": "25", "policyCommissionAgentPaymentTypeText": "From Agency Commission"},
+            {"commissionValue": 10, "policyCommissionAgentPaymentTypeText": "From Base Premium"},
+            {"commissionValue": 10, "policyCommissionAgentPaymentTypeText": "Flat"},
+        ]
+
+        ingest_agent_commissions(records, report)
+
+        self.assertIs(records[0]["paymentType"], PaymentType.FROM_AGENCY_COMMISSION)
+        self.assertIs(records[1]["paymentType"], PaymentType.FROM_BASE_PREMIUM)
+        # Texto desconocido: se calcula sobre la prima base, pero queda reportado
+        self.assertIs(records[2]["paymentType"], PaymentType.FROM_BASE_PREMIUM)
+        self.assertEqual(len(report.anomalies), 1)
+
+    def test_calculator_on_ingested_records(self):
+        report = ValidationReport()
+        agency = ingest_agency_commissions([{"commissionValue": "12"}], report)
+        agents = ingest_agent_commissions(
+            [{"commissionValue": 25, "policyCommissionAgentPaymentTypeText": "From Agency Commission"}],
+            report,
+        )
+
+        self.assertEqual(calculate_commissions(agency, agents, 20000.0), (2400.0, 600.0))
+
+
+if __name__ == "__main__":
+    unittest.main()